@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 from corsheaders.defaults import default_headers
 import os
+import sys
 from LMS_Backend.databse import DATABASES
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -33,6 +34,7 @@ ALLOWED_HOSTS = ["*"]
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -44,7 +46,8 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
-    'drf_yasg'
+    'drf_yasg',
+    'channels',
 ]
 
 MIDDLEWARE = [
@@ -116,6 +119,34 @@ SIMPLE_JWT = {
 # MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'Media Uploads'
 
+# User photo uploads and derived thumbnails
+PHOTO_THUMBNAIL_SIZES = (64, 256)
+PHOTO_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+PHOTO_UPLOAD_MAX_PIXELS = 40_000_000
+PHOTO_INGEST_WORKERS = 2
+
+# Chunked uploads of form files (api.views.uploads). Partial files are kept
+# under MEDIA_ROOT so completing an upload is a rename, not a copy
+UPLOAD_SESSION_DIR = MEDIA_ROOT / 'uploads'
+UPLOAD_MAX_CHUNK_BYTES = 8 * 1024 * 1024
+UPLOAD_MAX_FILE_BYTES = 2 * 1024 * 1024 * 1024
+
+# Event reminders (api.reminders, run by `manage.py run_reminders`)
+REMINDER_OFFSETS = (15,)  # minutes before start
+REMINDER_HORIZON_HOURS = 24
+REMINDER_MAX_PENDING = 200_000
+REMINDER_POLL_SECONDS = 30
+REMINDER_SINKS = ("api.reminders.EmailSink", "api.reminders.WebSocketSink")
+REMINDER_MAX_ATTEMPTS = 3
+REMINDER_DELIVERY_TIMEOUT_SECONDS = 300
+
+# Form file previews and durations (api.media, run by `manage.py process_media`).
+# Video and audio need ffmpeg/ffprobe on the worker hosts
+MEDIA_WORKERS = 2
+MEDIA_PREVIEW_SIZE = 256  # longest edge in px
+MEDIA_MAX_ATTEMPTS = 3
+MEDIA_JOB_TIMEOUT_SECONDS = 600
+
 # authendication
 AUTH_USER_MODEL = 'api.CustomUser'
 
@@ -140,6 +171,25 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'LMS_Backend.wsgi.application'
+ASGI_APPLICATION = 'LMS_Backend.asgi.application'
+
+# Realtime push (api.consumers). Redis carries group messages between every
+# daphne worker; set REDIS_URL to point at it.
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0')],
+        },
+    }
+}
+if sys.argv[1:2] == ['test']:
+    # The test runner is one process, so no Redis is needed there
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    }
 
 
 # Database
@@ -148,6 +198,17 @@ WSGI_APPLICATION = 'LMS_Backend.wsgi.application'
 DATABASES = DATABASES
 
 
+# Cache
+# Cached payloads are keyed by versions read from the database, so a
+# per-process cache never serves stale data; a shared backend (e.g. Redis or
+# Memcached) only saves rebuilding the payload in each worker
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -0,0 +1,119 @@
+from bisect import bisect_left
+from datetime import timedelta
+from django.conf import settings
+from django.utils.timezone import localtime
+from api import recurrence
+from api.models import CalendarAttendee
+
+EVENT_COLUMNS = ('id', 'name', 'description', 'start_time', 'end_time', 'recurrence', 'update_date')
+# How far ahead the occurrences of a recurring event are checked for conflicts
+RECURRING_CONFLICT_WINDOW = timedelta(days=getattr(settings, 'RECURRING_CONFLICT_DAYS', 90))
+
+
+def attendee_occurrences(user_ids, window_start, window_end, exclude_event=None):
+    # One indexed query over the attendee join for every user, then each distinct
+    # event is expanded once. Returns {user_id: [Occurrence, ...]} in start order.
+    user_ids = [int(user_id) for user_id in user_ids]
+    links = CalendarAttendee.objects.filter(
+        recurrence.window_filter(window_start, window_end, prefix='calendar__'),
+        customuser_id__in=list(user_ids),
+    )
+    if exclude_event is not None:
+        links = links.exclude(calendar_id=exclude_event)
+    events = {}
+    attendees = {}
+    for row in links.values('customuser_id', *(f'calendar__{c}' for c in EVENT_COLUMNS)):
+        event_id = row['calendar__id']
+        if event_id not in events:
+            events[event_id] = {c: row[f'calendar__{c}'] for c in EVENT_COLUMNS}
+        attendees.setdefault(event_id, []).append(row['customuser_id'])
+
+    by_user = {user_id: [] for user_id in user_ids}
+    for event, occurrences in recurrence.occurrences_per_event(events.values(), window_start, window_end):
+        occurrences = list(occurrences)
+        for user_id in attendees[event['id']]:
+            by_user[user_id].extend(occurrences)
+    for occurrences in by_user.values():
+        occurrences.sort()
+    return by_user
+
+
+def _overlaps_any(intervals, starts, occurrence):
+    # intervals: merged (start, end) pairs, starts: their starts. The last one
+    # starting before the occurrence ends is the only one that can overlap it.
+    index = bisect_left(starts, occurrence.end_time) - 1
+    return index >= 0 and intervals[index][1] > occurrence.start_time
+
+
+def find_conflicts(user_ids, start, end, exclude_event=None, event_recurrence=None):
+    # Occurrences overlapping [start, end) (start_time < end AND end_time > start)
+    # per attendee; users without conflicts are left out. For a recurring event
+    # each of its occurrences in RECURRING_CONFLICT_WINDOW is checked, still with
+    # one query over the whole window.
+    if not recurrence.is_recurring(event_recurrence):
+        occurrences = attendee_occurrences(user_ids, start, end, exclude_event=exclude_event)
+        return {user_id: found for user_id, found in occurrences.items() if found}
+
+    booked = merge_intervals(recurrence.expand(start, end, event_recurrence, start, start + RECURRING_CONFLICT_WINDOW))
+    if not booked:
+        return {}
+    starts = [interval_start for interval_start, _ in booked]
+    conflicts = {}
+    for user_id, occurrences in attendee_occurrences(user_ids, start, booked[-1][1], exclude_event=exclude_event).items():
+        found = [occurrence for occurrence in occurrences if _overlaps_any(booked, starts, occurrence)]
+        if found:
+            conflicts[user_id] = found
+    return conflicts
+
+
+def merge_intervals(intervals):
+    # Sweep over (start, end) pairs sorted by start, joining overlapping/touching ones
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def busy_intervals(user_ids, window_start, window_end):
+    # Merged busy time per user and across all of them, clipped to the window
+    per_user = {}
+    for user_id, occurrences in attendee_occurrences(user_ids, window_start, window_end).items():
+        per_user[user_id] = merge_intervals(
+            (max(o.start_time, window_start), min(o.end_time, window_end)) for o in occurrences
+        )
+    combined = merge_intervals(interval for intervals in per_user.values() for interval in intervals)
+    return per_user, combined
+
+
+def _align(value, step):
+    # Round up to the next multiple of step minutes since local midnight
+    local = localtime(value)
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = local - midnight
+    steps = -(-elapsed // step)
+    return midnight + steps * step
+
+
+def free_slots(busy, window_start, window_end, duration, step, limit):
+    # First `limit` slots of `duration` starting on `step` boundaries that fit
+    # between the merged busy intervals
+    slots = []
+    cursor = _align(window_start, step)
+    for busy_start, busy_end in list(busy) + [(window_end, window_end)]:
+        while cursor + duration <= busy_start and cursor + duration <= window_end:
+            slots.append((cursor, cursor + duration))
+            if len(slots) >= limit:
+                return slots
+            cursor += step
+        if busy_end > cursor:
+            cursor = _align(busy_end, step)
+    return slots
+
+
+def suggest_slots(user_ids, window_start, window_end, duration, step=timedelta(minutes=15), limit=5):
+    _, combined = busy_intervals(user_ids, window_start, window_end)
+    return free_slots(combined, window_start, window_end, duration, step, limit)
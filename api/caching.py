@@ -0,0 +1,23 @@
+import hashlib
+from django.db.models import Count, Max
+from api.models import CustomUser
+
+PAYLOAD_TIMEOUT = 60 * 60 * 24
+
+
+# Per-company version of anything derived from the company's users, read from
+# the users table so every worker process agrees on it. A saved change moves
+# the newest update_date, and users joining or leaving change the count.
+def company_users_version(company_id):
+    users = CustomUser.objects.filter(company_id=company_id).aggregate(count=Count("id"), latest=Max("update_date"))
+    latest = users["latest"].timestamp() if users["latest"] else 0
+    return f"{users['count']}:{latest}"
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.md5(":".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("If-None-Match", "")
+    return header.strip() == "*" or etag in [tag.strip() for tag in header.split(",")]
@@ -0,0 +1,31 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from api.realtime import company_group, user_group
+
+
+class UpdatesConsumer(AsyncJsonWebsocketConsumer):
+    # Pushes calendar deltas for events the user attends and new form
+    # submissions in the user's company
+    async def connect(self):
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.groups_joined = [user_group(user.id)]
+        if user.company_id is not None:
+            self.groups_joined.append(company_group(user.company_id))
+        for group in self.groups_joined:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        for group in getattr(self, "groups_joined", []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def calendar_event(self, message):
+        await self.send_json({"type": "event", "action": message["action"], "data": message["event"]})
+
+    async def calendar_reminder(self, message):
+        await self.send_json({"type": "reminder", "action": "due", "data": message["reminder"]})
+
+    async def form_data(self, message):
+        await self.send_json({"type": "form_data", "action": message["action"], "data": message["form_data"]})
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import get_current_timezone, is_naive, localtime, make_aware
+
+# Output format used across the API: "%d-%m-%Y %I:%M %p"
+DISPLAY_FORMAT = "%d-%m-%Y %I:%M %p"
+
+_TWO_DIGITS = [f"{i:02d}" for i in range(100)]
+_HOURS_12 = [(_TWO_DIGITS[h % 12 or 12], "AM" if h < 12 else "PM") for h in range(24)]
+_MAX_CACHED_HOURS = 200_000
+
+
+class DateTimeFormatter:
+    # Formats aware datetimes in one time zone without localtime()/strftime().
+    # The UTC offset is cached per UTC hour; an hour containing a transition is
+    # not cached and falls back to localtime() for its values.
+    def __init__(self, tz):
+        self.tz = tz
+        self._offsets = {}
+
+    def _offset(self, hour_key, utc_naive):
+        try:
+            return self._offsets[hour_key]
+        except KeyError:
+            pass
+        hour_start = utc_naive.replace(minute=0, second=0, microsecond=0, tzinfo=dt_timezone.utc)
+        first = hour_start.astimezone(self.tz).utcoffset()
+        last = (hour_start + timedelta(minutes=59, seconds=59)).astimezone(self.tz).utcoffset()
+        offset = first if first == last else None
+        if len(self._offsets) >= _MAX_CACHED_HOURS:
+            self._offsets.clear()
+        self._offsets[hour_key] = offset
+        return offset
+
+    def format(self, value):
+        utc_offset = value.utcoffset()
+        if utc_offset is None:
+            # Naive values keep the old behaviour
+            return localtime(value, self.tz).strftime(DISPLAY_FORMAT)
+        utc_naive = value.replace(tzinfo=None) - utc_offset
+        offset = self._offset(utc_naive.toordinal() * 24 + utc_naive.hour, utc_naive)
+        if offset is None:
+            local = localtime(value, self.tz)
+        else:
+            local = utc_naive + offset
+        two = _TWO_DIGITS
+        hour, meridiem = _HOURS_12[local.hour]
+        return f"{two[local.day]}-{two[local.month]}-{local.year:04d} {hour}:{two[local.minute]} {meridiem}"
+
+    def format_many(self, values):
+        fmt = self.format
+        return [None if value is None else fmt(value) for value in values]
+
+    def format_rows(self, rows, fields):
+        # In-place formatting of datetime columns for a whole result set
+        fmt = self.format
+        for row in rows:
+            for field in fields:
+                value = row[field]
+                if value is not None:
+                    row[field] = fmt(value)
+        return rows
+
+
+_formatters = {}
+
+
+def get_formatter(tz=None):
+    tz = tz or get_current_timezone()
+    formatter = _formatters.get(tz)
+    if formatter is None:
+        formatter = _formatters[tz] = DateTimeFormatter(tz)
+    return formatter
+
+
+def format_datetime(value):
+    return get_formatter().format(value)
+
+
+def parse_datetime_param(value):
+    # Accepts ISO 8601 or the API display format ("DD-MM-YYYY HH:MM AM/PM")
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        try:
+            parsed = datetime.strptime(value, DISPLAY_FORMAT)
+        except ValueError:
+            raise ValueError(f"Invalid date '{value}'. Use ISO 8601 or 'DD-MM-YYYY HH:MM AM/PM'.")
+    if is_naive(parsed):
+        parsed = make_aware(parsed)
+    return parsed
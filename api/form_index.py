@@ -0,0 +1,114 @@
+from django.db import transaction
+from api.models import Form, FormData, FormFieldValue
+
+TEXT_MAX_LENGTH = 255
+INDEX_BATCH_SIZE = 1000
+# Lookups accepted by filter_submissions(), as the ?<field>__<op>= suffix
+FILTER_OPERATORS = ("eq", "gt", "gte", "lt", "lte", "in")
+
+
+def declared_fields(layout):
+    # {field_name: type} of the fields declared by a form layout
+    return {field["field_name"]: field.get("type") for field in layout.get("fields", []) if "field_name" in field}
+
+
+def _typed_values(value):
+    # (text, number) pairs stored for one submitted value; a list (multi-select)
+    # gets a row per element
+    if isinstance(value, list):
+        return [typed for element in value for typed in _typed_values(element)]
+    if value is None or isinstance(value, dict):
+        return []
+    if isinstance(value, bool):
+        return [("true" if value else "false", None)]
+    if isinstance(value, (int, float)):
+        return [(str(value)[:TEXT_MAX_LENGTH], float(value))]
+    return [(str(value)[:TEXT_MAX_LENGTH], None)]
+
+
+def field_values(form_data, fields):
+    submitted_data = form_data.submitted_data if isinstance(form_data.submitted_data, dict) else {}
+    return [
+        FormFieldValue(
+            form_id=form_data.form_id,
+            form_data_id=form_data.id,
+            field_name=name,
+            value_text=text,
+            value_number=number,
+        )
+        for name in fields if name in submitted_data
+        for text, number in _typed_values(submitted_data[name])
+    ]
+
+
+def index_submissions(submissions, layouts=None):
+    # Replaces the index rows of the given FormData rows. layouts is an optional
+    # {form_id: layout} to avoid loading the forms again.
+    submissions = list(submissions)
+    if not submissions:
+        return 0
+    if layouts is None:
+        layouts = dict(Form.objects.filter(id__in={s.form_id for s in submissions}).values_list("id", "layout"))
+    fields = {form_id: declared_fields(layout) for form_id, layout in layouts.items()}
+    rows = [row for s in submissions for row in field_values(s, fields.get(s.form_id, {}))]
+    with transaction.atomic():
+        FormFieldValue.objects.filter(form_data_id__in=[s.id for s in submissions]).delete()
+        FormFieldValue.objects.bulk_create(rows, batch_size=INDEX_BATCH_SIZE)
+    return len(rows)
+
+
+def reindex_form(form, batch_size=INDEX_BATCH_SIZE):
+    # Rebuilds the index of every submission of a form, e.g. after its layout
+    # declared new fields. Yields the number of submissions done so far.
+    layouts = {form.id: form.layout}
+    last_id, done = 0, 0
+    while True:
+        batch = list(
+            FormData.objects.filter(form=form, id__gt=last_id).order_by("id").only("id", "form_id", "submitted_data")[:batch_size]
+        )
+        if not batch:
+            return
+        index_submissions(batch, layouts)
+        last_id = batch[-1].id
+        done += len(batch)
+        yield done
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{value}' is not a number.")
+
+
+def parse_filters(params, layout, reserved=()):
+    # Query parameters such as status=Closed, amount__gte=10 or region__in=N,S
+    # become (field_name, op, value) conditions on declared fields
+    fields = declared_fields(layout)
+    conditions = []
+    for key, value in params.items():
+        if key in reserved:
+            continue
+        name, _, op = key.rpartition("__")
+        if not name or op not in FILTER_OPERATORS:
+            name, op = key, "eq"
+        if name not in fields:
+            raise ValueError(f"'{name}' is not a field of this form.")
+        values = value.split(",") if op == "in" else [value]
+        if fields[name] == "number":
+            values = [_number(v) for v in values]
+        conditions.append((name, op, values if op == "in" else values[0]))
+    return conditions
+
+
+def filter_submissions(form, conditions):
+    # FormData of a form matching every condition. Each condition is one
+    # lookup on the (form, field_name, value) indexes.
+    fields = declared_fields(form.layout)
+    queryset = FormData.objects.filter(form=form)
+    for name, op, value in conditions:
+        column = "value_number" if fields[name] == "number" else "value_text"
+        lookup = column if op == "eq" else f"{column}__{op}"
+        matches = FormFieldValue.objects.filter(form=form, field_name=name, **{lookup: value}).values("form_data_id")
+        queryset = queryset.filter(id__in=matches)
+    return queryset
@@ -0,0 +1,127 @@
+from collections import defaultdict
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.timezone import localtime
+from api.form_index import declared_fields
+from api.models import Form, FormData, FormFieldStat
+
+BUCKET_MAX_LENGTH = 255
+REBUILD_BATCH_SIZE = 2000
+# Field types that are summarised
+COUNTED_TYPES = ("dropdown",)
+SUMMED_TYPES = ("number",)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def add_submission(deltas, form_id, submitted_data, create_date, fields, sign=1):
+    # Adds one submission's contribution to deltas: {(form_id, field, bucket): [count, total]}
+    deltas[(form_id, "", localtime(create_date).date().isoformat())][0] += sign
+    data = submitted_data if isinstance(submitted_data, dict) else {}
+    for name, field_type in fields.items():
+        value = data.get(name)
+        if value is None:
+            continue
+        if field_type in COUNTED_TYPES:
+            for option in value if isinstance(value, list) else [value]:
+                if option is not None and not isinstance(option, (list, dict)):
+                    deltas[(form_id, name, str(option)[:BUCKET_MAX_LENGTH])][0] += sign
+        elif field_type in SUMMED_TYPES and _is_number(value):
+            delta = deltas[(form_id, name, "")]
+            delta[0] += sign
+            delta[1] += sign * value
+
+
+def apply_deltas(deltas):
+    # One UPDATE per touched bucket; a bucket seen for the first time is
+    # inserted, retrying as an update if a concurrent writer inserted it first
+    with transaction.atomic():
+        for (form_id, field_name, bucket), (count, total) in deltas.items():
+            if not count and not total:
+                continue
+            rows = FormFieldStat.objects.filter(form_id=form_id, field_name=field_name, bucket=bucket)
+            if rows.update(count=F("count") + count, total=F("total") + total) or count < 0:
+                continue
+            try:
+                with transaction.atomic():
+                    FormFieldStat.objects.create(
+                        form_id=form_id, field_name=field_name, bucket=bucket, count=count, total=total
+                    )
+            except IntegrityError:
+                rows.update(count=F("count") + count, total=F("total") + total)
+
+
+def record_submissions(submissions, layouts=None, sign=1):
+    # Counts (sign=1) or uncounts (sign=-1) FormData rows in the summaries.
+    # layouts is an optional {form_id: layout} to avoid loading the forms again.
+    submissions = list(submissions)
+    if not submissions:
+        return
+    if layouts is None:
+        layouts = dict(Form.objects.filter(id__in={s.form_id for s in submissions}).values_list("id", "layout"))
+    fields = {form_id: declared_fields(layout) for form_id, layout in layouts.items()}
+    deltas = defaultdict(lambda: [0, 0])
+    for s in submissions:
+        add_submission(deltas, s.form_id, s.submitted_data, s.create_date, fields.get(s.form_id, {}), sign)
+    apply_deltas(deltas)
+
+
+def rebuild_form(form, batch_size=REBUILD_BATCH_SIZE):
+    # Recomputes a form's summaries from its submissions. The form row is
+    # locked so a concurrent rebuild of the same form waits.
+    fields = declared_fields(form.layout)
+    deltas = defaultdict(lambda: [0, 0])
+    with transaction.atomic():
+        Form.objects.select_for_update().filter(id=form.id).first()
+        last_id = 0
+        while True:
+            batch = list(
+                FormData.objects.filter(form=form, id__gt=last_id)
+                .order_by("id")
+                .values_list("id", "submitted_data", "create_date")[:batch_size]
+            )
+            if not batch:
+                break
+            for _, submitted_data, create_date in batch:
+                add_submission(deltas, form.id, submitted_data, create_date, fields)
+            last_id = batch[-1][0]
+        FormFieldStat.objects.filter(form=form).delete()
+        FormFieldStat.objects.bulk_create(
+            [
+                FormFieldStat(form_id=form_id, field_name=field_name, bucket=bucket, count=count, total=total)
+                for (form_id, field_name, bucket), (count, total) in deltas.items()
+                if count or total
+            ],
+            batch_size=1000,
+        )
+    return len(deltas)
+
+
+def form_summary(form, start_date=None, end_date=None):
+    # Dashboard payload built from the summary rows only
+    fields = declared_fields(form.layout)
+    summary = {
+        name: {"type": field_type, "counts": {}} if field_type in COUNTED_TYPES
+        else {"type": field_type, "count": 0, "sum": 0, "average": None}
+        for name, field_type in fields.items()
+        if field_type in COUNTED_TYPES + SUMMED_TYPES
+    }
+    per_day, total = [], 0
+    for field_name, bucket, count, value in (
+        FormFieldStat.objects.filter(form=form, count__gt=0)
+        .order_by("field_name", "bucket")
+        .values_list("field_name", "bucket", "count", "total")
+    ):
+        if field_name == "":
+            total += count
+            if (start_date is None or bucket >= start_date) and (end_date is None or bucket <= end_date):
+                per_day.append({"date": bucket, "count": count})
+        elif field_name in summary:
+            entry = summary[field_name]
+            if entry["type"] in COUNTED_TYPES:
+                entry["counts"][bucket] = count
+            elif bucket == "":
+                entry.update(count=count, sum=value, average=value / count)
+    return {"form": form.id, "submissions": total, "per_day": per_day, "fields": summary}
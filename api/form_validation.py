@@ -0,0 +1,104 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from django.conf import settings
+
+VALIDATOR_CACHE_SIZE = getattr(settings, "FORM_VALIDATOR_CACHE_SIZE", 1024)
+REQUIRED_MESSAGE = "This field is required."
+
+
+def _is_number(value):
+    return isinstance(value, int)
+
+
+def _is_email(value):
+    try:
+        return "@" in value
+    except TypeError:
+        return False
+
+
+def _one_of(options):
+    # Membership in a frozenset; unhashable values (lists, dicts) can still
+    # equal an option, so they fall back to the list scan
+    try:
+        lookup = frozenset(options)
+    except TypeError:
+        return lambda value: value in options
+
+    def check(value):
+        try:
+            return value in lookup
+        except TypeError:
+            return value in options
+    return check
+
+
+class FormValidator:
+    # A form layout compiled once: every field becomes (name, required, check,
+    # message) so a submission is validated without re-reading the layout
+    def __init__(self, layout):
+        self.rules = []
+        for field in layout.get("fields", []):
+            field_type = field["type"]
+            check = message = None
+            if field_type == "number":
+                check, message = _is_number, "This field must be a number."
+            elif field_type == "email":
+                check, message = _is_email, "This field must be a valid email."
+            elif field_type == "dropdown":
+                options = field.get("options", [])
+                check, message = _one_of(options), f"Value must be one of {field.get('options')}."
+            self.rules.append((field["field_name"], field.get("required", False), check, message))
+
+    def errors(self, submitted_data):
+        errors = {}
+        for name, required, check, message in self.rules:
+            if name in submitted_data:
+                if check is not None and not check(submitted_data[name]):
+                    errors[name] = message
+            elif required:
+                errors[name] = REQUIRED_MESSAGE
+        return errors
+
+    def validate_many(self, submissions):
+        # Errors per submission, in order; an empty dict means valid
+        errors = self.errors
+        return [errors(submitted_data) for submitted_data in submissions]
+
+
+def layout_hash(layout):
+    return hashlib.sha1(json.dumps(layout, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+class ValidatorCache:
+    # LRU of compiled validators keyed by (form id, layout hash), so an edited
+    # layout gets a new validator and the old one ages out
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, form):
+        # The hash is stored with the form, so a lookup doesn't re-serialise
+        # the layout
+        key = (form.id, form.layout_hash or layout_hash(form.layout))
+        with self._lock:
+            validator = self._entries.get(key)
+            if validator is not None:
+                self._entries.move_to_end(key)
+                return validator
+        validator = FormValidator(form.layout)
+        with self._lock:
+            self._entries[key] = validator
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return validator
+
+
+validator_cache = ValidatorCache(VALIDATOR_CACHE_SIZE)
+
+
+def get_validator(form):
+    return validator_cache.get(form)
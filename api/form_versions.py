@@ -0,0 +1,261 @@
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from api.form_index import index_submissions
+from api.form_stats import record_submissions
+from api.form_validation import layout_hash
+from api import search
+from api.models import Form, FormData, FormLayoutVersion
+
+CHAIN_CACHE_SIZE = getattr(settings, "FORM_MIGRATION_CACHE_SIZE", 1024)
+CAST_TYPES = ("text", "number", "boolean", "list")
+UPGRADE_BATCH_SIZE = 500
+
+# Declarative steps from one layout version to the next, applied in order:
+#   {"op": "rename", "from": "old_name", "to": "new_name"}
+#   {"op": "default", "field": "name", "value": <any>}   when missing or null
+#   {"op": "cast", "field": "name", "to": "text|number|boolean|list"}
+# Casts that don't apply to a value leave it unchanged, so no data is lost.
+
+
+def _to_number(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return value
+    number = float(str(value).strip())
+    return int(number) if number.is_integer() else number
+
+
+def _to_boolean(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value != 0
+    text = str(value).strip().lower()
+    if text in ("true", "yes", "1"):
+        return True
+    if text in ("false", "no", "0", ""):
+        return False
+    raise ValueError(value)
+
+
+def _to_text(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, dict)):
+        raise ValueError(value)
+    return str(value)
+
+
+def _to_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+CASTS = {"text": _to_text, "number": _to_number, "boolean": _to_boolean, "list": _to_list}
+
+
+def _rename(source, target):
+    def step(data):
+        if source in data:
+            data[target] = data.pop(source)
+    return step
+
+
+def _default(field, value):
+    def step(data):
+        if data.get(field) is None:
+            data[field] = value
+    return step
+
+
+def _cast(field, cast):
+    def step(data):
+        value = data.get(field)
+        if value is None:
+            return
+        try:
+            data[field] = cast(value)
+        except (TypeError, ValueError):
+            pass
+    return step
+
+
+def compile_migrations(migrations):
+    # Checks a list of declarative steps and turns it into functions that
+    # update a submission's data in place. Raises ValueError on a bad step.
+    if not isinstance(migrations, list):
+        raise ValueError("migrations must be a list.")
+    steps = []
+    for index, migration in enumerate(migrations):
+        op = migration.get("op") if isinstance(migration, dict) else None
+        if op == "rename" and isinstance(migration.get("from"), str) and isinstance(migration.get("to"), str):
+            steps.append(_rename(migration["from"], migration["to"]))
+        elif op == "default" and isinstance(migration.get("field"), str) and "value" in migration:
+            steps.append(_default(migration["field"], migration["value"]))
+        elif op == "cast" and isinstance(migration.get("field"), str) and migration.get("to") in CAST_TYPES:
+            steps.append(_cast(migration["field"], CASTS[migration["to"]]))
+        else:
+            raise ValueError(f"Invalid migration {index}: expected rename (from, to), default (field, value) "
+                             f"or cast (field, to: {', '.join(CAST_TYPES)}).")
+    return steps
+
+
+class MigrationChainCache:
+    # LRU of the composed steps between two versions of a form. Versions are
+    # immutable, so an entry never goes stale.
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, form_id, from_version, to_version):
+        key = (form_id, from_version, to_version)
+        with self._lock:
+            steps = self._entries.get(key)
+            if steps is not None:
+                self._entries.move_to_end(key)
+                return steps
+        steps = []
+        for migrations in (
+            FormLayoutVersion.objects.filter(form_id=form_id, version__gt=from_version, version__lte=to_version)
+            .order_by("version")
+            .values_list("migrations", flat=True)
+        ):
+            steps.extend(compile_migrations(migrations))
+        steps = tuple(steps)
+        with self._lock:
+            self._entries[key] = steps
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return steps
+
+
+chain_cache = MigrationChainCache(CHAIN_CACHE_SIZE)
+
+
+def upgrade_data(form_id, data, from_version, to_version):
+    # submitted_data of from_version in the shape of to_version. The stored
+    # value is not modified.
+    if from_version >= to_version or not isinstance(data, dict):
+        return data
+    steps = chain_cache.get(form_id, from_version, to_version)
+    if not steps:
+        return data
+    data = dict(data)
+    for step in steps:
+        step(data)
+    return data
+
+
+def current_versions(form_ids):
+    return dict(Form.objects.filter(id__in=set(form_ids)).values_list("id", "layout_version"))
+
+
+def upgrade_rows(rows, versions=None):
+    # In place, for .values() rows with form, submitted_data and layout_version.
+    # versions is an optional {form_id: current version}.
+    if versions is None:
+        versions = current_versions(row["form"] for row in rows)
+    for row in rows:
+        current = versions.get(row["form"], row["layout_version"])
+        if row["layout_version"] < current:
+            row["submitted_data"] = upgrade_data(row["form"], row["submitted_data"], row["layout_version"], current)
+            row["layout_version"] = current
+
+
+def upgraded_data(form_data):
+    # submitted_data of a FormData in the current layout of its form
+    return upgrade_data(form_data.form_id, form_data.submitted_data, form_data.layout_version, form_data.form.layout_version)
+
+
+def publish_layout(form, layout, migrations, user=None):
+    # Makes layout the form's current layout as a new version, reached from
+    # the previous one by migrations. Stored submissions are not rewritten:
+    # reads upgrade them (upgrade_rows, upgraded_data), but field filters and
+    # summaries use the index and summary rows, which only follow a rename or
+    # cast once the upgrade_form_data command has rewritten the submissions.
+    compile_migrations(migrations)
+    now = timezone.now()
+    with transaction.atomic():
+        # The row lock serialises concurrent publishes of the same form
+        current = Form.objects.select_for_update().values_list("layout_version", flat=True).get(id=form.id)
+        version = FormLayoutVersion.objects.create(
+            form=form,
+            version=current + 1,
+            layout=layout,
+            layout_hash=layout_hash(layout),
+            migrations=migrations,
+            create_by=user,
+            create_date=now,
+        )
+        form.layout = layout
+        form.layout_version = version.version
+        form.update_date = now
+        if user is not None:
+            form.update_by = user
+        form.save()
+    return version
+
+
+def sync_layout_version(form):
+    # For layouts saved without publish_layout (admin, shell): records the saved
+    # layout as a version, with no migrations if it differs from the current one
+    current = FormLayoutVersion.objects.filter(form_id=form.id, version=form.layout_version).values_list(
+        "layout_hash", flat=True
+    ).first()
+    if current == form.layout_hash:
+        return
+    if current is None:
+        version = form.layout_version
+    else:
+        version = form.layout_version + 1
+        Form.objects.filter(id=form.id).update(layout_version=version)
+        form.layout_version = version
+    FormLayoutVersion.objects.create(
+        form_id=form.id,
+        version=version,
+        layout=form.layout,
+        layout_hash=form.layout_hash,
+        create_by_id=form.update_by_id,
+        create_date=timezone.now(),
+    )
+
+
+def upgrade_form(form, batch_size=UPGRADE_BATCH_SIZE):
+    # Rewrites the submissions of a form stored in older layout versions, in
+    # id order and one short transaction per batch, and updates their index
+    # rows and summaries. Yields the number of submissions done so far.
+    layouts = {form.id: form.layout}
+    # Each submission is taken out of the summaries as its own version counted it
+    old_layouts = dict(FormLayoutVersion.objects.filter(form=form).values_list("version", "layout"))
+    last_id, done = 0, 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                FormData.objects.select_for_update()
+                .filter(form=form, layout_version__lt=form.layout_version, id__gt=last_id)
+                .order_by("id")
+                .only("id", "company_id", "form_id", "submitted_data", "layout_version", "create_date")[:batch_size]
+            )
+            if not batch:
+                return
+            previous = {}
+            for s in batch:
+                previous.setdefault(s.layout_version, []).append(
+                    FormData(form_id=s.form_id, submitted_data=s.submitted_data, create_date=s.create_date)
+                )
+            for s in batch:
+                s.submitted_data = upgrade_data(form.id, s.submitted_data, s.layout_version, form.layout_version)
+                s.layout_version = form.layout_version
+            FormData.objects.bulk_update(batch, ["submitted_data", "layout_version"])
+            index_submissions(batch, layouts)
+            search.index_form_data(batch)
+            for old_version, submissions in previous.items():
+                record_submissions(submissions, {form.id: old_layouts.get(old_version, form.layout)}, sign=-1)
+            record_submissions(batch, layouts)
+        last_id = batch[-1].id
+        done += len(batch)
+        yield done
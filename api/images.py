@@ -0,0 +1,187 @@
+import base64
+import binascii
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from django.conf import settings
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+# Thumbnail sizes (longest edge in px) served for user photos
+THUMBNAIL_SIZES = getattr(settings, "PHOTO_THUMBNAIL_SIZES", (64, 256))
+THUMBNAIL_DIR = os.path.join(settings.MEDIA_ROOT, "thumbnails")
+
+# Upload limits for base64 photo uploads
+MAX_UPLOAD_BYTES = getattr(settings, "PHOTO_UPLOAD_MAX_BYTES", 10 * 1024 * 1024)
+MAX_UPLOAD_PIXELS = getattr(settings, "PHOTO_UPLOAD_MAX_PIXELS", 40_000_000)
+INGEST_WORKERS = getattr(settings, "PHOTO_INGEST_WORKERS", 2)
+# Size of the form file previews rendered by the media workers (api.media).
+# They are kept apart from the public user photo thumbnails and only served
+# to the file's company (views.photos.form_file_preview).
+PREVIEW_SIZE = getattr(settings, "MEDIA_PREVIEW_SIZE", max(THUMBNAIL_SIZES))
+PREVIEW_DIR = os.path.join(settings.MEDIA_ROOT, "previews")
+
+_ingest_pool = None
+
+
+class ImageRejected(ValueError):
+    pass
+
+
+def file_digest(path):
+    # Cache the content hash per (path, mtime, size) so a file is only hashed
+    # again when it actually changes on disk
+    return _file_digest(path, *_stat_key(path))
+
+
+@lru_cache(maxsize=4096)
+def _file_digest(path, mtime_ns, size):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def thumbnail_path(digest, size):
+    return os.path.join(THUMBNAIL_DIR, f"{digest}_{size}.jpg")
+
+
+def preview_path(digest):
+    return os.path.join(PREVIEW_DIR, f"{digest}_{PREVIEW_SIZE}.jpg")
+
+
+def render_thumbnail(src_path, dest_path, size):
+    # Plain PIL work with no Django dependencies, so it can also run in a worker process
+    with Image.open(src_path) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+        image.save(tmp_path, format="JPEG", quality=85)
+    os.replace(tmp_path, dest_path)
+
+
+def get_thumbnail(src_path, size):
+    # Derivatives are keyed by content hash and generated once on disk
+    if size not in THUMBNAIL_SIZES:
+        raise ValueError(f"Unsupported thumbnail size {size}.")
+    digest = file_digest(src_path)
+    path = thumbnail_path(digest, size)
+    if not os.path.exists(path):
+        render_thumbnail(src_path, path, size)
+    return digest, path
+
+
+@lru_cache(maxsize=2048)
+def _thumbnail_data_uri(digest, size):
+    with open(thumbnail_path(digest, size), "rb") as f:
+        return f"data:image/jpeg;base64,{base64.b64encode(f.read()).decode('utf-8')}"
+
+
+def photo_data_uri(src_path, size):
+    digest, _ = get_thumbnail(src_path, size)
+    return _thumbnail_data_uri(digest, size)
+
+
+def photo_url(src_path, size, request=None):
+    digest, _ = get_thumbnail(src_path, size)
+    return thumbnail_url(digest, size, request)
+
+
+def thumbnail_url(digest, size, request=None):
+    url = reverse("user_photo", args=[digest, size])
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def preview_url(form_file_id, digest, request=None):
+    # None until the media workers have rendered the file's preview
+    if not digest:
+        return None
+    url = reverse("form_file_preview", args=[form_file_id])
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def decode_base64_capped(data, max_bytes=MAX_UPLOAD_BYTES, chunk_chars=65536):
+    # Decode in 4-aligned chunks and stop as soon as the cap is exceeded, so an
+    # oversized upload is rejected before it is fully decoded
+    if any(c.isspace() for c in data[:80]) or any(c.isspace() for c in data[-80:]):
+        data = "".join(data.split())
+    if len(data) // 4 * 3 > max_bytes + 3:
+        raise ImageRejected(f"Image must be at most {max_bytes} bytes.")
+    out = BytesIO()
+    try:
+        for start in range(0, len(data), chunk_chars):
+            out.write(base64.b64decode(data[start:start + chunk_chars], validate=True))
+            if out.tell() > max_bytes:
+                raise ImageRejected(f"Image must be at most {max_bytes} bytes.")
+    except binascii.Error:
+        raise ImageRejected("Invalid base64 image data.")
+    return out.getvalue()
+
+
+def inspect_image(img_data, max_pixels=MAX_UPLOAD_PIXELS):
+    # Only reads the header: the pixel count is checked before anything is decoded
+    try:
+        with Image.open(BytesIO(img_data)) as image:
+            width, height = image.size
+            image_format = image.format
+    except (Image.DecompressionBombError, OSError, SyntaxError):
+        raise ImageRejected("Upload a valid image.")
+    if width * height > max_pixels:
+        raise ImageRejected(f"Image must be at most {max_pixels} pixels.")
+    return image_format, width, height
+
+
+def transcode_photo(path, sizes):
+    # Runs in the ingest pool: rewrite the stored original as an EXIF-free JPEG and
+    # pre-render its thumbnails
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        image.save(tmp_path, format="JPEG", quality=90)
+    os.replace(tmp_path, path)
+    digest = _file_digest(path, *_stat_key(path))
+    for size in sizes:
+        render_thumbnail(path, thumbnail_path(digest, size), size)
+    return digest
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _ingest_done(future):
+    error = future.exception()
+    if error is not None:
+        print(f"Error processing uploaded photo: {str(error)}")
+
+
+def schedule_photo_ingest(path):
+    global _ingest_pool
+    if _ingest_pool is None:
+        _ingest_pool = ProcessPoolExecutor(max_workers=INGEST_WORKERS)
+    future = _ingest_pool.submit(transcode_photo, path, tuple(THUMBNAIL_SIZES))
+    future.add_done_callback(_ingest_done)
+    return future
+
+
+def photo_context(request, default="thumb"):
+    # Serializer context for Base64ImageField, e.g. ?photo=url&photo_size=256
+    mode = request.query_params.get("photo", default)
+    try:
+        size = int(request.query_params.get("photo_size", 0)) or None
+    except ValueError:
+        size = None
+    return {"request": request, "photo": mode, "photo_size": size}
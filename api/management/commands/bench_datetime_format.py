@@ -0,0 +1,42 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.management.base import BaseCommand
+from django.utils.timezone import localtime
+from api.datetimes import DISPLAY_FORMAT, get_formatter
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark of datetime formatting for bulk serialization."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--fields", type=int, default=4)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, fields, repeat = options["rows"], options["fields"], options["repeat"]
+        base = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        values = [
+            base + timedelta(minutes=random.randint(0, 60 * 24 * 365 * 3))
+            for _ in range(rows * fields)
+        ]
+
+        def per_value():
+            return [localtime(value).strftime(DISPLAY_FORMAT) for value in values]
+
+        def batched():
+            return get_formatter().format_many(values)
+
+        if per_value() != batched():
+            self.stderr.write("Formatted output differs between implementations.")
+            return
+
+        for label, func in (("localtime+strftime", per_value), ("batched formatter", batched)):
+            best = min(self._timed(func) for _ in range(repeat))
+            self.stdout.write(f"{label:<20} {best * 1000:8.1f} ms for {rows} rows x {fields} fields")
+
+    def _timed(self, func):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.form_index import INDEX_BATCH_SIZE, reindex_form
+from api.models import Form
+
+
+class Command(BaseCommand):
+    help = "Builds the field value index of existing form submissions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--form", type=int, action="append", help="Only this form (repeatable).")
+        parser.add_argument("--batch", type=int, default=INDEX_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        forms = Form.objects.order_by("id")
+        if options["form"]:
+            forms = forms.filter(id__in=options["form"])
+            if not forms.exists():
+                raise CommandError("No such form.")
+        for form in forms.iterator():
+            done = 0
+            for done in reindex_form(form, options["batch"]):
+                self.stdout.write(f"Form {form.id}: {done} submissions indexed", ending="\r")
+            self.stdout.write(f"Form {form.id}: {done} submissions indexed")
@@ -0,0 +1,57 @@
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from api import media
+
+
+class Command(BaseCommand):
+    help = "Makes previews and durations of uploaded form files until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=media.MEDIA_WORKERS,
+                            help="Worker processes for thumbnails and ffmpeg.")
+        parser.add_argument("--batch", type=int, default=0,
+                            help="Jobs claimed at a time (default: twice the workers).")
+        parser.add_argument("--poll", type=int, default=5, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Stop once the queue is empty.")
+
+    def handle(self, *args, **options):
+        stopped = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+        batch = options["batch"] or options["workers"] * 2
+        done = failed = 0
+        try:
+            with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+                while not stopped.is_set():
+                    try:
+                        jobs = media.claim_jobs(batch)
+                        if not jobs:
+                            if options["once"]:
+                                break
+                            stopped.wait(options["poll"])
+                            continue
+                        futures = {}
+                        for job in jobs:
+                            task = media.job_task(job)
+                            result = media.stored_result(job.form_file) if task is not None else None
+                            if task is None or result is not None:
+                                # Nothing to render, or already rendered for the same content
+                                media.finish_job(job, result)
+                                done += 1
+                            else:
+                                futures[job] = pool.submit(media.process_file, *task)
+                        for job, future in futures.items():
+                            try:
+                                media.finish_job(job, future.result())
+                                done += 1
+                            except Exception as e:
+                                media.fail_job(job, e)
+                                failed += 1
+                                self.stderr.write(f"Error processing form file {job.form_file_id}: {str(e)}")
+                    finally:
+                        close_old_connections()
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Processed {done} media jobs, {failed} failed.")
@@ -0,0 +1,25 @@
+import os
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.models import UploadSession
+from api.views.uploads import part_path
+
+
+class Command(BaseCommand):
+    help = "Deletes upload sessions (and their partial files) not touched for a while."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=48)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["hours"])
+        sessions = UploadSession.objects.filter(update_date__lt=cutoff)
+        removed = 0
+        for session in sessions.only("id").iterator():
+            path = part_path(session)
+            if os.path.exists(path):
+                os.remove(path)
+            removed += 1
+        sessions.delete()
+        self.stdout.write(f"Removed {removed} upload sessions.")
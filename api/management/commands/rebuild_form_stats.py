@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.form_stats import REBUILD_BATCH_SIZE, rebuild_form
+from api.models import Form
+
+
+class Command(BaseCommand):
+    help = "Recomputes the per-form submission summaries from the submissions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--form", type=int, action="append", help="Only this form (repeatable).")
+        parser.add_argument("--batch", type=int, default=REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        forms = Form.objects.order_by("id")
+        if options["form"]:
+            forms = forms.filter(id__in=options["form"])
+            if not forms.exists():
+                raise CommandError("No such form.")
+        for form in forms.iterator():
+            buckets = rebuild_form(form, options["batch"])
+            self.stdout.write(f"Form {form.id}: {buckets} buckets")
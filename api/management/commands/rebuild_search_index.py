@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from api import search
+from api.models import Calendar, FormData
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the search index of form submissions and events."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", choices=("submissions", "events"))
+        parser.add_argument("--batch", type=int, default=search.INDEX_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        sources = [
+            ("submissions", search.SUBMISSION, FormData.objects.only("id", "company_id", "submitted_data")),
+            ("events", search.EVENT, Calendar.objects.only("id", "company_id", "name", "description")),
+        ]
+        for label, kind, queryset in sources:
+            if options["only"] not in (None, label):
+                continue
+            done = 0
+            for done in search.rebuild(kind, queryset, options["batch"]):
+                self.stdout.write(f"{done} {label} indexed", ending="\r")
+            self.stdout.write(f"{done} {label} indexed")
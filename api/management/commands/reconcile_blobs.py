@@ -0,0 +1,31 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from api.models import FormFile, StoredBlob
+from api.storage import form_file_storage
+
+
+class Command(BaseCommand):
+    help = "Recounts references to stored form file contents and removes unreferenced ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-hours", type=int, default=24,
+                            help="Keep unreferenced contents this recent (uploads still being attached).")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["grace_hours"])
+        fixed = removed = 0
+        for sha256 in StoredBlob.objects.order_by("sha256").values_list("sha256", flat=True).iterator(chunk_size=1000):
+            # Counted under the row lock that saving the same content takes
+            with transaction.atomic():
+                blob = StoredBlob.objects.select_for_update().filter(sha256=sha256).first()
+                if blob is None:
+                    continue
+                refcount = FormFile.objects.filter(file=blob.name).count()
+                if refcount != blob.refcount:
+                    StoredBlob.objects.filter(sha256=sha256).update(refcount=refcount)
+                    fixed += 1
+                if refcount == 0 and blob.create_date < cutoff and form_file_storage.remove_unreferenced(sha256):
+                    removed += 1
+        self.stdout.write(f"Fixed {fixed} reference counts, removed {removed} unreferenced files.")
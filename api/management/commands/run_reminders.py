@@ -0,0 +1,36 @@
+import signal
+import threading
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from api import reminders
+
+
+class Command(BaseCommand):
+    help = "Runs the event reminder scheduler until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll", type=int, default=reminders.REMINDER_POLL_SECONDS,
+                            help="Seconds between checks for events changed by the API and for retries.")
+
+    def handle(self, *args, **options):
+        stopped = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+        scheduler = reminders.start()
+        self.stdout.write(f"Reminder scheduler started with {scheduler.pending} pending reminders.")
+        try:
+            # The API runs in other processes, so its edits are picked up by
+            # polling Calendar.update_date rather than through the view hooks
+            while not stopped.wait(options["poll"]):
+                try:
+                    scheduler.poll_changes()
+                    scheduler.retry_due()
+                    reminders.prune_deliveries(scheduler.clock())
+                except Exception as e:
+                    self.stderr.write(f"Error polling event changes: {str(e)}")
+                finally:
+                    close_old_connections()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            reminders.stop()
+        self.stdout.write("Reminder scheduler stopped.")
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from api.form_versions import UPGRADE_BATCH_SIZE, upgrade_form
+from api.models import Form
+
+
+class Command(BaseCommand):
+    help = "Rewrites form submissions stored in older layout versions into the current one."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--form", type=int, action="append", help="Only this form (repeatable).")
+        parser.add_argument("--batch", type=int, default=UPGRADE_BATCH_SIZE)
+        parser.add_argument("--pause", type=float, default=0.5,
+                            help="Seconds to sleep between batches, to leave the database to the API.")
+
+    def handle(self, *args, **options):
+        forms = Form.objects.order_by("id")
+        if options["form"]:
+            forms = forms.filter(id__in=options["form"])
+            if not forms.exists():
+                raise CommandError("No such form.")
+        for form in forms.iterator():
+            done = 0
+            for done in upgrade_form(form, options["batch"]):
+                self.stdout.write(f"Form {form.id}: {done} submissions upgraded", ending="\r")
+                time.sleep(options["pause"])
+            self.stdout.write(f"Form {form.id}: {done} submissions upgraded to version {form.layout_version}")
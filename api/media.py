@@ -0,0 +1,174 @@
+import json
+import mimetypes
+import os
+import shutil
+import subprocess
+import tempfile
+import wave
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from api.images import PREVIEW_SIZE, _file_digest, _stat_key, preview_path, render_thumbnail
+from api.models import FormFile, MediaJob
+
+MEDIA_WORKERS = getattr(settings, "MEDIA_WORKERS", 2)
+MEDIA_MAX_ATTEMPTS = getattr(settings, "MEDIA_MAX_ATTEMPTS", 3)
+# A job still running after this long is assumed lost with its worker
+MEDIA_JOB_TIMEOUT = timedelta(seconds=getattr(settings, "MEDIA_JOB_TIMEOUT_SECONDS", 600))
+FFMPEG_TIMEOUT = 120
+
+# Multipart key prefixes used by the apps, for files whose name has no known type
+FILE_TYPE_KINDS = {"photo": "image", "image": "image", "video": "video", "audio": "audio"}
+
+
+def media_kind(name, file_type):
+    mime, _ = mimetypes.guess_type(name)
+    if mime:
+        kind = mime.split("/")[0]
+        if kind in ("image", "video", "audio"):
+            return kind
+    return FILE_TYPE_KINDS.get(file_type.lower())
+
+
+# Worker side: plain functions on file paths, run in a process pool
+
+
+def _probe_duration(path):
+    if shutil.which("ffprobe") is None:
+        raise RuntimeError("ffprobe is not installed.")
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", path],
+        capture_output=True, check=True, timeout=FFMPEG_TIMEOUT,
+    ).stdout
+    duration = json.loads(output).get("format", {}).get("duration")
+    return float(duration) if duration not in (None, "N/A") else None
+
+
+def _audio_duration(path):
+    # WAV files are read directly; anything else needs ffprobe
+    try:
+        with wave.open(path, "rb") as audio:
+            return audio.getnframes() / float(audio.getframerate())
+    except (wave.Error, EOFError):
+        return _probe_duration(path)
+
+
+def _render_preview(src_path, digest):
+    dest = preview_path(digest)
+    if not os.path.exists(dest):
+        render_thumbnail(src_path, dest, PREVIEW_SIZE)
+
+
+def process_image(path):
+    digest = _file_digest(path, *_stat_key(path))
+    _render_preview(path, digest)
+    return {"preview": digest, "duration": None}
+
+
+def process_video(path):
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("ffmpeg is not installed.")
+    duration = _probe_duration(path)
+    # The preview is keyed by the video's own content hash
+    digest = _file_digest(path, *_stat_key(path))
+    if os.path.exists(preview_path(digest)):
+        return {"preview": digest, "duration": duration}
+    # Poster frame one second in, or the first frame of very short clips
+    offset = "1" if duration is None or duration > 1 else "0"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        poster = os.path.join(temp_dir, "poster.jpg")
+        subprocess.run(
+            ["ffmpeg", "-v", "error", "-y", "-ss", offset, "-i", path, "-frames:v", "1", poster],
+            capture_output=True, check=True, timeout=FFMPEG_TIMEOUT,
+        )
+        _render_preview(poster, digest)
+    return {"preview": digest, "duration": duration}
+
+
+def process_audio(path):
+    return {"preview": "", "duration": _audio_duration(path)}
+
+
+PROCESSORS = {"image": process_image, "video": process_video, "audio": process_audio}
+
+
+def process_file(path, kind):
+    return PROCESSORS[kind](path)
+
+
+# Queue side: job rows in the database
+
+
+def enqueue(form_files):
+    now = timezone.now()
+    MediaJob.objects.bulk_create(
+        [MediaJob(form_file_id=form_file.id, run_after=now, create_date=now, update_date=now) for form_file in form_files],
+        batch_size=500,
+    )
+
+
+def enqueue_for_submissions(submission_ids):
+    # For bulk inserts, whose FormFile ids aren't returned on every backend
+    enqueue(FormFile.objects.filter(form_submission_id__in=list(submission_ids), media_jobs__isnull=True).only("id"))
+
+
+def claim_jobs(limit):
+    # Marks up to `limit` due jobs as running. Rows locked by another worker are
+    # skipped; running jobs whose worker died are picked up again after the timeout.
+    now = timezone.now()
+    with transaction.atomic():
+        due = (
+            MediaJob.objects.select_for_update(skip_locked=True)
+            .filter(status__in=['PEND', 'RUNN'], run_after__lte=now)
+            .order_by('run_after', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        ids = list(due)
+        MediaJob.objects.filter(id__in=ids).update(
+            status='RUNN', attempts=F('attempts') + 1, run_after=now + MEDIA_JOB_TIMEOUT, update_date=now
+        )
+    return list(MediaJob.objects.filter(id__in=ids).select_related('form_file'))
+
+
+def stored_result(form_file):
+    # Identical content is stored once, so a file already processed under the
+    # same name gives the result without running the worker again
+    return (
+        FormFile.objects.filter(file=form_file.file.name)
+        .exclude(id=form_file.id)
+        .filter(~Q(preview="") | Q(duration__isnull=False))
+        .values("preview", "duration")
+        .first()
+    )
+
+
+def job_task(job):
+    # (path, kind) for the worker pool, or None when there is nothing to do
+    form_file = job.form_file
+    if not form_file.file:
+        return None
+    kind = media_kind(form_file.file.name, form_file.file_type)
+    if kind is None:
+        return None
+    return form_file.file.path, kind
+
+
+def finish_job(job, result):
+    now = timezone.now()
+    with transaction.atomic():
+        if result is not None:
+            FormFile.objects.filter(id=job.form_file_id).update(preview=result["preview"], duration=result["duration"])
+        MediaJob.objects.filter(id=job.id).update(status='DONE', error="", update_date=now)
+
+
+def fail_job(job, error):
+    # Retried with a growing delay, then left as failed
+    now = timezone.now()
+    if job.attempts >= MEDIA_MAX_ATTEMPTS:
+        MediaJob.objects.filter(id=job.id).update(status='FAIL', error=str(error)[:2000], update_date=now)
+    else:
+        MediaJob.objects.filter(id=job.id).update(
+            status='PEND', error=str(error)[:2000], run_after=now + timedelta(minutes=2 ** job.attempts), update_date=now
+        )
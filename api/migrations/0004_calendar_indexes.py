@@ -0,0 +1,47 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_alter_otp_mobile_number'),
+    ]
+
+    operations = [
+        # api_calendar_users already exists as the auto-created M2M table, so the
+        # explicit through model is only introduced in the migration state
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='CalendarAttendee',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('calendar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.calendar')),
+                        ('customuser', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'api_calendar_users',
+                        'unique_together': {('calendar', 'customuser')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='calendar',
+                    name='users',
+                    field=models.ManyToManyField(related_name='attending_events', through='api.CalendarAttendee', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+            database_operations=[],
+        ),
+        migrations.AddIndex(
+            model_name='calendar',
+            index=models.Index(fields=['company', 'start_time'], name='calendar_company_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calendarattendee',
+            index=models.Index(fields=['customuser', 'calendar'], name='attendee_user_calendar_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_calendar_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarOverride',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_start', models.DateTimeField()),
+                ('is_cancelled', models.BooleanField(default=False)),
+                ('start_time', models.DateTimeField(blank=True, null=True)),
+                ('end_time', models.DateTimeField(blank=True, null=True)),
+                ('name', models.CharField(blank=True, max_length=25, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='overrides', to='api.calendar')),
+            ],
+            options={
+                'unique_together': {('event', 'original_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_calendaroverride'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calendar',
+            index=models.Index(fields=['end_time', 'start_time'], name='calendar_end_start_idx'),
+        ),
+    ]
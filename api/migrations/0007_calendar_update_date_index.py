@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_calendar_overlap_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calendar',
+            index=models.Index(fields=['update_date'], name='calendar_update_date_idx'),
+        ),
+    ]
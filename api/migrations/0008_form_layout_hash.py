@@ -0,0 +1,27 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:11
+
+from django.db import migrations, models
+
+
+def fill_layout_hash(apps, schema_editor):
+    from api.form_validation import layout_hash
+
+    Form = apps.get_model('api', 'Form')
+    for form in Form.objects.only('id', 'layout').iterator(chunk_size=500):
+        Form.objects.filter(id=form.id).update(layout_hash=layout_hash(form.layout))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_calendar_update_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='layout_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.RunPython(fill_layout_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_form_layout_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formdata',
+            name='client_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='formdata',
+            constraint=models.UniqueConstraint(fields=('create_by', 'client_id'), name='formdata_client_id_unique'),
+        ),
+    ]
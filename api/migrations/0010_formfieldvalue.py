@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_formdata_client_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormFieldValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_name', models.CharField(max_length=100)),
+                ('value_text', models.CharField(blank=True, max_length=255, null=True)),
+                ('value_number', models.FloatField(blank=True, null=True)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='field_values', to='api.form')),
+                ('form_data', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='field_values', to='api.formdata')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['form', 'field_name', 'value_text'], name='fieldvalue_text_idx'), models.Index(fields=['form', 'field_name', 'value_number'], name='fieldvalue_number_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_formfieldvalue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormFieldStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_name', models.CharField(blank=True, max_length=100)),
+                ('bucket', models.CharField(blank=True, max_length=255)),
+                ('count', models.BigIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='field_stats', to='api.form')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('form', 'field_name', 'bucket'), name='fieldstat_bucket_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:18
+
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField(default=0)),
+                ('refcount', models.IntegerField(default=0)),
+                ('create_date', models.DateTimeField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='formfile',
+            name='file',
+            field=models.FileField(db_index=True, storage=api.storage.get_form_file_storage, upload_to=''),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_storedblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formfile',
+            name='duration',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='formfile',
+            name='preview',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.CreateModel(
+            name='MediaJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PEND', 'Pending'), ('RUNN', 'Running'), ('DONE', 'Done'), ('FAIL', 'Failed')], default='PEND', max_length=4)),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('run_after', models.DateTimeField()),
+                ('create_date', models.DateTimeField()),
+                ('update_date', models.DateTimeField()),
+                ('form_file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='media_jobs', to='api.formfile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='mediajob_status_run_idx')],
+            },
+        ),
+    ]
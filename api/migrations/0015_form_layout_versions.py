@@ -0,0 +1,61 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_first_versions(apps, schema_editor):
+    # Every existing form starts at version 1 with its current layout; all
+    # existing submissions are pinned to it by the field default
+    from django.utils import timezone
+
+    Form = apps.get_model('api', 'Form')
+    FormLayoutVersion = apps.get_model('api', 'FormLayoutVersion')
+    now = timezone.now()
+    batch = []
+    for form in Form.objects.only('id', 'layout', 'layout_hash').iterator(chunk_size=500):
+        batch.append(FormLayoutVersion(
+            form_id=form.id, version=1, layout=form.layout, layout_hash=form.layout_hash, create_date=now,
+        ))
+        if len(batch) >= 500:
+            FormLayoutVersion.objects.bulk_create(batch)
+            batch = []
+    FormLayoutVersion.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_media_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='layout_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='formdata',
+            name='layout_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.CreateModel(
+            name='FormLayoutVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('layout', models.JSONField()),
+                ('layout_hash', models.CharField(blank=True, default='', max_length=40)),
+                ('migrations', models.JSONField(blank=True, default=list)),
+                ('create_date', models.DateTimeField()),
+                ('create_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='layout_versions', to='api.form')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('form', 'version'), name='formlayoutversion_unique')],
+            },
+        ),
+        migrations.RunPython(create_first_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_form_layout_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('FORM', 'Submission'), ('EVNT', 'Event')], max_length=4)),
+                ('object_id', models.BigIntegerField()),
+                ('term', models.CharField(max_length=40)),
+                ('weight', models.IntegerField(default=1)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.company')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'term', 'object_id'], name='searchterm_lookup_idx'), models.Index(fields=['kind', 'object_id'], name='searchterm_object_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_search_terms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='update_date',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
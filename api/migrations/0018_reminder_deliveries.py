@@ -0,0 +1,34 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_customuser_update_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occurrence_start', models.DateTimeField()),
+                ('minutes_before', models.IntegerField()),
+                ('sink', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('PEND', 'Pending'), ('RUNN', 'Running'), ('DONE', 'Done'), ('FAIL', 'Failed')], default='PEND', max_length=4)),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('run_after', models.DateTimeField()),
+                ('create_date', models.DateTimeField()),
+                ('update_date', models.DateTimeField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminder_deliveries', to='api.calendar')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='reminder_status_run_idx')],
+                'constraints': [models.UniqueConstraint(fields=('event', 'occurrence_start', 'minutes_before', 'sink'), name='reminder_delivery_unique')],
+            },
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils.translation import gettext_lazy as GL
 from django.utils.timezone import now
+import uuid
+from api.storage import get_form_file_storage
 from datetime import timedelta
 
 def default_expiry():
@@ -58,6 +60,9 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     company = models.ForeignKey(Company, on_delete=models.SET_NULL, related_name="custom_user", null=True, blank=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Moves on every save except save(update_fields=[...]) without it, such as
+    # the login's last_login update (api.caching)
+    update_date = models.DateTimeField(auto_now=True)
     
     objects = CustomUserManager()
 
@@ -71,6 +76,10 @@ class Form(models.Model):
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="forms", null=True, blank=True)
     name = models.CharField(max_length=50, blank=False, null=False)
     layout = models.JSONField(blank=False, null=False)
+    # sha1 of the canonical layout JSON, kept up to date on save (api.signals)
+    layout_hash = models.CharField(max_length=40, blank=True, default="", editable=False)
+    # Number of the FormLayoutVersion holding the current layout
+    layout_version = models.PositiveIntegerField(default=1, editable=False)
     create_by = models.ForeignKey("CustomUser", on_delete=models.CASCADE, related_name="created_forms")
     create_date = models.DateTimeField(blank=False, null=False)
     update_by = models.ForeignKey("CustomUser", on_delete=models.CASCADE, related_name="updated_forms")
@@ -79,11 +88,46 @@ class Form(models.Model):
     def __str__(self):
         return self.name
 
+class FormLayoutVersion(models.Model):
+    # An immutable past or current layout of a form. migrations are the steps
+    # (api.form_versions) that bring data of the previous version to this one.
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name="layout_versions")
+    version = models.PositiveIntegerField()
+    layout = models.JSONField()
+    layout_hash = models.CharField(max_length=40, blank=True, default="")
+    migrations = models.JSONField(default=list, blank=True)
+    create_by = models.ForeignKey("CustomUser", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    create_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['form', 'version'], name='formlayoutversion_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.form.name} v{self.version}"
+
+class StoredBlob(models.Model):
+    # One stored file content in the content-addressed FormFile storage
+    # (api.storage), with the number of FormFiles referring to it
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+    create_date = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
+
 class FormFile(models.Model):
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="form_files", null=True, blank=True)
-    file = models.FileField()
+    file = models.FileField(storage=get_form_file_storage, db_index=True)
     file_type = models.CharField(max_length=20)  # Store file type (image, audio, video)
     form_submission = models.ForeignKey("FormData", on_delete=models.CASCADE, related_name='files')
+    # Filled in by the media workers (api.media): digest of the preview
+    # thumbnails (images and video posters) and the length of audio and video
+    preview = models.CharField(max_length=40, blank=True, default="")
+    duration = models.FloatField(blank=True, null=True)
 
     def __str__(self):
         return f"{self.file_type} file for {self.form_submission.form.name}"
@@ -92,14 +136,131 @@ class FormData(models.Model):
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="form_data", null=True, blank=True)
     form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='submissions')
     submitted_data = models.JSONField()  # Store as a JSON field
+    # Id generated by an offline client, so replayed submissions are not duplicated
+    client_id = models.CharField(max_length=64, blank=True, null=True)
+    # Layout version submitted_data is stored in; older rows are upgraded when
+    # read and rewritten by `manage.py upgrade_form_data`
+    layout_version = models.PositiveIntegerField(default=1)
     create_by = models.ForeignKey("CustomUser", on_delete=models.CASCADE, related_name="created_data")
     create_date = models.DateTimeField()
     update_by = models.ForeignKey("CustomUser", on_delete=models.CASCADE, related_name="updated_data")
     update_date = models.DateTimeField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['create_by', 'client_id'], name='formdata_client_id_unique'),
+        ]
+
     def __str__(self):
         return f"Submission for {self.form.name}"
     
+class MediaJob(models.Model):
+    # Work queue for the media workers (manage.py process_media)
+    STATUS_CHOICES = [
+        ('PEND', 'Pending'),
+        ('RUNN', 'Running'),
+        ('DONE', 'Done'),
+        ('FAIL', 'Failed'),
+    ]
+
+    form_file = models.ForeignKey(FormFile, on_delete=models.CASCADE, related_name="media_jobs")
+    status = models.CharField(max_length=4, choices=STATUS_CHOICES, default='PEND')
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    run_after = models.DateTimeField()
+    create_date = models.DateTimeField()
+    update_date = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='mediajob_status_run_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_status_display()} media job for file {self.form_file_id}"
+
+class UploadSession(models.Model):
+    # A FormFile being uploaded in chunks (api.views.uploads); the bytes received
+    # so far are in a temporary file named after the session id
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    form_submission = models.ForeignKey(FormData, on_delete=models.CASCADE, related_name="upload_sessions")
+    filename = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=20)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True, default="")
+    form_file = models.ForeignKey(FormFile, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    create_by = models.ForeignKey("CustomUser", on_delete=models.CASCADE, related_name="upload_sessions")
+    create_date = models.DateTimeField()
+    update_date = models.DateTimeField()
+
+    def __str__(self):
+        return f"Upload of {self.filename} ({self.received}/{self.size})"
+
+class FormFieldValue(models.Model):
+    # Typed copy of the declared layout fields of each submission, so
+    # submissions can be filtered by field value through an index
+    # (maintained by api.form_index)
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name="field_values")
+    form_data = models.ForeignKey(FormData, on_delete=models.CASCADE, related_name="field_values")
+    field_name = models.CharField(max_length=100)
+    value_text = models.CharField(max_length=255, blank=True, null=True)
+    value_number = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['form', 'field_name', 'value_text'], name='fieldvalue_text_idx'),
+            models.Index(fields=['form', 'field_name', 'value_number'], name='fieldvalue_number_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.field_name} of submission {self.form_data_id}"
+
+class FormFieldStat(models.Model):
+    # Running totals per (form, field, bucket), kept up to date as submissions
+    # are written (api.form_stats). Dropdown answers are counted per option in
+    # bucket; number fields keep count and total in the "" bucket; the
+    # submissions per day use field_name "" with the date as bucket.
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name="field_stats")
+    field_name = models.CharField(max_length=100, blank=True)
+    bucket = models.CharField(max_length=255, blank=True)
+    count = models.BigIntegerField(default=0)
+    total = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['form', 'field_name', 'bucket'], name='fieldstat_bucket_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.field_name or 'submissions'} [{self.bucket}] of form {self.form_id}"
+
+class SearchTerm(models.Model):
+    # Inverted index for search (api.search): one row per distinct word of an
+    # indexed submission or event, weighted by where and how often it occurs
+    KIND_CHOICES = [
+        ('FORM', 'Submission'),
+        ('EVNT', 'Event'),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="+", null=True, blank=True)
+    kind = models.CharField(max_length=4, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    term = models.CharField(max_length=40)
+    weight = models.IntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Postings of a term or a prefix, newest first, and membership of
+            # given objects in them
+            models.Index(fields=['company', 'term', 'object_id'], name='searchterm_lookup_idx'),
+            # Replacing the terms of one object when it is saved again
+            models.Index(fields=['kind', 'object_id'], name='searchterm_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} in {self.get_kind_display().lower()} {self.object_id}"
+
 class Calendar(models.Model):
     RECURRING_CHOICES = [
         ('NONE', 'None'),
@@ -144,12 +305,84 @@ class Calendar(models.Model):
     location = models.URLField(blank=True, null=True)
     meeting_url =  models.URLField(blank=True, null=True)
     recurrence = models.CharField(max_length=10, choices=RECURRING_CHOICES, default='none')
-    users = models.ManyToManyField('CustomUser', related_name='attending_events')
+    users = models.ManyToManyField('CustomUser', related_name='attending_events', through='CalendarAttendee')
     create_by = models.ForeignKey("CustomUser", on_delete=models.CASCADE, related_name="created_event")
     create_date = models.DateTimeField(blank=False, null=False)
     update_by = models.ForeignKey("CustomUser", on_delete=models.CASCADE, related_name="updated_event")
     update_date = models.DateTimeField(blank=False, null=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'start_time'], name='calendar_company_start_idx'),
+            # Overlap checks filter end_time > new_start first, which skips past events
+            models.Index(fields=['end_time', 'start_time'], name='calendar_end_start_idx'),
+            # The reminder scheduler polls for recently changed events
+            models.Index(fields=['update_date'], name='calendar_update_date_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
+# Explicit through model for Calendar.users, kept on the original auto-created
+# table, so the join can carry a (user, event) index
+class CalendarAttendee(models.Model):
+    calendar = models.ForeignKey(Calendar, on_delete=models.CASCADE)
+    customuser = models.ForeignKey("CustomUser", on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = 'api_calendar_users'
+        unique_together = [('calendar', 'customuser')]
+        indexes = [
+            models.Index(fields=['customuser', 'calendar'], name='attendee_user_calendar_idx'),
+        ]
+# Per-occurrence exception for a recurring event, keyed by the occurrence's
+# original start: either cancels it or overrides its time/details
+class CalendarOverride(models.Model):
+    event = models.ForeignKey(Calendar, on_delete=models.CASCADE, related_name="overrides")
+    original_start = models.DateTimeField()
+    is_cancelled = models.BooleanField(default=False)
+    start_time = models.DateTimeField(blank=True, null=True)
+    end_time = models.DateTimeField(blank=True, null=True)
+    name = models.CharField(max_length=25, blank=True, null=True)
+    description = models.TextField(blank=True, null=True)
+
+    class Meta:
+        unique_together = [('event', 'original_start')]
+
+    def __str__(self):
+        return f"{self.event.name} @ {self.original_start}"
+
+class ReminderDelivery(models.Model):
+    # One reminder of one occurrence through one sink (api.reminders). A row is
+    # claimed before sending, so schedulers in several processes never send it
+    # twice, and a failed delivery is retried on its own.
+    STATUS_CHOICES = [
+        ('PEND', 'Pending'),
+        ('RUNN', 'Running'),
+        ('DONE', 'Done'),
+        ('FAIL', 'Failed'),
+    ]
+
+    event = models.ForeignKey(Calendar, on_delete=models.CASCADE, related_name="reminder_deliveries")
+    occurrence_start = models.DateTimeField()
+    minutes_before = models.IntegerField()
+    sink = models.CharField(max_length=100)
+    status = models.CharField(max_length=4, choices=STATUS_CHOICES, default='PEND')
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    run_after = models.DateTimeField()
+    create_date = models.DateTimeField()
+    update_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['event', 'occurrence_start', 'minutes_before', 'sink'], name='reminder_delivery_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='reminder_status_run_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_status_display()} {self.sink} reminder for event {self.event_id}"
@@ -0,0 +1,39 @@
+import base64
+import json
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+# Opaque keyset cursors: the sort key of the last row of a page, e.g. (start_time, id)
+def encode_cursor(*values):
+    values = [v.isoformat() if hasattr(v, "isoformat") else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, *types):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(values) != len(types):
+            raise ValueError
+        decoded = []
+        for value, kind in zip(values, types):
+            if kind == "datetime":
+                value = parse_datetime(value)
+                if value is None:
+                    raise ValueError
+            else:
+                value = kind(value)
+            decoded.append(value)
+        return decoded
+    except (TypeError, ValueError, AttributeError):
+        raise ValueError("Invalid cursor.")
+
+
+def get_limit(request, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    try:
+        limit = int(request.query_params.get("limit", default))
+    except ValueError:
+        raise ValueError("limit must be a number.")
+    return max(1, min(limit, maximum))
@@ -0,0 +1,223 @@
+from django.core.files.storage import default_storage
+from api.datetimes import get_formatter
+from api.form_versions import upgrade_rows
+from api.images import THUMBNAIL_SIZES, photo_url, preview_url
+from api.models import Calendar, CustomUser, FormFile
+
+
+def project_users(user_ids, request=None, avatar_size=64):
+    # Reduced user shape for nested users: {id, name, avatar_url}
+    users = {}
+    rows = CustomUser.objects.filter(id__in=set(user_ids)).values_list("id", "first_name", "last_name", "photo")
+    for user_id, first_name, last_name, photo in rows:
+        users[user_id] = {
+            "id": user_id,
+            "name": f"{first_name} {last_name}".strip(),
+            "avatar_url": _avatar_url(photo, request, avatar_size),
+        }
+    return users
+
+
+def _avatar_url(photo, request, size):
+    if not photo:
+        return None
+    try:
+        return photo_url(default_storage.path(photo), size, request)
+    except (FileNotFoundError, OSError):
+        return None
+
+
+def _file_url(name, request):
+    # Same value DRF's FileField renders
+    if not name:
+        return None
+    url = default_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+class Projection:
+    # Read-only list serializer: builds dicts straight from .values() rows with a
+    # declared field set instead of going through ModelSerializer fields
+    fields = ()
+    datetime_fields = ()
+    user_fields = ()
+
+    def __init__(self, queryset, request=None, fields=None, keys=None):
+        self.queryset = queryset
+        self.request = request
+        # Raw (unformatted) values of these columns are kept per row in .keys,
+        # e.g. to build keyset pagination cursors
+        self.key_fields = tuple(keys or ())
+        self.keys = []
+        self.fields = tuple(f for f in self.fields if fields is None or f in fields or f == "id")
+        self.avatar_size = 64
+        if request is not None:
+            try:
+                size = int(request.query_params.get("photo_size", 64))
+            except ValueError:
+                size = 64
+            if size in THUMBNAIL_SIZES:
+                self.avatar_size = size
+
+    def columns(self):
+        return [f for f in self.fields if f not in self.related_fields()]
+
+    def related_fields(self):
+        return ()
+
+    def add_related(self, rows):
+        pass
+
+    @property
+    def data(self):
+        columns = self.columns()
+        rows = list(self.queryset.values(*columns, *(f for f in self.key_fields if f not in columns)))
+        self.keys = [tuple(row[f] for f in self.key_fields) for row in rows]
+        if not rows:
+            return []
+        get_formatter().format_rows(rows, [f for f in self.datetime_fields if f in self.fields])
+        user_fields = [f for f in self.user_fields if f in self.fields]
+        if user_fields:
+            users = project_users(
+                (row[f] for row in rows for f in user_fields),
+                self.request,
+                self.avatar_size,
+            )
+            for row in rows:
+                for f in user_fields:
+                    row[f] = users.get(row[f])
+        self.add_related(rows)
+        return [{f: row[f] for f in self.fields} for row in rows]
+
+
+class CalendarProjection(Projection):
+    fields = (
+        "id",
+        "company",
+        "name",
+        "description",
+        "event_type",
+        "start_time",
+        "end_time",
+        "is_all_day",
+        "location",
+        "meeting_url",
+        "recurrence",
+        "users",
+        "create_by",
+        "create_date",
+        "update_by",
+        "update_date",
+    )
+    datetime_fields = ("start_time", "end_time", "create_date", "update_date")
+    user_fields = ("update_by",)
+    company_columns = (
+        "company__id",
+        "company__company_name",
+        "company__create_by",
+        "company__create_date",
+        "company__update_by",
+        "company__update_date",
+    )
+
+    def related_fields(self):
+        return ("company", "users")
+
+    def columns(self):
+        columns = super().columns()
+        if "company" in self.fields:
+            columns += self.company_columns
+        return columns
+
+    def add_related(self, rows):
+        if "company" in self.fields:
+            formatter = get_formatter()
+            for row in rows:
+                company_id = row.pop("company__id")
+                values = {c[len("company__"):]: row.pop(c) for c in self.company_columns[1:]}
+                if company_id is None:
+                    row["company"] = None
+                    continue
+                values["create_date"] = formatter.format(values["create_date"])
+                values["update_date"] = formatter.format(values["update_date"])
+                row["company"] = {"id": company_id, **values}
+        if "users" in self.fields:
+            attendees = {row["id"]: [] for row in rows}
+            links = (
+                Calendar.users.through.objects.filter(calendar_id__in=attendees)
+                .order_by("id")
+                .values_list("calendar_id", "customuser_id")
+            )
+            for calendar_id, user_id in links:
+                attendees[calendar_id].append(user_id)
+            users = project_users(
+                (user_id for ids in attendees.values() for user_id in ids),
+                self.request,
+                self.avatar_size,
+            )
+            for row in rows:
+                row["users"] = [users[user_id] for user_id in attendees[row["id"]] if user_id in users]
+
+
+class FormProjection(Projection):
+    fields = (
+        "id",
+        "name",
+        "layout",
+        "layout_version",
+        "create_by",
+        "create_date",
+        "update_by",
+        "update_date",
+    )
+    datetime_fields = ("create_date", "update_date")
+    user_fields = ("update_by",)
+
+
+class FormDataProjection(Projection):
+    fields = (
+        "id",
+        "form",
+        "submitted_data",
+        "files",
+        "create_by",
+        "create_date",
+        "update_by",
+        "update_date",
+    )
+    datetime_fields = ("create_date", "update_date")
+    user_fields = ("update_by",)
+
+    def related_fields(self):
+        return ("files",)
+
+    def columns(self):
+        columns = super().columns()
+        if "submitted_data" in self.fields:
+            columns += ["layout_version"] + (["form"] if "form" not in columns else [])
+        return columns
+
+    def add_related(self, rows):
+        if "submitted_data" in self.fields:
+            # Rows stored in an older layout version are shown in the current one
+            upgrade_rows(rows)
+        if "files" not in self.fields:
+            return
+        files = {row["id"]: [] for row in rows}
+        file_rows = (
+            FormFile.objects.filter(form_submission_id__in=files)
+            .order_by("id")
+            .values_list("id", "file", "file_type", "preview", "duration", "form_submission_id")
+        )
+        for file_id, name, file_type, preview, duration, submission_id in file_rows:
+            files[submission_id].append({
+                "id": file_id,
+                "file": _file_url(name, self.request),
+                "file_type": file_type,
+                "preview": preview_url(file_id, preview, self.request),
+                "duration": duration,
+            })
+        for row in rows:
+            row["files"] = files[row["id"]]
@@ -0,0 +1,53 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+
+def user_group(user_id):
+    return f"user_{user_id}"
+
+
+def company_group(company_id):
+    return f"company_{company_id}"
+
+
+def _send(group, message):
+    try:
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        async_to_sync(channel_layer.group_send)(group, message)
+    except Exception as e:
+        # Push is best effort: clients resync through the REST endpoints
+        print(f"Error publishing realtime update: {str(e)}")
+
+
+def publish_event_changes(action, events, previous_attendees=None):
+    # events are CalendarProjection rows ({'id', 'users': [{'id', ...}], ...}), or
+    # just {'id', 'users'} for deletions. Every attendee, plus anyone removed from
+    # the event by this change, gets the delta once the transaction commits.
+    previous_attendees = previous_attendees or {}
+
+    def send():
+        for event in events:
+            recipients = {user['id'] for user in event['users']} | set(previous_attendees.get(event['id'], ()))
+            message = {"type": "calendar.event", "action": action, "event": event}
+            for user_id in recipients:
+                _send(user_group(user_id), message)
+
+    if events:
+        transaction.on_commit(send)
+
+
+def publish_form_data(company_id, form_data):
+    if company_id is None:
+        return
+    message = {"type": "form.data", "action": "created", "form_data": form_data}
+    transaction.on_commit(lambda: _send(company_group(company_id), message))
+
+
+def publish_reminder(user_ids, reminder):
+    # Sent straight away: reminders are fired by the scheduler, not a request
+    message = {"type": "calendar.reminder", "reminder": reminder}
+    for user_id in user_ids:
+        _send(user_group(user_id), message)
@@ -0,0 +1,206 @@
+import calendar
+import heapq
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils.timezone import get_current_timezone, localtime, make_aware
+from api.models import CalendarOverride
+
+# Recurrence codes from Calendar.RECURRING_CHOICES that are expanded, as
+# (unit, step): occurrences are stepped in local wall-clock time
+RECURRENCE_STEPS = {
+    'DALY': ('days', 1),
+    'WEEK': ('days', 7),
+    'MONT': ('months', 1),
+    'YEAR': ('months', 12),
+}
+
+Occurrence = namedtuple(
+    'Occurrence',
+    ['start_time', 'end_time', 'event_id', 'original_start', 'name', 'description', 'is_override'],
+)
+
+
+def is_recurring(recurrence):
+    return recurrence in RECURRENCE_STEPS
+
+
+def _field(event, key):
+    # Events are Calendar instances or .values() dicts with the same keys
+    return event[key] if isinstance(event, dict) else getattr(event, key)
+
+
+def _add_months(naive, months):
+    # Occurrences that fall on a day the month doesn't have are skipped (RFC 5545)
+    month_index = naive.month - 1 + months
+    year, month = naive.year + month_index // 12, month_index % 12 + 1
+    if naive.day > calendar.monthrange(year, month)[1]:
+        return None
+    return naive.replace(year=year, month=month)
+
+
+def expand(start, end, recurrence, window_start, window_end, tz=None):
+    # Lazily yields (start, end) of each occurrence overlapping the window. The
+    # first candidate is computed arithmetically, so nothing before the window
+    # is generated.
+    duration = end - start
+    if not is_recurring(recurrence):
+        if start < window_end and end > window_start:
+            yield start, end
+        return
+
+    tz = tz or get_current_timezone()
+    unit, step = RECURRENCE_STEPS[recurrence]
+    local_start = localtime(start, tz).replace(tzinfo=None)
+    earliest = window_start - duration
+    if unit == 'days':
+        elapsed = (earliest - start).total_seconds() / (step * 86400)
+        index = max(0, int(elapsed) - 1)
+    else:
+        local_earliest = localtime(earliest, tz)
+        elapsed = (local_earliest.year - local_start.year) * 12 + local_earliest.month - local_start.month
+        index = max(0, elapsed // step - 1)
+
+    while True:
+        if unit == 'days':
+            naive = local_start + timedelta(days=index * step)
+        else:
+            naive = _add_months(local_start, index * step)
+        index += 1
+        if naive is None:
+            continue
+        occurrence_start = make_aware(naive, tz)
+        if occurrence_start >= window_end:
+            return
+        occurrence_end = occurrence_start + duration
+        if occurrence_end > window_start:
+            yield occurrence_start, occurrence_end
+
+
+def event_occurrences(event, window_start, window_end, overrides=None):
+    overrides = overrides or {}
+    event_id, name, description = _field(event, 'id'), _field(event, 'name'), _field(event, 'description')
+    start, end = _field(event, 'start_time'), _field(event, 'end_time')
+    duration = end - start
+
+    def base():
+        for occurrence_start, occurrence_end in expand(start, end, _field(event, 'recurrence'), window_start, window_end):
+            override = overrides.get(occurrence_start)
+            if override is None:
+                yield Occurrence(occurrence_start, occurrence_end, event_id, occurrence_start, name, description, False)
+            elif not override.is_cancelled:
+                occurrence = _overridden(override, occurrence_start, occurrence_end, event_id, name, description)
+                if _in_window(occurrence, window_start, window_end):
+                    yield occurrence
+
+    # Overrides that move an occurrence into the window from outside it
+    moved = sorted(
+        occurrence
+        for occurrence in (
+            _overridden(o, o.original_start, o.original_start + duration, event_id, name, description)
+            for o in overrides.values()
+            if not o.is_cancelled
+            and not (o.original_start < window_end and o.original_start + duration > window_start)
+        )
+        if _in_window(occurrence, window_start, window_end)
+    )
+    return heapq.merge(base(), moved)
+
+
+def _in_window(occurrence, window_start, window_end):
+    return occurrence.start_time < window_end and occurrence.end_time > window_start
+
+
+def _overridden(override, start, end, event_id, name, description):
+    if override.end_time is None and override.start_time is not None:
+        end = override.start_time + (end - start)
+    return Occurrence(
+        override.start_time or start,
+        override.end_time or end,
+        event_id,
+        override.original_start,
+        override.name or name,
+        override.description if override.description is not None else description,
+        True,
+    )
+
+
+def load_overrides(event_ids):
+    overrides = {}
+    for override in CalendarOverride.objects.filter(event_id__in=list(event_ids)):
+        overrides.setdefault(override.event_id, {})[override.original_start] = override
+    return overrides
+
+
+class OccurrenceCache:
+    # LRU of materialised expansions per (event, update_date, window). update_date
+    # is part of the key, so an edit in another process can't be served stale;
+    # invalidate_event() drops an event's entries eagerly in this process.
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._by_event = {}
+        self._lock = threading.Lock()
+
+    def get_or_expand(self, event, window_start, window_end, overrides):
+        key = (_field(event, 'id'), _field(event, 'update_date'), window_start, window_end)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        occurrences = tuple(event_occurrences(event, window_start, window_end, overrides))
+        with self._lock:
+            self._entries[key] = occurrences
+            self._by_event.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.maxsize:
+                old_key, _ = self._entries.popitem(last=False)
+                self._discard(old_key)
+        return occurrences
+
+    def invalidate_event(self, event_id):
+        with self._lock:
+            for key in self._by_event.pop(event_id, ()):
+                self._entries.pop(key, None)
+
+    def _discard(self, key):
+        keys = self._by_event.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_event[key[0]]
+
+
+occurrence_cache = OccurrenceCache(getattr(settings, 'OCCURRENCE_CACHE_SIZE', 4096))
+
+
+def invalidate_event(event_id):
+    occurrence_cache.invalidate_event(event_id)
+
+
+def occurrences_per_event(events, window_start, window_end):
+    # Yields (event, occurrences) with every override loaded in one query
+    events = list(events)
+    recurring_ids = {_field(e, 'id') for e in events if is_recurring(_field(e, 'recurrence'))}
+    overrides = load_overrides(recurring_ids) if recurring_ids else {}
+    for event in events:
+        event_id = _field(event, 'id')
+        if event_id in recurring_ids:
+            yield event, occurrence_cache.get_or_expand(event, window_start, window_end, overrides.get(event_id))
+        else:
+            yield event, event_occurrences(event, window_start, window_end)
+
+
+def expand_events(events, window_start, window_end):
+    # Occurrences of many events in one window, merged in start order
+    return heapq.merge(*(occurrences for _, occurrences in occurrences_per_event(events, window_start, window_end)))
+
+
+def window_filter(window_start, window_end, prefix=''):
+    # Calendar rows that can have an occurrence in the window; prefix is the
+    # lookup path to the Calendar when filtering a related model
+    return Q(**{f'{prefix}start_time__lt': window_end}) & (
+        Q(**{f'{prefix}end_time__gt': window_start}) | Q(**{f'{prefix}recurrence__in': list(RECURRENCE_STEPS)})
+    )
+
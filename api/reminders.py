@@ -0,0 +1,444 @@
+import heapq
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from api.datetimes import format_datetime
+from api.models import Calendar, CalendarAttendee, ReminderDelivery
+from api.recurrence import event_occurrences, is_recurring, load_overrides, window_filter
+
+# Minutes before an occurrence's start at which attendees are reminded
+REMINDER_OFFSETS = tuple(getattr(settings, "REMINDER_OFFSETS", (15,)))
+# Only reminders due within this window are held in memory; it slides forward
+REMINDER_HORIZON = timedelta(hours=getattr(settings, "REMINDER_HORIZON_HOURS", 24))
+REMINDER_MAX_PENDING = getattr(settings, "REMINDER_MAX_PENDING", 200_000)
+REMINDER_POLL_SECONDS = getattr(settings, "REMINDER_POLL_SECONDS", 30)
+REMINDER_WORKERS = getattr(settings, "REMINDER_WORKERS", 2)
+REMINDER_SINKS = getattr(settings, "REMINDER_SINKS", ("api.reminders.EmailSink", "api.reminders.WebSocketSink"))
+REMINDER_MAX_ATTEMPTS = getattr(settings, "REMINDER_MAX_ATTEMPTS", 3)
+# A delivery still running after this long is assumed lost with its process
+REMINDER_DELIVERY_TIMEOUT = timedelta(seconds=getattr(settings, "REMINDER_DELIVERY_TIMEOUT_SECONDS", 300))
+# How long sent and failed deliveries are kept
+REMINDER_KEEP = timedelta(days=getattr(settings, "REMINDER_KEEP_DAYS", 7))
+RETRY_BATCH_SIZE = 500
+
+LOAD_CHUNK_SIZE = 2000
+EVENT_COLUMNS = ("id", "name", "description", "start_time", "end_time", "recurrence", "update_date")
+
+Reminder = namedtuple("Reminder", ["event_id", "occurrence_start", "minutes_before", "fire_at"])
+
+
+def _timestamp(value):
+    return value.timestamp()
+
+
+def _datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, dt_timezone.utc)
+
+
+class MemorySink:
+    # Keeps every delivery in memory; for tests and local runs
+    def __init__(self):
+        self.sent = []
+
+    def deliver(self, reminder, event, recipients):
+        self.sent.append((reminder, event, recipients))
+
+
+class EmailSink:
+    def deliver(self, reminder, event, recipients):
+        subject = f"Reminder: {event['name']} at {format_datetime(reminder.occurrence_start)}"
+        body = _reminder_text(reminder, event)
+        messages = [
+            EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [user["email"]])
+            for user in recipients if user["email"]
+        ]
+        # One SMTP connection for every attendee of the occurrence
+        get_connection().send_messages(messages)
+
+
+class SmsSink:
+    # Same Twilio client and number as the OTP service
+    def deliver(self, reminder, event, recipients):
+        from api.views.common import TWILIO_PHONE_NUMBER, client
+
+        body = _reminder_text(reminder, event)
+        for user in recipients:
+            if user["mobile_number"]:
+                client.messages.create(body=body, from_=TWILIO_PHONE_NUMBER, to=f"+91{user['mobile_number']}")
+
+
+class WebSocketSink:
+    def deliver(self, reminder, event, recipients):
+        from api.realtime import publish_reminder
+
+        publish_reminder([user["id"] for user in recipients], {
+            "event": event["id"],
+            "name": event["name"],
+            "start_time": format_datetime(reminder.occurrence_start),
+            "minutes_before": reminder.minutes_before,
+        })
+
+
+def _reminder_text(reminder, event):
+    lines = [f"{event['name']} starts at {format_datetime(reminder.occurrence_start)}."]
+    if event["location"]:
+        lines.append(f"Location: {event['location']}")
+    if event["meeting_url"]:
+        lines.append(f"Join: {event['meeting_url']}")
+    return "\n".join(lines)
+
+
+def get_sinks():
+    return [import_string(path)() for path in REMINDER_SINKS]
+
+
+def sink_name(sink):
+    return type(sink).__name__
+
+
+# Delivery rows in the database
+
+
+def claim_deliveries(now, limit=None, event_ids=None):
+    # Marks due deliveries as running. Rows locked by another scheduler are
+    # skipped, and once claimed a row is no longer due, so each reminder goes
+    # out through each sink from one process only. Running deliveries whose
+    # process died are picked up again after the timeout.
+    with transaction.atomic():
+        due = ReminderDelivery.objects.select_for_update(skip_locked=True).filter(
+            status__in=['PEND', 'RUNN'], run_after__lte=now
+        )
+        if event_ids is not None:
+            due = due.filter(event_id__in=list(event_ids))
+        ids = list(due.order_by('run_after', 'id').values_list('id', flat=True)[:limit])
+        ReminderDelivery.objects.filter(id__in=ids).update(
+            status='RUNN', attempts=F('attempts') + 1, run_after=now + REMINDER_DELIVERY_TIMEOUT, update_date=now
+        )
+    return list(ReminderDelivery.objects.filter(id__in=ids).order_by('id'))
+
+
+def finish_deliveries(ids, now):
+    ReminderDelivery.objects.filter(id__in=ids).update(status='DONE', error="", update_date=now)
+
+
+def fail_delivery(delivery, error, now):
+    # Retried with a growing delay, then left as failed
+    if delivery.attempts >= REMINDER_MAX_ATTEMPTS:
+        ReminderDelivery.objects.filter(id=delivery.id).update(status='FAIL', error=str(error)[:2000], update_date=now)
+    else:
+        ReminderDelivery.objects.filter(id=delivery.id).update(
+            status='PEND', error=str(error)[:2000], run_after=now + timedelta(minutes=2 ** delivery.attempts),
+            update_date=now,
+        )
+
+
+def prune_deliveries(now):
+    ReminderDelivery.objects.filter(status__in=['DONE', 'FAIL'], run_after__lt=now - REMINDER_KEEP).delete()
+
+
+class ReminderScheduler:
+    # Min-heap of pending reminders served by a single timer thread.
+    #
+    # Only reminders that fire before loaded_until (now + horizon) are held; the
+    # window is extended as time passes by loading just the newly covered slice.
+    # Heap entries are (fire_at, event_id, version, occurrence_start, minutes):
+    # changing or deleting an event bumps its version, and entries carrying an
+    # older version are dropped when they reach the top of the heap or when the
+    # heap is compacted. Due reminders are sent through ReminderDelivery rows,
+    # which schedulers in other processes share.
+    def __init__(self, sinks=None, offsets=REMINDER_OFFSETS, horizon=REMINDER_HORIZON,
+                 max_pending=REMINDER_MAX_PENDING, clock=timezone.now):
+        self.sinks = get_sinks() if sinks is None else sinks
+        self.offsets = tuple(sorted(set(offsets)))
+        self.horizon = horizon
+        self.max_pending = max_pending
+        self.clock = clock
+        self._heap = []
+        self._versions = {}
+        self._loaded_until = None
+        self._next_extend = None
+        self._seen_update = None
+        self._condition = threading.Condition()
+        # Serialises loading so a concurrent change can't be loaded with a
+        # version that is already stale
+        self._load_lock = threading.RLock()
+        self._thread = None
+        self._stopping = False
+        self._executor = None
+
+    # Loading
+
+    def _occurrence_window(self, fire_from, fire_until):
+        # Occurrences whose reminders can fire in [fire_from, fire_until)
+        return (fire_from + timedelta(minutes=self.offsets[0]),
+                fire_until + timedelta(minutes=self.offsets[-1]))
+
+    def _entries(self, events, fire_from, fire_until):
+        window_start, window_end = self._occurrence_window(fire_from, fire_until)
+        recurring = [event["id"] for event in events if is_recurring(event["recurrence"])]
+        overrides = load_overrides(recurring) if recurring else {}
+        fire_from, fire_until = _timestamp(fire_from), _timestamp(fire_until)
+        for event in events:
+            version = self._versions.get(event["id"], 0)
+            for occurrence in event_occurrences(event, window_start, window_end, overrides.get(event["id"])):
+                start = _timestamp(occurrence.start_time)
+                for minutes in self.offsets:
+                    fire_at = start - minutes * 60
+                    if fire_from <= fire_at < fire_until:
+                        yield (fire_at, event["id"], version, start, minutes)
+
+    def _load(self, queryset, fire_from, fire_until):
+        chunk = []
+        for event in queryset.values(*EVENT_COLUMNS).iterator(chunk_size=LOAD_CHUNK_SIZE):
+            chunk.append(event)
+            if len(chunk) == LOAD_CHUNK_SIZE:
+                self._push(self._entries(chunk, fire_from, fire_until))
+                chunk = []
+        if chunk:
+            self._push(self._entries(chunk, fire_from, fire_until))
+
+    def _push(self, entries):
+        entries = list(entries)
+        with self._condition:
+            for entry in entries:
+                heapq.heappush(self._heap, entry)
+            self._condition.notify()
+
+    def extend_horizon(self):
+        # Loads the slice of time between the old and the new end of the window,
+        # then compacts the heap and enforces max_pending
+        with self._load_lock:
+            now = self.clock()
+            fire_from = self._loaded_until or now
+            fire_until = now + self.horizon
+            if fire_until > fire_from:
+                window_start, window_end = self._occurrence_window(fire_from, fire_until)
+                self._load(Calendar.objects.filter(window_filter(window_start, window_end)), fire_from, fire_until)
+            with self._condition:
+                self._loaded_until = max(fire_until, fire_from)
+                self._compact()
+                self._next_extend = min(now + self.horizon / 2, self._loaded_until)
+
+    def _compact(self):
+        versions = self._versions
+        live = [entry for entry in self._heap if entry[2] == versions.get(entry[1], 0)]
+        if len(live) > self.max_pending:
+            # Keep the earliest reminders and pull the window in so the rest are
+            # loaded again by a later extend_horizon()
+            live = heapq.nsmallest(self.max_pending + 1, live)
+            cutoff = live.pop()[0]
+            live = [entry for entry in live if entry[0] < cutoff]
+            self._loaded_until = _datetime(cutoff)
+        heapq.heapify(live)
+        self._heap = live
+        # Versions only need to outlive the entries they invalidate
+        present = {entry[1] for entry in live}
+        self._versions = {event_id: v for event_id, v in versions.items() if event_id in present}
+
+    # Incremental updates
+
+    def event_changed(self, event_id):
+        with self._load_lock:
+            with self._condition:
+                self._versions[event_id] = self._versions.get(event_id, 0) + 1
+                loaded_until = self._loaded_until
+            now = self.clock()
+            if loaded_until is not None and loaded_until > now:
+                self._load(Calendar.objects.filter(id=event_id), now, loaded_until)
+
+    def event_deleted(self, event_id):
+        with self._condition:
+            self._versions[event_id] = self._versions.get(event_id, 0) + 1
+
+    def poll_changes(self):
+        # Picks up edits made by other processes; deleted events are skipped at
+        # delivery time because they no longer load
+        if self._seen_update is None:
+            self._seen_update = self.clock()
+            return
+        changes = Calendar.objects.filter(update_date__gt=self._seen_update).values_list("id", "update_date")
+        for event_id, update_date in changes:
+            self._seen_update = max(self._seen_update, update_date)
+            self.event_changed(event_id)
+
+    @property
+    def pending(self):
+        return len(self._heap)
+
+    # Timer thread
+
+    def start(self):
+        self.extend_horizon()
+        self._seen_update = self.clock()
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(max_workers=REMINDER_WORKERS)
+        self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def pop_due(self, now=None):
+        # Removes and returns every live reminder due at `now`
+        now = _timestamp(now or self.clock())
+        due = []
+        with self._condition:
+            heap, versions = self._heap, self._versions
+            while heap and heap[0][0] <= now:
+                fire_at, event_id, version, start, minutes = heapq.heappop(heap)
+                if version == versions.get(event_id, 0):
+                    due.append(Reminder(event_id, _datetime(start), minutes, _datetime(fire_at)))
+        return due
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._stopping:
+                    return
+                now = _timestamp(self.clock())
+                # Wake for the next reminder or to extend the window
+                wake_at = _timestamp(self._next_extend)
+                if self._heap:
+                    wake_at = min(wake_at, self._heap[0][0])
+                if wake_at > now:
+                    self._condition.wait(wake_at - now)
+                    continue
+            due = self.pop_due()
+            if due:
+                self._executor.submit(self._deliver_safely, due)
+            if self._next_extend <= self.clock():
+                try:
+                    self.extend_horizon()
+                except Exception as e:
+                    print(f"Error loading reminders: {str(e)}")
+                finally:
+                    close_old_connections()
+
+    # Delivery
+
+    def _deliver_safely(self, reminders):
+        try:
+            self.deliver(reminders)
+        except Exception as e:
+            print(f"Error delivering reminders: {str(e)}")
+        finally:
+            close_old_connections()
+
+    def deliver(self, reminders):
+        # Records one delivery row per reminder and sink (existing rows are kept
+        # as they are), then sends those this process manages to claim
+        now = self.clock()
+        names = [sink_name(sink) for sink in self.sinks]
+        ReminderDelivery.objects.bulk_create(
+            [
+                ReminderDelivery(
+                    event_id=reminder.event_id,
+                    occurrence_start=reminder.occurrence_start,
+                    minutes_before=reminder.minutes_before,
+                    sink=name,
+                    run_after=now,
+                    create_date=now,
+                    update_date=now,
+                )
+                for reminder in reminders
+                for name in names
+            ],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+        self.send(claim_deliveries(now, event_ids={reminder.event_id for reminder in reminders}))
+
+    def retry_due(self, limit=RETRY_BATCH_SIZE):
+        # Failed deliveries whose retry is due, and those left running by a
+        # process that died
+        self.send(claim_deliveries(self.clock(), limit))
+
+    def send(self, deliveries):
+        # Events and attendees for the whole batch in two queries. Deliveries of
+        # events deleted in the meantime go with them (cascade).
+        if not deliveries:
+            return
+        now = self.clock()
+        sinks = {sink_name(sink): sink for sink in self.sinks}
+        event_ids = {delivery.event_id for delivery in deliveries}
+        events = {
+            event["id"]: event
+            for event in Calendar.objects.filter(id__in=event_ids).values("id", "name", "location", "meeting_url")
+        }
+        recipients = {}
+        rows = CalendarAttendee.objects.filter(calendar_id__in=events, customuser__is_active=True).values_list(
+            "calendar_id", "customuser_id", "customuser__email", "customuser__first_name", "customuser__mobile_number"
+        )
+        for calendar_id, user_id, email, first_name, mobile_number in rows:
+            recipients.setdefault(calendar_id, []).append(
+                {"id": user_id, "email": email, "first_name": first_name, "mobile_number": mobile_number}
+            )
+        done = []
+        for delivery in deliveries:
+            event = events.get(delivery.event_id)
+            if event is None or not recipients.get(delivery.event_id):
+                done.append(delivery.id)
+                continue
+            sink = sinks.get(delivery.sink)
+            reminder = Reminder(
+                delivery.event_id, delivery.occurrence_start, delivery.minutes_before,
+                delivery.occurrence_start - timedelta(minutes=delivery.minutes_before),
+            )
+            try:
+                if sink is None:
+                    raise RuntimeError(f"Sink {delivery.sink} is not configured.")
+                sink.deliver(reminder, event, recipients[delivery.event_id])
+            except Exception as e:
+                # One failing channel doesn't stop the others; it is retried alone
+                print(f"Error sending reminder with {delivery.sink}: {str(e)}")
+                fail_delivery(delivery, e, now)
+            else:
+                done.append(delivery.id)
+        finish_deliveries(done, now)
+
+
+# Scheduler running in this process, if any (see the run_reminders command)
+scheduler = None
+
+
+def start(sinks=None):
+    global scheduler
+    scheduler = ReminderScheduler(sinks=sinks)
+    scheduler.start()
+    return scheduler
+
+
+def stop():
+    global scheduler
+    if scheduler is not None:
+        scheduler.stop()
+        scheduler = None
+
+
+def event_changed(event_id):
+    # Called by the event views; a scheduler in another process picks the same
+    # change up through poll_changes()
+    running = scheduler
+    if running is not None:
+        transaction.on_commit(lambda: running.event_changed(event_id))
+
+
+def event_deleted(event_id):
+    running = scheduler
+    if running is not None:
+        transaction.on_commit(lambda: running.event_deleted(event_id))
@@ -0,0 +1,6 @@
+from django.urls import path
+from api.consumers import UpdatesConsumer
+
+websocket_urlpatterns = [
+    path("ws/updates", UpdatesConsumer.as_asgi()),
+]
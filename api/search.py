@@ -0,0 +1,165 @@
+import math
+import re
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from api.models import SearchTerm
+
+SUBMISSION = "FORM"
+EVENT = "EVNT"
+KINDS = (SUBMISSION, EVENT)
+
+TERM_MAX_LENGTH = 40
+TERM_MIN_LENGTH = 2
+MAX_TERMS_PER_OBJECT = getattr(settings, "SEARCH_MAX_TERMS_PER_OBJECT", 200)
+MAX_QUERY_TERMS = 8
+# Postings read per query term. A term with fewer postings is matched
+# exactly; for queries made only of more common terms the results are drawn
+# from the newest postings of the rarest one.
+CANDIDATE_LIMIT = getattr(settings, "SEARCH_CANDIDATE_LIMIT", 2000)
+INDEX_BATCH_SIZE = 1000
+EVENT_NAME_WEIGHT = 3
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return [
+        word[:TERM_MAX_LENGTH]
+        for word in _WORD_RE.findall(text.lower())
+        if len(word) >= TERM_MIN_LENGTH
+    ]
+
+
+def _strings(value):
+    # Text found in a submitted value, including inside lists and objects
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for element in value:
+            yield from _strings(element)
+    elif isinstance(value, dict):
+        for element in value.values():
+            yield from _strings(element)
+
+
+def submission_terms(submitted_data):
+    terms = Counter()
+    for text in _strings(submitted_data):
+        terms.update(tokenize(text))
+    return terms
+
+
+def event_terms(name, description):
+    terms = Counter()
+    for term in tokenize(name or ""):
+        terms[term] += EVENT_NAME_WEIGHT
+    terms.update(tokenize(description or ""))
+    return terms
+
+
+def _replace_terms(kind, documents):
+    # documents: [(object_id, company_id, Counter)]. The heaviest terms of each
+    # object are kept, so one very long text can't flood the index.
+    rows = [
+        SearchTerm(company_id=company_id, kind=kind, object_id=object_id, term=term, weight=weight)
+        for object_id, company_id, terms in documents
+        for term, weight in terms.most_common(MAX_TERMS_PER_OBJECT)
+    ]
+    with transaction.atomic():
+        SearchTerm.objects.filter(kind=kind, object_id__in=[object_id for object_id, _, _ in documents]).delete()
+        SearchTerm.objects.bulk_create(rows, batch_size=INDEX_BATCH_SIZE)
+    return len(rows)
+
+
+def index_form_data(submissions):
+    # Replaces the search terms of the given FormData rows
+    return _replace_terms(SUBMISSION, [
+        (s.id, s.company_id, submission_terms(s.submitted_data)) for s in submissions
+    ])
+
+
+def index_events(events):
+    return _replace_terms(EVENT, [
+        (e.id, e.company_id, event_terms(e.name, e.description)) for e in events
+    ])
+
+
+def remove(kind, object_ids):
+    SearchTerm.objects.filter(kind=kind, object_id__in=list(object_ids)).delete()
+
+
+def rebuild(kind, queryset, batch_size=INDEX_BATCH_SIZE):
+    # Reindexes every row of queryset in id-keyset batches, then drops terms of
+    # rows that no longer exist. Yields the number of rows done so far.
+    index = index_form_data if kind == SUBMISSION else index_events
+    last_id, done = 0, 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).order_by("id")[:batch_size])
+        if not batch:
+            break
+        index(batch)
+        last_id = batch[-1].id
+        done += len(batch)
+        yield done
+    SearchTerm.objects.filter(kind=kind).exclude(object_id__in=queryset.model.objects.values("id")).delete()
+
+
+def query_terms(query):
+    # Distinct words of the query; the last one also matches as a prefix
+    # while it is still being typed
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    prefix = bool(terms) and not query[-1:].isspace()
+    return terms, prefix
+
+
+def _postings(rows):
+    matches = {}
+    for kind, object_id, weight in rows:
+        key = (kind, object_id)
+        matches[key] = matches.get(key, 0) + weight
+    return matches
+
+
+def search(company, query, kinds=KINDS, limit=20):
+    # [(kind, object_id, score)] of the objects containing every query term,
+    # best first. Scores are term weights scaled by how rare each term is.
+    # limit=None returns every candidate, for callers that filter them first.
+    terms, prefix = query_terms(query)
+    if not terms:
+        return []
+    postings = SearchTerm.objects.filter(company=company, kind__in=kinds)
+    lookups = []
+    for index, term in enumerate(terms):
+        if prefix and index == len(terms) - 1:
+            # A range rather than LIKE, so every backend can use the index
+            lookups.append(postings.filter(term__gte=term, term__lt=term + "\uffff"))
+        else:
+            lookups.append(postings.filter(term=term).order_by("-object_id"))
+
+    # Bounded reads: at most CANDIDATE_LIMIT + 1 postings per term
+    samples = [
+        list(lookup.values_list("kind", "object_id", "weight")[:CANDIDATE_LIMIT + 1])
+        for lookup in lookups
+    ]
+    rarest = min(range(len(terms)), key=lambda i: len(samples[i]))
+    if not samples[rarest]:
+        return []
+    candidates = _postings(samples[rarest][:CANDIDATE_LIMIT])
+    scores = dict.fromkeys(candidates, 0.0)
+    for index, (lookup, sample) in enumerate(zip(lookups, samples)):
+        if index == rarest:
+            matches = candidates
+        elif len(sample) <= CANDIDATE_LIMIT:
+            matches = _postings(sample)
+        else:
+            # Common term: only its postings among the candidates are needed
+            matches = _postings(
+                lookup.filter(object_id__in={object_id for _, object_id in scores}).values_list("kind", "object_id", "weight")
+            )
+        rarity = math.log(1 + (CANDIDATE_LIMIT + 1) / len(sample))
+        scores = {key: score + matches[key] * rarity for key, score in scores.items() if key in matches}
+        if not scores:
+            return []
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0][1]))
+    return [(kind, object_id, round(score, 3)) for (kind, object_id), score in ranked[:limit]]
@@ -1,46 +1,66 @@
 from rest_framework import serializers
 from api.models import Form, FormData, FormFile, CustomUser, Calendar, Company
-from django.utils.timezone import localtime
+from api.datetimes import format_datetime
+from api.form_validation import get_validator
+from api.form_versions import upgraded_data
 import base64
 from io import BytesIO
 from django.core.files.uploadedfile import InMemoryUploadedFile
-from PIL import Image
+from api.images import THUMBNAIL_SIZES, ImageRejected, decode_base64_capped, inspect_image, photo_data_uri, photo_url, preview_url
 
 
 class Base64ImageField(serializers.ImageField):
+    # Representation modes (overridable per request through the serializer context):
+    #   "base64" - the full original image inline (legacy behaviour)
+    #   "thumb"  - a cached thumbnail inline as a data URI
+    #   "url"    - a URL to the cached thumbnail
+    def __init__(self, *args, representation="base64", thumbnail_size=64, **kwargs):
+        self.representation = representation
+        self.thumbnail_size = thumbnail_size
+        super().__init__(*args, **kwargs)
+
     def to_internal_value(self, data):
         # Check if data is a base64 string
         if isinstance(data, str) and data.startswith('data:image'):
             # Extract the base64 string from the data
             format, imgstr = data.split(';base64,')  # split into format and base64 string
-            img_data = base64.b64decode(imgstr)  # decode the base64 string into bytes
-            image = Image.open(BytesIO(img_data))  # open the image using PIL
-
-            # Save image as InMemoryUploadedFile
+            try:
+                img_data = decode_base64_capped(imgstr)
+                inspect_image(img_data)
+            except ImageRejected as e:
+                raise serializers.ValidationError(str(e))
+
+            # Store the original bytes as they are; transcoding, EXIF stripping and
+            # thumbnails are done by the ingest pool once the user is saved
             file_name = "uploaded_image.jpg"  # you can customize the filename
-            image_file = BytesIO()
-            image.save(image_file, format='JPEG')
-            image_file.seek(0)
-
             return InMemoryUploadedFile(
-                image_file, None, file_name, 'image/jpeg', image_file.tell(), None
+                BytesIO(img_data), None, file_name, 'image/jpeg', len(img_data), None
             )
         else:
             # If it's not a base64 string, pass to the original ImageField behavior
             return super().to_internal_value(data)
     
     def to_representation(self, value):
+        if not value:
+            return None
+        mode = self.context.get("photo") or self.representation
+        size = self.context.get("photo_size") or self.thumbnail_size
+        if size not in THUMBNAIL_SIZES:
+            size = self.thumbnail_size
+        if mode == "thumb":
+            return photo_data_uri(value.path, size)
+        if mode == "url":
+            return photo_url(value.path, size, self.context.get("request"))
         # Convert the image to a base64 string to be returned in the response
-        if value:
-            with open(value.path, "rb") as image_file:
-                image_data = base64.b64encode(image_file.read()).decode('utf-8')
-                return f"data:image/jpeg;base64,{image_data}"
-        return None
+        with open(value.path, "rb") as image_file:
+            image_data = base64.b64encode(image_file.read()).decode('utf-8')
+            return f"data:image/jpeg;base64,{image_data}"
 
 class CustomDateTimeField(serializers.DateTimeField):
     def to_representation(self, value):
-        ist_time = localtime(value)
-        return ist_time.strftime("%d-%m-%Y %I:%M %p")
+        # Same output as localtime(value).strftime("%d-%m-%Y %I:%M %p"), without
+        # the per-value tz conversion and strftime call
+        return format_datetime(value)
 
 # Company Serializer
 class CompanySerializers(serializers.ModelSerializer):
@@ -100,6 +120,7 @@ class FormSerializer(serializers.ModelSerializer):
             "id",
             "name",
             "layout",
+            "layout_version",
             "create_by",
             "create_date",
             "update_by",
@@ -108,14 +129,22 @@ class FormSerializer(serializers.ModelSerializer):
 
 # Form File Serializer
 class FormFileSerializer(serializers.ModelSerializer):
+    preview = serializers.SerializerMethodField()
+
     class Meta:
         model = FormFile
         fields = [
             "id", 
             "file", 
-            "file_type"
+            "file_type",
+            "preview",
+            "duration",
         ]
 
+    def get_preview(self, obj):
+        # None until the media workers have processed the file
+        return preview_url(obj.id, obj.preview, self.context.get("request"))
+
 # Form Data Serializer
 class FormDataSerializer(serializers.ModelSerializer):
     create_date = CustomDateTimeField()
@@ -137,6 +166,12 @@ class FormDataSerializer(serializers.ModelSerializer):
             "update_date",
         ]
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Rows stored in an older layout version are shown in the current one
+        data["submitted_data"] = upgraded_data(instance)
+        return data
+
     def validate(self, data):
         form = data.get("form")
         submitted_data = data.get("submitted_data")
@@ -146,24 +181,8 @@ class FormDataSerializer(serializers.ModelSerializer):
                 "Form and submitted_data fields are required."
             )
 
-        form_layout = form.layout.get("fields", [])
-        errors = {}
-
-        for field in form_layout:
-            field_name = field["field_name"]
-            field_type = field["type"]
-            required = field.get("required", False)
-
-            if required and field_name not in submitted_data:
-                errors[field_name] = "This field is required."
-            elif field_name in submitted_data:
-                value = submitted_data[field_name]
-                if field_type == "number" and not isinstance(value, int):
-                    errors[field_name] = "This field must be a number."
-                elif field_type == "email" and "@" not in value:
-                    errors[field_name] = "This field must be a valid email."
-                elif field_type == "dropdown" and value not in field.get("options", []):
-                    errors[field_name] = f"Value must be one of {field.get('options')}."
+        # Compiled once per form layout and cached (api.form_validation)
+        errors = get_validator(form).errors(submitted_data)
 
         if errors:
             raise serializers.ValidationError(errors)
@@ -0,0 +1,118 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from api.form_index import index_submissions
+from api.form_stats import record_submissions
+from api.form_validation import layout_hash
+from api.form_versions import sync_layout_version
+from api.images import schedule_photo_ingest
+from api.media import enqueue
+from api import search
+from api.models import Calendar, CustomUser, Form, FormData, FormFile
+
+
+@receiver(pre_save, sender=CustomUser)
+def mark_photo_upload(sender, instance, **kwargs):
+    # A newly assigned photo has not been written to storage yet
+    instance._photo_uploaded = bool(instance.photo) and not instance.photo._committed
+
+
+@receiver(post_save, sender=CustomUser)
+def ingest_photo_upload(sender, instance, **kwargs):
+    if getattr(instance, "_photo_uploaded", False):
+        instance._photo_uploaded = False
+        path = instance.photo.path
+        transaction.on_commit(lambda: schedule_photo_ingest(path))
+
+
+@receiver(pre_save, sender=Form)
+def update_layout_hash(sender, instance, **kwargs):
+    instance.layout_hash = layout_hash(instance.layout)
+
+
+@receiver(post_save, sender=Form)
+def record_layout_version(sender, instance, **kwargs):
+    sync_layout_version(instance)
+
+
+@receiver(pre_save, sender=FormData)
+def pin_layout_version(sender, instance, **kwargs):
+    # New submissions are validated against, and stored in, the current layout
+    if instance._state.adding and instance.form_id is not None:
+        instance.layout_version = instance.form.layout_version
+
+
+@receiver(post_save, sender=FormData)
+def index_form_data(sender, instance, **kwargs):
+    # Bulk inserts don't send signals; those paths call index_submissions themselves
+    index_submissions([instance])
+
+
+@receiver(post_save, sender=FormData)
+def index_form_data_terms(sender, instance, **kwargs):
+    search.index_form_data([instance])
+
+
+@receiver(post_save, sender=Calendar)
+def index_event_terms(sender, instance, **kwargs):
+    # Bulk event changes and deletions update the search index in the views
+    search.index_events([instance])
+
+
+# What a submission contributes to the summaries
+COUNTED_FIELDS = ("form_id", "submitted_data", "create_date")
+
+
+@receiver(post_init, sender=FormData)
+def remember_submission(sender, instance, **kwargs):
+    # What the summaries currently count for this row, taken back out when it
+    # is edited or deleted. Rows loaded with some of these fields deferred (.only()) are read back
+    # in pre_save if they are saved: reading them here would load them on
+    # every init, and recurse.
+    deferred = instance.get_deferred_fields()
+    if instance.pk and not any(field in deferred for field in COUNTED_FIELDS):
+        instance._counted = (instance.form_id, instance.submitted_data, instance.create_date)
+    else:
+        instance._counted = None
+
+
+@receiver(pre_save, sender=FormData)
+def load_counted_submission(sender, instance, **kwargs):
+    if instance._state.adding or getattr(instance, "_counted", None) is not None:
+        return
+    instance._counted = FormData.objects.filter(pk=instance.pk).values_list(*COUNTED_FIELDS).first()
+
+
+@receiver(post_save, sender=FormData)
+def count_form_data(sender, instance, created, **kwargs):
+    counted = getattr(instance, "_counted", None)
+    if counted is not None and not created:
+        record_submissions([FormData(form_id=counted[0], submitted_data=counted[1], create_date=counted[2])], sign=-1)
+    record_submissions([instance])
+    instance._counted = (instance.form_id, instance.submitted_data, instance.create_date)
+
+
+@receiver(post_delete, sender=FormData)
+def uncount_form_data(sender, instance, **kwargs):
+    # Costs no fast deletes: files and index rows cascade from submissions, so
+    # they are never fast-deleted anyway. Raw SQL deletes still need
+    # rebuild_form_stats.
+    counted = getattr(instance, "_counted", None)
+    if counted is not None:
+        record_submissions([FormData(form_id=counted[0], submitted_data=counted[1], create_date=counted[2])], sign=-1)
+
+
+@receiver(post_save, sender=FormFile)
+def queue_media_job(sender, instance, created, **kwargs):
+    # Previews and durations are made by the process_media workers, never in
+    # the request; bulk inserts call enqueue_for_submissions themselves
+    if created:
+        enqueue([instance])
+
+
+@receiver(post_delete, sender=FormFile)
+def release_form_file(sender, instance, **kwargs):
+    # Drops this file's reference to its stored content once the delete commits
+    if instance.file:
+        storage, name = instance.file.storage, instance.file.name
+        transaction.on_commit(lambda: storage.delete(name))
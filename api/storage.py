@@ -0,0 +1,143 @@
+import hashlib
+import os
+import tempfile
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+BLOB_PREFIX = "cas"
+
+
+def blob_name(sha256, ext=""):
+    # cas/ab/cd/abcd...<ext>: two directory levels keep directories small
+    return f"{BLOB_PREFIX}/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    # Stores each distinct content once, under its sha256, and counts how many
+    # files refer to it in StoredBlob. Saving content that is already stored
+    # only adds a reference; delete() drops one and removes the file with the
+    # last. Names saved before this storage existed keep working unchanged.
+
+    def _save(self, name, content):
+        from api.models import StoredBlob
+
+        ext = os.path.splitext(name)[1].lower()[:10]
+        if hasattr(content, "temporary_file_path"):
+            # Already on disk (e.g. a completed chunked upload): hash it and move it
+            path = content.temporary_file_path()
+            sha256 = _hash_file(path)
+            temp_path = path
+        else:
+            temp_path, sha256 = self._write_temp(content)
+
+        with transaction.atomic():
+            # The row lock orders this against the removal of the last reference
+            # (remove_unreferenced), so the file can't go under a new reference
+            blob = StoredBlob.objects.select_for_update().filter(sha256=sha256).first()
+            if blob is not None and self.exists(blob.name):
+                os.remove(temp_path)
+                StoredBlob.objects.filter(sha256=sha256).update(refcount=F("refcount") + 1)
+                return blob.name
+
+            final_name = blob_name(sha256, ext)
+            final_path = self.path(final_name)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            # A temporary upload may be on another filesystem than MEDIA_ROOT,
+            # where a rename fails; file_move_safe copies instead
+            file_move_safe(temp_path, final_path, allow_overwrite=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(final_path, self.file_permissions_mode)
+            if blob is not None:
+                # The row outlived its file; point it at the new copy
+                StoredBlob.objects.filter(sha256=sha256).update(name=final_name, refcount=F("refcount") + 1)
+            else:
+                _create_blob(sha256, final_name, content.size)
+        return final_name
+
+    def _write_temp(self, content):
+        # Streams the content to a temporary file next to its final place while
+        # hashing it, so it is read once and never held in memory
+        temp_dir = self.path(f"{BLOB_PREFIX}/tmp")
+        os.makedirs(temp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=temp_dir, delete=False) as temp:
+            if hasattr(content, "seek") and content.seekable():
+                content.seek(0)
+            for chunk in content.chunks():
+                digest.update(chunk)
+                temp.write(chunk)
+        return temp.name, digest.hexdigest()
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content hash in _save()
+        return name
+
+    def delete(self, name):
+        from api.models import StoredBlob
+
+        if not name.startswith(f"{BLOB_PREFIX}/"):
+            return super().delete(name)
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return
+            StoredBlob.objects.filter(sha256=blob.sha256).update(refcount=F("refcount") - 1)
+            if blob.refcount <= 1:
+                # Once this commits, and only if nothing referenced it again
+                transaction.on_commit(lambda: self.remove_unreferenced(blob.sha256))
+
+    def remove_unreferenced(self, sha256):
+        # Removes the content if no file refers to it. Saving the same content
+        # takes the same row lock, so it either comes first and keeps the file,
+        # or comes after and stores it again.
+        from api.models import StoredBlob
+
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(sha256=sha256, refcount__lte=0).first()
+            if blob is None:
+                return False
+            blob.delete()
+            self.delete_file(blob.name)
+        return True
+
+    def delete_file(self, name):
+        # Removes the file itself, whatever its reference count
+        super().delete(name)
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _create_blob(sha256, name, size):
+    from api.models import StoredBlob
+
+    try:
+        with transaction.atomic():
+            StoredBlob.objects.create(sha256=sha256, name=name, size=size, refcount=1, create_date=timezone.now())
+    except IntegrityError:
+        # Stored concurrently by another upload of the same content
+        StoredBlob.objects.filter(sha256=sha256).update(refcount=F("refcount") + 1)
+
+
+def add_reference(blob):
+    # A new FormFile pointing at an existing blob without uploading it. False if
+    # the content was removed in the meantime; the UPDATE's row lock orders this
+    # against remove_unreferenced.
+    from api.models import StoredBlob
+
+    return StoredBlob.objects.filter(sha256=blob.sha256).update(refcount=F("refcount") + 1) > 0
+
+
+form_file_storage = ContentAddressedStorage()
+
+
+def get_form_file_storage():
+    return form_file_storage
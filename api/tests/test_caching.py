@@ -0,0 +1,47 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from api.caching import company_users_version
+from api.models import CustomUser
+from api.tests.utils import make_company, make_user
+
+
+class CompanyUsersVersionTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.company = make_company(self.user)
+        self.colleague = make_user(company=self.company)
+
+    def test_changes_with_users(self):
+        version = company_users_version(self.company.id)
+        self.colleague.first_name = "Renamed"
+        self.colleague.save()
+        self.assertNotEqual(company_users_version(self.company.id), version)
+
+        version = company_users_version(self.company.id)
+        joined = make_user(company=self.company)
+        self.assertNotEqual(company_users_version(self.company.id), version)
+
+        version = company_users_version(self.company.id)
+        joined.delete()
+        self.assertNotEqual(company_users_version(self.company.id), version)
+
+    def test_login_keeps_version(self):
+        version = company_users_version(self.company.id)
+        response = APIClient().post(reverse("login"), {"email": self.colleague.email, "password": "password"}, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertIsNotNone(CustomUser.objects.get(id=self.colleague.id).last_login)
+        self.assertEqual(company_users_version(self.company.id), version)
+
+    def test_event_form_etag(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse("event_form"))
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertEqual(client.get(reverse("event_form"), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.colleague.last_name = "Changed"
+        self.colleague.save()
+        response = client.get(reverse("event_form"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Changed", [user["last_name"] for user in response.data["formsInputData"]["users"]])
@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+from unittest import mock
+from zoneinfo import ZoneInfo
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from api.models import Calendar, CalendarOverride
+from api.views import calendar_feed
+from api.views.calendar_feed import feed_token
+from api.tests.utils import make_company, make_event, make_user
+
+KOLKATA = ZoneInfo("Asia/Kolkata")
+
+
+class GetEventsTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.company = make_company(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        start = timezone.now() + timedelta(days=1)
+        self.events = [make_event(self.user, start=start + timedelta(hours=i)) for i in range(3)]
+
+    def test_without_pagination_returns_list(self):
+        response = self.client.get(reverse("events"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([event["id"] for event in response.data], [event.id for event in self.events])
+
+    def test_limit_and_cursor_pages(self):
+        response = self.client.get(reverse("events"), {"limit": 2})
+        self.assertEqual([event["id"] for event in response.data["results"]], [e.id for e in self.events[:2]])
+        response = self.client.get(reverse("events"), {"limit": 2, "cursor": response.data["next"]})
+        self.assertEqual([event["id"] for event in response.data["results"]], [self.events[2].id])
+        self.assertIsNone(response.data["next"])
+
+    def test_no_events(self):
+        self.client.force_authenticate(make_user(company=self.company))
+        self.assertEqual(self.client.get(reverse("events")).status_code, 404)
+
+
+class RecurringEventTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.company = make_company(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse("create_event"), {
+            "name": "Standup", "start_time": "05-01-2026 09:00 AM", "end_time": "05-01-2026 09:30 AM",
+            "recurrence": "WEEK", "event_type": "NONE", "is_all_day": False, "users": [self.user.id],
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.event_id = response.data["id"]
+
+    def occurrences(self):
+        response = self.client.get(reverse("event_occurrences"), {"start": "2026-01-01T00:00", "end": "2026-02-01T00:00"})
+        self.assertEqual(response.status_code, 200)
+        return [(occurrence["start_time"], occurrence["is_override"]) for occurrence in response.data]
+
+    def test_update_recurring_event(self):
+        self.assertEqual(len(self.occurrences()), 4)
+        response = self.client.post(reverse("update_occurrence"), {
+            "id": self.event_id, "original_start": "12-01-2026 09:00 AM", "cancel": True,
+        }, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.occurrences()), 3)
+
+        response = self.client.post(reverse("update_event"), {
+            "id": self.event_id, "start_time": "06-01-2026 10:00 AM", "end_time": "06-01-2026 10:30 AM",
+            "recurrence": "DALY",
+        }, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        occurrences = self.occurrences()
+        # Daily from the 6th to the end of January; the cached weekly expansion is gone
+        self.assertEqual(len(occurrences), 26)
+        self.assertEqual(occurrences[0], ("06-01-2026 10:00 AM", False))
+
+    def test_delete_recurring_event(self):
+        self.client.post(reverse("update_occurrence"), {
+            "id": self.event_id, "original_start": "12-01-2026 09:00 AM", "start_time": "13-01-2026 09:00 AM",
+        }, format="json")
+        self.assertEqual(len(self.occurrences()), 4)
+        response = self.client.post(reverse("delete_event"), {"id": self.event_id}, format="json")
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.occurrences(), [])
+        self.assertFalse(CalendarOverride.objects.filter(event_id=self.event_id).exists())
+
+
+class ConflictTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.company = make_company(self.user)
+        self.other = make_user(company=self.company)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Booked on the third Monday of the new event's series
+        self.booked = make_event(self.other, start=datetime(2026, 1, 19, 9, 15, tzinfo=KOLKATA), users=[self.other])
+
+    def create(self, recurrence, **extra):
+        return self.client.post(reverse("create_event"), {
+            "name": "Standup", "start_time": "05-01-2026 09:00 AM", "end_time": "05-01-2026 09:30 AM",
+            "recurrence": recurrence, "event_type": "NONE", "is_all_day": False, "users": [self.other.id], **extra,
+        }, format="json")
+
+    def test_single_event_checks_its_own_time(self):
+        response = self.create("NONE", check_conflicts=True)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["conflicts"], {})
+
+    def test_recurring_event_checks_later_occurrences(self):
+        response = self.create("WEEK", strict=True)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([c["id"] for c in response.data["conflicts"][self.other.id]], [self.booked.id])
+        self.assertFalse(Calendar.objects.filter(name="Standup").exists())
+
+    def test_update_to_recurring_checks_occurrences(self):
+        event = make_event(self.user, start=datetime(2026, 1, 5, 9, 0, tzinfo=KOLKATA), hours=0.5, users=[self.other])
+        response = self.client.post(reverse("update_event"), {
+            "id": event.id, "start_time": "05-01-2026 09:00 AM", "end_time": "05-01-2026 09:30 AM",
+            "recurrence": "WEEK", "check_conflicts": True,
+        }, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data["conflicts"]), [self.other.id])
+
+    def test_other_company_attendees_are_not_checked(self):
+        outsider = make_user()
+        make_company(outsider)
+        client = APIClient()
+        client.force_authenticate(outsider)
+        for flags in ({"check_conflicts": True}, {"strict": True}):
+            response = client.post(reverse("create_event"), {
+                "name": "Probe", "start_time": "19-01-2026 09:00 AM", "end_time": "19-01-2026 10:00 AM",
+                "recurrence": "NONE", "event_type": "NONE", "is_all_day": False, "users": [self.other.id], **flags,
+            }, format="json")
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.data.get("conflicts", {}), {})
+
+
+class BulkEventsTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.company = make_company(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_op(self, name, **fields):
+        return {"op": "create", "name": name, "start_time": "2026-01-05T09:00", "end_time": "2026-01-05T10:00",
+                "users": [self.user.id], **fields}
+
+    def test_model_validation_per_operation(self):
+        event = make_event(self.user)
+        response = self.client.post(reverse("bulk_events"), {"operations": [
+            self.create_op("Valid"),
+            self.create_op("Bad type", event_type="XXXX"),
+            self.create_op("Bad link", meeting_url="not a url"),
+            {"op": "update", "id": event.id, "name": "n" * 30},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        errors = {row["index"]: row for row in response.data["results"]}
+        self.assertEqual(sorted(errors), [1, 2, 3])
+        self.assertEqual(list(errors[1]["fields"]), ["event_type"])
+        self.assertEqual(list(errors[2]["fields"]), ["meeting_url"])
+        self.assertEqual(list(errors[3]["fields"]), ["name"])
+        self.assertFalse(Calendar.objects.filter(name="Valid").exists())
+
+    def test_create_without_returned_ids(self):
+        # MySQL can't return ids from a bulk insert; they are read back instead
+        other = make_event(self.user)
+        features = type(connection.features)
+        with mock.patch.object(features, "can_return_rows_from_bulk_insert", new_callable=mock.PropertyMock, return_value=False):
+            response = self.client.post(reverse("bulk_events"), {"operations": [
+                self.create_op("First"), self.create_op("Second", users=[]), {"op": "delete", "id": other.id},
+            ]}, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        created = {row["id"]: row["event"]["name"] for row in response.data["results"][:2]}
+        self.assertEqual(created, dict(Calendar.objects.filter(name__in=["First", "Second"]).values_list("id", "name")))
+        first = Calendar.objects.get(name="First")
+        self.assertEqual(list(first.users.values_list("id", flat=True)), [self.user.id])
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.company = make_company(self.user)
+        start = datetime(2026, 1, 5, 9, 0, tzinfo=KOLKATA)
+        self.events = [make_event(self.user, start=start + timedelta(hours=i), recurrence="WEEK") for i in range(5)]
+        for event in self.events:
+            CalendarOverride.objects.create(event=event, original_start=event.start_time + timedelta(days=7),
+                                            name=f"Moved {event.id}", start_time=event.start_time + timedelta(days=8))
+            CalendarOverride.objects.create(event=event, original_start=event.start_time + timedelta(days=14),
+                                            is_cancelled=True)
+
+    def feed(self):
+        response = self.client.get(reverse("calendar_feed", args=[feed_token(self.user)]))
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_overrides_are_loaded_per_batch(self):
+        with mock.patch.object(calendar_feed, "FEED_BATCH_SIZE", 2):
+            with CaptureQueriesContext(connection) as queries:
+                body = self.feed()
+        for event in self.events:
+            self.assertEqual(body.count(f"UID:event-{event.id}@lms"), 2)
+            self.assertIn(f"SUMMARY:Moved {event.id}", body)
+        self.assertEqual(body.count("EXDATE"), len(self.events))
+        # Three batches of events (2, 2, 1), each with its own override query
+        override_queries = [q for q in queries.captured_queries if "calendaroverride" in q["sql"]]
+        self.assertEqual(len(override_queries), 3)
@@ -0,0 +1,43 @@
+import csv
+import io
+from openpyxl import load_workbook
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from api.tests.utils import make_company, make_form, make_submission, make_user
+
+LAYOUT = {"fields": [{"field_name": "city", "type": "text"}, {"field_name": "amount", "type": "number"}]}
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = make_user(first_name="Asha", last_name="Rao")
+        self.company = make_company(self.user)
+        self.form = make_form(self.user, layout=LAYOUT, name="Visits")
+        self.rows = [
+            make_submission(self.form, self.user, {"city": "Pune", "amount": 3}),
+            make_submission(self.form, self.user, {"city": "=SUM(A1)"}),
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, export_type):
+        response = self.client.get(reverse("export_formdata"), {"form": self.form.id, "type": export_type})
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO(self.export("csv").decode("utf-8-sig"))))
+        self.assertEqual(rows[0], ["Submission ID", "Submitted by", "Created", "Updated", "city", "amount"])
+        self.assertEqual([row[0] for row in rows[1:]], [str(row.id) for row in self.rows])
+        self.assertEqual(rows[1][1], "Asha Rao")
+        self.assertEqual(rows[1][4:], ["Pune", "3"])
+        # Formulas are neutralised
+        self.assertEqual(rows[2][4:], ["'=SUM(A1)", ""])
+
+    def test_xlsx(self):
+        sheet = load_workbook(io.BytesIO(self.export("xlsx")), read_only=True)["Submissions"]
+        rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+        self.assertEqual(rows[0], ["Submission ID", "Submitted by", "Created", "Updated", "city", "amount"])
+        self.assertEqual([row[0] for row in rows[1:]], [row.id for row in self.rows])
+        self.assertEqual(rows[1][4:], ["Pune", 3])
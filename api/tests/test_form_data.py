@@ -0,0 +1,121 @@
+from unittest import mock
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from api.form_stats import form_summary
+from api.models import FormData, FormFile
+from api.tests.utils import make_company, make_form, make_submission, make_user
+
+LAYOUT = {"fields": [{"field_name": "amount", "type": "number"}]}
+
+
+class BulkSubmitTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.company = make_company(self.user)
+        self.form = make_form(self.user, layout=LAYOUT)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def submit(self, *client_ids):
+        return self.client.post(reverse("bulk_formdata"), {"submissions": [
+            {"client_id": client_id, "form": self.form.id, "submitted_data": {"amount": 5}} for client_id in client_ids
+        ]}, format="json")
+
+    def statuses(self, response):
+        return [(row["client_id"], row["status"]) for row in response.data["results"]]
+
+    def test_replay_returns_existing(self):
+        first = self.submit("a", "b")
+        self.assertEqual(self.statuses(first), [("a", "created"), ("b", "created")])
+        replay = self.submit("a", "b", "c")
+        self.assertEqual(self.statuses(replay), [("a", "exists"), ("b", "exists"), ("c", "created")])
+        self.assertEqual(replay.data["results"][0]["id"], first.data["results"][0]["id"])
+        self.assertEqual(form_summary(self.form)["submissions"], 3)
+
+    def test_concurrent_replay_is_not_counted_twice(self):
+        # Another request inserts "b" between this request's lookup of existing
+        # client_ids and its insert
+        bulk_create = QuerySet.bulk_create
+
+        def racing_bulk_create(queryset, objs, *args, **kwargs):
+            if queryset.model is FormData:
+                make_submission(self.form, self.user, {"amount": 5}, client_id="b")
+            return bulk_create(queryset, objs, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, "bulk_create", autospec=True, side_effect=racing_bulk_create):
+            response = self.submit("a", "b")
+        self.assertEqual(self.statuses(response), [("a", "created"), ("b", "exists")])
+        self.assertEqual(FormData.objects.count(), 2)
+        summary = form_summary(self.form)
+        self.assertEqual(summary["submissions"], 2)
+        self.assertEqual(summary["fields"]["amount"]["sum"], 10)
+
+
+class SubmitFormDataTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.company = make_company(self.user)
+        self.form = make_form(self.user, layout=LAYOUT)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_failed_side_effect_rolls_back(self):
+        with mock.patch("api.signals.search.index_form_data", side_effect=RuntimeError("index down")):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse("dynamic_formdata"), {
+                    "form": self.form.id, "submitted_data": {"amount": 4},
+                }, format="json")
+        self.assertFalse(FormData.objects.exists())
+        self.assertEqual(form_summary(self.form)["submissions"], 0)
+
+    def test_deletes_are_uncounted(self):
+        kept = make_submission(self.form, self.user, {"amount": 2})
+        make_submission(self.form, self.user, {"amount": 3}).delete()
+        FormData.objects.filter(id=make_submission(self.form, self.user, {"amount": 4}).id).delete()
+        summary = form_summary(self.form)
+        self.assertEqual(summary["submissions"], 1)
+        self.assertEqual(summary["fields"]["amount"]["sum"], 2)
+        self.assertTrue(FormData.objects.filter(id=kept.id).exists())
+
+
+class BatchFormDataTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.company = make_company(self.user)
+        self.form = make_form(self.user, layout=LAYOUT)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_submissions(self, count):
+        submissions = []
+        for i in range(count):
+            submission = make_submission(self.form, make_user(company=self.company), {"amount": i})
+            FormFile.objects.create(file=f"files/{submission.id}.png", file_type="photo", form_submission=submission)
+            submissions.append(submission)
+        return submissions
+
+    def count_queries(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("batch_formdata"), params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_queries_do_not_grow_with_rows(self):
+        few = self.add_submissions(2)
+        by_ids_few, response = self.count_queries({"ids": ",".join(str(s.id) for s in few)})
+        self.assertEqual(len(response.data["results"]), 2)
+        by_form_few, _ = self.count_queries({"form": self.form.id})
+
+        many = few + self.add_submissions(20)
+        by_ids_many, response = self.count_queries({"ids": ",".join(str(s.id) for s in many) + ",999999"})
+        self.assertEqual([row["id"] for row in response.data["results"]], [s.id for s in many])
+        self.assertEqual(response.data["missing"], [999999])
+        by_form_many, response = self.count_queries({"form": self.form.id})
+        self.assertEqual(len(response.data["results"]), 22)
+
+        self.assertEqual(by_ids_few, by_ids_many)
+        self.assertEqual(by_form_few, by_form_many)
@@ -0,0 +1,121 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from api.form_index import filter_submissions
+from api.form_stats import form_summary
+from api.form_versions import compile_migrations, upgrade_data
+from api.models import FormData
+from api.tests.utils import make_company, make_form, make_submission, make_user
+
+V1 = {"fields": [
+    {"field_name": "qty", "type": "text"},
+    {"field_name": "state", "type": "dropdown"},
+    {"field_name": "notes", "type": "text"},
+]}
+V2 = {"fields": [
+    {"field_name": "quantity", "type": "text"},
+    {"field_name": "status", "type": "dropdown"},
+    {"field_name": "notes", "type": "text"},
+]}
+V3 = {"fields": [
+    {"field_name": "quantity", "type": "number"},
+    {"field_name": "status", "type": "dropdown"},
+    {"field_name": "notes", "type": "text"},
+    {"field_name": "priority", "type": "dropdown"},
+]}
+V2_MIGRATIONS = [{"op": "rename", "from": "qty", "to": "quantity"}, {"op": "rename", "from": "state", "to": "status"}]
+V3_MIGRATIONS = [
+    {"op": "cast", "field": "quantity", "to": "number"},
+    {"op": "default", "field": "priority", "value": "Low"},
+]
+OLD = {"qty": "4", "state": "Open", "notes": "call back"}
+UPGRADED = {"quantity": 4, "status": "Open", "notes": "call back", "priority": "Low"}
+
+
+class FormVersionTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.company = make_company(self.user)
+        self.form = make_form(self.user, layout=V1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def publish(self, layout, migrations):
+        response = self.client.post(reverse("form_layout", args=[self.form.id]),
+                                    {"layout": layout, "migrations": migrations}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.form.refresh_from_db()
+        return response
+
+    def test_invalid_migration_is_rejected(self):
+        with self.assertRaises(ValueError):
+            compile_migrations([{"op": "cast", "field": "qty", "to": "date"}])
+        response = self.client.post(reverse("form_layout", args=[self.form.id]),
+                                    {"layout": V2, "migrations": [{"op": "drop", "field": "qty"}]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.layout_version, 1)
+
+    def test_chain_across_versions(self):
+        self.publish(V2, V2_MIGRATIONS)
+        self.publish(V3, V3_MIGRATIONS)
+        self.assertEqual(self.form.layout_version, 3)
+        self.assertEqual(upgrade_data(self.form.id, OLD, 1, 3), UPGRADED)
+        self.assertEqual(upgrade_data(self.form.id, {"quantity": "2.5", "status": None}, 2, 3),
+                         {"quantity": 2.5, "status": None, "priority": "Low"})
+        # A cast that doesn't apply keeps the value
+        self.assertEqual(upgrade_data(self.form.id, {"quantity": "many"}, 2, 3)["quantity"], "many")
+
+    def test_publish_leaves_submissions_to_the_backfill(self):
+        submission = make_submission(self.form, self.user, dict(OLD))
+        response = self.publish(V2, V2_MIGRATIONS)
+        self.assertTrue(response.data["upgrade_pending"])
+        self.assertIn("upgrade_form_data", response.data["detail"])
+        submission.refresh_from_db()
+        self.assertEqual((submission.layout_version, submission.submitted_data), (1, OLD))
+        self.assertFalse(self.publish(V2, []).data["upgrade_pending"])
+
+    def test_old_rows_found_under_new_names_after_backfill(self):
+        make_submission(self.form, self.user, dict(OLD))
+        make_submission(self.form, self.user, {"qty": "1", "state": "Closed"})
+        self.publish(V2, V2_MIGRATIONS)
+        # The index lags until the backfill runs
+        self.assertFalse(filter_submissions(self.form, [("status", "eq", "Open")]).exists())
+        call_command("upgrade_form_data", form=[self.form.id], pause=0, stdout=StringIO())
+
+        matches = filter_submissions(self.form, [("status", "eq", "Open")])
+        self.assertEqual([s.submitted_data["quantity"] for s in matches], ["4"])
+        response = self.client.get(reverse("filter_formdata"), {"form": self.form.id, "status": "Closed"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 1)
+
+        summary = form_summary(self.form)
+        self.assertEqual(summary["submissions"], 2)
+        self.assertEqual(summary["fields"]["status"]["counts"], {"Closed": 1, "Open": 1})
+
+    def test_lazy_upgrade_on_read(self):
+        submission = make_submission(self.form, self.user, dict(OLD))
+        self.publish(V2, V2_MIGRATIONS)
+        self.publish(V3, V3_MIGRATIONS)
+
+        for params in ({"ids": str(submission.id)}, {"form": self.form.id}):
+            response = self.client.get(reverse("batch_formdata"), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["results"][0]["submitted_data"], UPGRADED)
+        # Reading doesn't write
+        submission.refresh_from_db()
+        self.assertEqual((submission.layout_version, submission.submitted_data), (1, OLD))
+
+    def test_upgrade_command(self):
+        for _ in range(3):
+            make_submission(self.form, self.user, dict(OLD))
+        self.publish(V2, V2_MIGRATIONS)
+        self.publish(V3, V3_MIGRATIONS)
+
+        call_command("upgrade_form_data", form=[self.form.id], batch=2, pause=0, stdout=StringIO())
+        self.assertEqual(
+            list(FormData.objects.filter(form=self.form).values_list("layout_version", "submitted_data")),
+            [(3, UPGRADED)] * 3,
+        )
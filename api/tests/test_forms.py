@@ -0,0 +1,27 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from api.tests.utils import make_company, make_form, make_user
+
+
+class FormListTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.company = make_company(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.forms = [make_form(self.user, name=f"Form {i}") for i in range(3)]
+        make_form(make_user(company=make_company()))
+
+    def test_without_pagination_returns_list(self):
+        response = self.client.get(reverse("form_list_create"), {"fields": "id,name"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([form["id"] for form in response.data], [form.id for form in self.forms])
+        self.assertEqual(set(response.data[0]), {"id", "name"})
+
+    def test_limit_and_cursor_pages(self):
+        response = self.client.get(reverse("form_list_create"), {"limit": 2})
+        self.assertEqual([form["id"] for form in response.data["results"]], [f.id for f in self.forms[:2]])
+        response = self.client.get(reverse("form_list_create"), {"limit": 2, "cursor": response.data["next"]})
+        self.assertEqual([form["id"] for form in response.data["results"]], [self.forms[2].id])
+        self.assertIsNone(response.data["next"])
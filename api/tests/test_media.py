@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+from PIL import Image
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from api import images
+from api.media import process_image
+from api.models import FormData, FormFile
+from api.projections import FormDataProjection
+from api.tests.utils import make_company, make_form, make_submission, make_user
+
+
+class FormFilePreviewTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = mock.patch.object(images, "PREVIEW_DIR", os.path.join(self.directory, "previews"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = make_user()
+        self.company = make_company(self.user)
+        submission = make_submission(make_form(self.user), self.user)
+        source = os.path.join(self.directory, "photo.png")
+        Image.new("RGB", (800, 400), "red").save(source)
+        result = process_image(source)
+        self.form_file = FormFile.objects.create(file="files/photo.png", file_type="photo", form_submission=submission)
+        FormFile.objects.filter(id=self.form_file.id).update(preview=result["preview"])
+        self.url = reverse("form_file_preview", args=[self.form_file.id])
+
+    def test_company_user_gets_preview(self):
+        client = APIClient()
+        client.force_authenticate(make_user(company=self.company))
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertIn("private", response["Cache-Control"])
+        with Image.open(images.preview_path(FormFile.objects.get(id=self.form_file.id).preview)) as preview:
+            self.assertEqual(preview.size, (images.PREVIEW_SIZE, images.PREVIEW_SIZE // 2))
+
+    def test_other_users_are_refused(self):
+        self.assertEqual(APIClient().get(self.url).status_code, 401)
+        outsider = make_user()
+        make_company(outsider)
+        client = APIClient()
+        client.force_authenticate(outsider)
+        self.assertEqual(client.get(self.url).status_code, 404)
+
+    def test_users_without_company_are_refused(self):
+        loner = make_user()
+        orphan = make_submission(make_form(loner), loner)
+        FormFile.objects.create(file="files/orphan.png", file_type="photo", form_submission=orphan,
+                                preview=FormFile.objects.get(id=self.form_file.id).preview)
+        client = APIClient()
+        client.force_authenticate(make_user())
+        url = reverse("form_file_preview", args=[orphan.files.get().id])
+        self.assertEqual(client.get(url).status_code, 404)
+
+    def test_payloads_link_the_preview_view(self):
+        row = FormDataProjection(FormData.objects.all()).data[0]
+        self.assertEqual(row["files"][0]["preview"], self.url)
@@ -0,0 +1,59 @@
+from datetime import datetime, timezone as dt_timezone
+from django.test import TestCase
+from api.models import Calendar, Form, FormData, FormFile
+from api.projections import CalendarProjection, FormDataProjection, FormProjection
+from api.serializers import CalendarSerializer, FormDataSerializer, FormSerializer
+from api.tests.utils import make_company, make_event, make_form, make_submission, make_user
+
+# Nested users are reduced to {id, name, avatar_url} by the projections
+USER_FIELDS = ("update_by", "users")
+
+
+class ProjectionParityTests(TestCase):
+    # Every projection must produce the same payload as the serializer it
+    # replaces, apart from the reduced nested users
+
+    def setUp(self):
+        self.user = make_user(first_name="Asha", last_name="Rao")
+        self.company = make_company(self.user)
+        self.other = make_user(company=self.company, first_name="Vik", last_name="")
+
+    def assert_parity(self, serializer_class, projection_class, queryset):
+        expected = [dict(row) for row in serializer_class(queryset, many=True).data]
+        actual = projection_class(queryset).data
+        self.assertEqual(len(expected), len(actual))
+        for serialized, projected in zip(expected, actual):
+            self.assertEqual(list(serialized), list(projected))
+            for field, value in serialized.items():
+                if field == "update_by":
+                    self.assertEqual(projected[field]["id"], value["id"])
+                elif field == "users":
+                    self.assertEqual([user["id"] for user in projected[field]], [user["id"] for user in value])
+                else:
+                    self.assertEqual(projected[field], value, field)
+        return actual
+
+    def test_calendar(self):
+        start = datetime(2026, 3, 1, 18, 45, tzinfo=dt_timezone.utc)
+        make_event(self.user, start=start, users=[self.user, self.other], description="Quarterly")
+        # Null company and description, and an event nobody attends
+        make_event(self.user, start=start, company=None, users=[], description=None)
+        rows = self.assert_parity(CalendarSerializer, CalendarProjection, Calendar.objects.order_by("id"))
+        # Datetimes are formatted in local time (Asia/Kolkata)
+        self.assertEqual(rows[0]["start_time"], "02-03-2026 12:15 AM")
+        self.assertIsNone(rows[1]["company"])
+        self.assertEqual(rows[1]["users"], [])
+        self.assertEqual(rows[0]["update_by"], {"id": self.user.id, "name": "Asha Rao", "avatar_url": None})
+
+    def test_form(self):
+        make_form(self.user, layout={"fields": [{"field_name": "a", "type": "text"}]})
+        make_form(self.other, company=None)
+        self.assert_parity(FormSerializer, FormProjection, Form.objects.order_by("id"))
+
+    def test_form_data(self):
+        form = make_form(self.user)
+        with_files = make_submission(form, self.user, {"a": 1, "b": ["x", "y"]})
+        FormFile.objects.create(file="files/a.png", file_type="photo", form_submission=with_files)
+        FormFile.objects.create(file="files/b.mp3", file_type="audio", form_submission=with_files, duration=2.5)
+        make_submission(form, self.other, {})
+        self.assert_parity(FormDataSerializer, FormDataProjection, FormData.objects.order_by("id"))
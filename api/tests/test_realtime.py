@@ -0,0 +1,49 @@
+from asgiref.sync import sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from api.routing import websocket_urlpatterns
+from api.tests.utils import make_company, make_user
+from api.ws_auth import JWTAuthMiddleware
+
+application = JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class UpdatesConsumerTests(TransactionTestCase):
+    # Transactional, so the consumer's database thread sees the test's rows
+
+    def setUp(self):
+        self.user = make_user()
+        self.company = make_company(self.user)
+        self.attendee = make_user(company=self.company)
+
+    async def test_rejects_missing_and_invalid_tokens(self):
+        for path in ("/ws/updates", "/ws/updates?token=not-a-token"):
+            communicator = WebsocketCommunicator(application, path)
+            connected, code = await communicator.connect()
+            self.assertFalse(connected)
+            self.assertEqual(code, 4401)
+
+    async def test_attendee_receives_event_change(self):
+        communicator = WebsocketCommunicator(application, f"/ws/updates?token={AccessToken.for_user(self.attendee)}")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = await sync_to_async(client.post)(reverse("create_event"), {
+            "name": "Review", "start_time": "05-01-2026 09:00 AM", "end_time": "05-01-2026 10:00 AM",
+            "recurrence": "NONE", "event_type": "NONE", "is_all_day": False, "users": [self.attendee.id],
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+
+        message = await communicator.receive_json_from(timeout=2)
+        self.assertEqual((message["type"], message["action"]), ("event", "created"))
+        self.assertEqual(message["data"]["id"], response.data["id"])
+        self.assertEqual([user["id"] for user in message["data"]["users"]], [self.attendee.id])
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
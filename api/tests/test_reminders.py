@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.test import TestCase
+from api.models import Calendar, ReminderDelivery
+from api.reminders import MemorySink, ReminderScheduler
+from api.tests.utils import make_company, make_event, make_user
+
+NOW = datetime(2026, 3, 2, 9, 0, tzinfo=dt_timezone.utc)
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FlakySink:
+    # Fails the first `failures` deliveries
+    def __init__(self, failures=1):
+        self.failures = failures
+        self.sent = []
+
+    def deliver(self, reminder, event, recipients):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("Sink unavailable.")
+        self.sent.append((reminder, event, recipients))
+
+
+class ReminderTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.company = make_company(self.user)
+        self.clock = Clock(NOW)
+
+    def scheduler(self, *sinks):
+        scheduler = ReminderScheduler(sinks=list(sinks), offsets=(15,), horizon=timedelta(hours=24), clock=self.clock)
+        scheduler.extend_horizon()
+        return scheduler
+
+    def event(self, minutes, **fields):
+        return make_event(self.user, start=NOW + timedelta(minutes=minutes), **fields)
+
+    def test_due_reminders(self):
+        soon = self.event(60)
+        weekly = make_event(self.user, start=NOW - timedelta(days=7, minutes=-120), recurrence="WEEK")
+        self.event(10)  # reminder time already passed
+        deleted = self.event(30)
+        moved = self.event(40)
+        scheduler = self.scheduler(MemorySink())
+
+        scheduler.event_deleted(deleted.id)
+        Calendar.objects.filter(id=moved.id).update(
+            start_time=NOW + timedelta(hours=3), end_time=NOW + timedelta(hours=4)
+        )
+        scheduler.event_changed(moved.id)
+
+        self.assertEqual(scheduler.pop_due(NOW + timedelta(minutes=44)), [])
+        due = scheduler.pop_due(NOW + timedelta(hours=2))
+        self.assertEqual(
+            [(reminder.event_id, reminder.fire_at) for reminder in due],
+            [(soon.id, NOW + timedelta(minutes=45)), (weekly.id, NOW + timedelta(minutes=105))],
+        )
+        due = scheduler.pop_due(NOW + timedelta(hours=3))
+        self.assertEqual([reminder.event_id for reminder in due], [moved.id])
+
+    def test_each_reminder_is_sent_once(self):
+        event = self.event(20)
+        # Two schedulers, as in two processes, with the same sink configured
+        first, second = MemorySink(), MemorySink()
+        schedulers = [self.scheduler(first), self.scheduler(second)]
+        self.clock.now = NOW + timedelta(minutes=5)
+        due = [scheduler.pop_due() for scheduler in schedulers]
+        self.assertEqual([[reminder.event_id for reminder in reminders] for reminders in due], [[event.id], [event.id]])
+
+        for scheduler, reminders in zip(schedulers, due):
+            scheduler.deliver(reminders)
+        schedulers[0].deliver(due[0])
+        self.assertEqual(len(first.sent) + len(second.sent), 1)
+        self.assertEqual(ReminderDelivery.objects.get().status, "DONE")
+
+    def test_failed_sink_is_retried_alone(self):
+        self.event(20)
+        memory, flaky = MemorySink(), FlakySink()
+        scheduler = self.scheduler(memory, flaky)
+        self.clock.now = NOW + timedelta(minutes=5)
+        scheduler.deliver(scheduler.pop_due())
+        self.assertEqual((len(memory.sent), len(flaky.sent)), (1, 0))
+        failed = ReminderDelivery.objects.get(sink="FlakySink")
+        self.assertEqual((failed.status, failed.attempts), ("PEND", 1))
+
+        # Not due yet: the retry waits two minutes
+        self.clock.now += timedelta(minutes=1)
+        scheduler.retry_due()
+        self.assertEqual(len(flaky.sent), 0)
+
+        self.clock.now += timedelta(minutes=2)
+        scheduler.retry_due()
+        self.assertEqual((len(memory.sent), len(flaky.sent)), (1, 1))
+        self.assertEqual(set(ReminderDelivery.objects.values_list("status", flat=True)), {"DONE"})
+
+    def test_gives_up_after_max_attempts(self):
+        self.event(20)
+        scheduler = self.scheduler(FlakySink(failures=10))
+        self.clock.now = NOW + timedelta(minutes=5)
+        scheduler.deliver(scheduler.pop_due())
+        for _ in range(5):
+            self.clock.now += timedelta(hours=1)
+            scheduler.retry_due()
+        delivery = ReminderDelivery.objects.get()
+        self.assertEqual((delivery.status, delivery.attempts), ("FAIL", 3))
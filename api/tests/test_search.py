@@ -0,0 +1,34 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from api.models import FormData
+from api.tests.utils import make_company, make_event, make_form, make_submission, make_user
+
+
+class SearchViewTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.company = make_company(self.user)
+        self.other = make_user(company=self.company)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        response = self.client.get(reverse("search"), params)
+        self.assertEqual(response.status_code, 200)
+        return [(row["type"], row["item"]["id"]) for row in response.data["results"]]
+
+    def test_limit_applies_after_attendee_filter(self):
+        # Better matches the user doesn't attend rank above the one they do
+        for _ in range(3):
+            make_event(self.other, name="budget budget review", users=[self.other])
+        attended = make_event(self.user, name="budget")
+        self.assertEqual(self.search(q="budget", type="event", limit=1), [("event", attended.id)])
+
+    def test_limit_applies_after_deleted_rows(self):
+        form = make_form(self.user)
+        kept = make_submission(form, self.user, {"notes": "invoice"})
+        deleted = [make_submission(form, self.user, {"notes": "invoice invoice"}) for _ in range(3)]
+        # Stale search terms of rows removed without going through the model
+        FormData.objects.filter(id__in=[s.id for s in deleted])._raw_delete(FormData.objects.db)
+        self.assertEqual(self.search(q="invoice", limit=2), [("submission", kept.id)])
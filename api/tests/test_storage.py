@@ -0,0 +1,77 @@
+import errno
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import transaction
+from django.test import TestCase
+from api.models import StoredBlob
+from api.storage import ContentAddressedStorage, add_reference
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def save(self, content=b"same bytes"):
+        return self.storage.save("photo.jpg", ContentFile(content))
+
+    def blob(self, name):
+        return StoredBlob.objects.filter(name=name).first()
+
+    def test_same_content_is_stored_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = self.save(), self.save()
+        self.assertEqual(first, second)
+        self.assertEqual(self.blob(first).refcount, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(first)
+        self.assertTrue(self.storage.exists(first))
+        self.assertEqual(self.blob(first).refcount, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(first)
+        self.assertFalse(self.storage.exists(first))
+        self.assertIsNone(self.blob(first))
+
+    def test_temporary_upload_on_another_filesystem(self):
+        upload = TemporaryUploadedFile("photo.jpg", "image/jpeg", 10, None)
+        self.addCleanup(upload.close)
+        upload.write(b"big upload")
+        upload.flush()
+        path = upload.temporary_file_path()
+        # What a rename across filesystems (tmpfs /tmp, a mounted volume) raises
+        cross_device = OSError(errno.EXDEV, "Invalid cross-device link")
+        with mock.patch("os.rename", side_effect=cross_device), mock.patch("os.replace", side_effect=cross_device):
+            name = self.storage.save("photo.jpg", upload)
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), b"big upload")
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.blob(name).refcount, 1)
+
+    def test_save_during_last_delete_keeps_file(self):
+        name = self.save()
+        # The last reference is dropped, and the same content saved again
+        # before the delete commits
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.storage.delete(name)
+                self.assertEqual(self.save(), name)
+        self.assertTrue(os.path.exists(self.storage.path(name)))
+        self.assertEqual(self.blob(name).refcount, 1)
+
+    def test_attach_after_removal_fails(self):
+        name = self.save()
+        blob = self.blob(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+        self.assertFalse(add_reference(blob))
+        # Saving the content again stores a new copy
+        self.assertEqual(self.save(), name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.blob(name).refcount, 1)
@@ -0,0 +1,58 @@
+import itertools
+from datetime import timedelta
+from django.utils import timezone
+from api.models import Calendar, Company, CustomUser, Form, FormData
+
+_numbers = itertools.count(9000000000)
+
+
+def make_user(company=None, **fields):
+    number = next(_numbers)
+    fields.setdefault("first_name", "User")
+    fields.setdefault("last_name", str(number))
+    return CustomUser.objects.create_user(
+        email=f"user{number}@example.com", password="password", mobile_number=number, company=company, **fields
+    )
+
+
+def make_company(owner=None, name=None):
+    owner = owner or make_user()
+    now = timezone.now()
+    company = Company.objects.create(
+        company_name=name or f"Company {owner.id}", owner=owner, create_by=owner, update_by=owner,
+        create_date=now, update_date=now,
+    )
+    owner.company = company
+    owner.save()
+    return company
+
+
+def make_event(user, start=None, hours=1, users=None, **fields):
+    start = start or timezone.now() + timedelta(days=1)
+    now = timezone.now()
+    fields.setdefault("name", "Meeting")
+    fields.setdefault("recurrence", "NONE")
+    fields.setdefault("event_type", "NONE")
+    event = Calendar.objects.create(
+        company=fields.pop("company", user.company), start_time=start, end_time=start + timedelta(hours=hours),
+        create_by=user, update_by=user, create_date=now, update_date=now, **fields,
+    )
+    event.users.set(users if users is not None else [user])
+    return event
+
+
+def make_form(user, layout=None, **fields):
+    now = timezone.now()
+    return Form.objects.create(
+        company=fields.pop("company", user.company), name=fields.pop("name", "Form"),
+        layout=layout if layout is not None else {"fields": []},
+        create_by=user, update_by=user, create_date=now, update_date=now, **fields,
+    )
+
+
+def make_submission(form, user, data=None, **fields):
+    now = timezone.now()
+    return FormData.objects.create(
+        company=form.company, form=form, submitted_data=data if data is not None else {},
+        create_by=user, update_by=user, create_date=fields.pop("create_date", now), update_date=now, **fields,
+    )
@@ -1,6 +1,6 @@
 # urls.py
 from django.urls import path
-from api.views import custom_forms, auth, custom_datas, calender, common, testing
+from api.views import custom_forms, auth, custom_datas, calender, calendar_feed, common, testing, photos, uploads, search
 from rest_framework_simplejwt.views import TokenRefreshView
 
 
@@ -18,11 +18,33 @@ urlpatterns = [
     path('change_password', auth.change_password, name='change_password'),
     
     path('forms', custom_forms.FormView.as_view(), name='form_list_create'),
+    path('forms/<int:form_id>/layout', custom_forms.FormLayoutView.as_view(), name='form_layout'),
     path('datas', custom_datas.submit_form_data, name='dynamic_formdata'),
+    path('bulk_datas', custom_datas.bulk_submit_form_data, name='bulk_formdata'),
+    path('datas/filter', custom_datas.filter_form_data, name='filter_formdata'),
+    path('datas/export', custom_datas.export_form_data, name='export_formdata'),
+    path('datas/stats', custom_datas.form_data_stats, name='formdata_stats'),
+    path('datas/batch', custom_datas.batch_form_data, name='batch_formdata'),
+    path('upload', uploads.init_upload, name='init_upload'),
+    path('upload/<uuid:upload_id>', uploads.upload_chunk, name='upload_chunk'),
+    path('upload/<uuid:upload_id>/complete', uploads.complete_upload, name='complete_upload'),
+    path('files/check', uploads.check_files, name='check_files'),
+    path('files/attach', uploads.attach_file, name='attach_file'),
+    path('files/<int:file_id>/preview', photos.form_file_preview, name='form_file_preview'),
 
     path('events', calender.get_events, name='events'),
     path('event_form', calender.event_form, name='event_form'),
     path('create_event', calender.create_event, name='create_event'),
     path('update_event', calender.update_event, name='update_event'),
     path('delete_event', calender.delete_event, name='delete_event'),
+    path('bulk_events', calender.bulk_events, name='bulk_events'),
+    path('event_occurrences', calender.event_occurrences, name='event_occurrences'),
+    path('update_occurrence', calender.update_occurrence, name='update_occurrence'),
+    path('free_busy', calender.free_busy, name='free_busy'),
+    path('calendar_feed_url', calendar_feed.calendar_feed_url, name='calendar_feed_url'),
+    path('calendar_feed/<str:token>.ics', calendar_feed.calendar_feed, name='calendar_feed'),
+    path('suggest_slots', calender.suggest_slots, name='suggest_slots'),
+
+    path('photos/<str:digest>/<int:size>', photos.user_photo, name='user_photo'),
+    path('search', search.search_view, name='search'),
 ]
@@ -153,7 +153,8 @@ def user_login(request):
 
     if user and user.check_password(password):  # Authenticate the user manually
         user.last_login = timezone.now()
-        user.save()
+        # Only last_login, so cached payloads of the company stay valid
+        user.save(update_fields=["last_login"])
 
         refresh = RefreshToken.for_user(user)
         return Response(
@@ -0,0 +1,175 @@
+from datetime import timedelta, timezone as dt_timezone
+from django.db.models import Count, Max
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import http_date
+from django.utils.timezone import localtime
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from api.caching import make_etag
+from api.models import Calendar, CalendarOverride, CustomUser
+from api.recurrence import is_recurring
+
+RRULE_FREQUENCIES = {
+    'DALY': 'DAILY',
+    'WEEK': 'WEEKLY',
+    'MONT': 'MONTHLY',
+    'YEAR': 'YEARLY',
+}
+FEED_COLUMNS = ('id', 'name', 'description', 'start_time', 'end_time', 'is_all_day',
+                'location', 'meeting_url', 'recurrence', 'update_date')
+FEED_BATCH_SIZE = 500
+
+
+# Calendar apps can't send a bearer token, so the feed URL carries its own.
+# It is tied to the password hash: changing the password revokes old feed URLs.
+def feed_token(user):
+    digest = salted_hmac("calendar-feed", f"{user.pk}:{user.password}").hexdigest()[:32]
+    return f"{user.pk}-{digest}"
+
+
+def user_for_feed_token(token):
+    user_id, _, _ = token.partition("-")
+    if not user_id.isdigit():
+        return None
+    user = CustomUser.objects.filter(pk=int(user_id), is_active=True).first()
+    if user is None or not constant_time_compare(feed_token(user), token):
+        return None
+    return user
+
+
+def _escape(value):
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _line(content):
+    # Fold at 75 octets without splitting a UTF-8 sequence (RFC 5545 3.1)
+    encoded = content.encode("utf-8")
+    if len(encoded) <= 75:
+        return content + "\r\n"
+    parts, current, size, limit = [], [], 0, 75
+    for char in content:
+        char_size = len(char.encode("utf-8"))
+        if size + char_size > limit:
+            parts.append("".join(current))
+            current, size, limit = [], 0, 74
+        current.append(char)
+        size += char_size
+    parts.append("".join(current))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _date_property(name, value, is_all_day):
+    if is_all_day:
+        return f"{name};VALUE=DATE:{localtime(value).strftime('%Y%m%d')}"
+    return f"{name}:{_utc(value)}"
+
+
+def _times(start, end, is_all_day):
+    if is_all_day:
+        first = localtime(start).date()
+        last = max(localtime(end).date(), first) + timedelta(days=1)
+        return [f"DTSTART;VALUE=DATE:{first.strftime('%Y%m%d')}", f"DTEND;VALUE=DATE:{last.strftime('%Y%m%d')}"]
+    return [f"DTSTART:{_utc(start)}", f"DTEND:{_utc(end)}"]
+
+
+def _vevent(event, overrides=()):
+    lines = ["BEGIN:VEVENT", f"UID:event-{event['id']}@lms", f"DTSTAMP:{_utc(event['update_date'])}",
+             f"LAST-MODIFIED:{_utc(event['update_date'])}"]
+    lines += _times(event['start_time'], event['end_time'], event['is_all_day'])
+    lines.append(f"SUMMARY:{_escape(event['name'])}")
+    if event['description']:
+        lines.append(f"DESCRIPTION:{_escape(event['description'])}")
+    if event['location']:
+        lines.append(f"LOCATION:{_escape(event['location'])}")
+    if event['meeting_url']:
+        lines.append(f"URL:{event['meeting_url']}")
+    if is_recurring(event['recurrence']):
+        lines.append(f"RRULE:FREQ={RRULE_FREQUENCIES[event['recurrence']]}")
+        # Cancelled occurrences are excluded from the series; changed ones follow
+        # as their own VEVENT with the same UID and a RECURRENCE-ID
+        for override in overrides:
+            if override.is_cancelled:
+                lines.append(_date_property("EXDATE", override.original_start, event['is_all_day']))
+    lines.append("END:VEVENT")
+    chunks = ["".join(_line(line) for line in lines)]
+
+    duration = event['end_time'] - event['start_time']
+    for override in overrides:
+        if override.is_cancelled:
+            continue
+        start = override.start_time or override.original_start
+        end = override.end_time or start + duration
+        moved = ["BEGIN:VEVENT", f"UID:event-{event['id']}@lms", f"DTSTAMP:{_utc(event['update_date'])}",
+                 _date_property("RECURRENCE-ID", override.original_start, event['is_all_day'])]
+        moved += _times(start, end, event['is_all_day'])
+        moved.append(f"SUMMARY:{_escape(override.name or event['name'])}")
+        description = override.description if override.description is not None else event['description']
+        if description:
+            moved.append(f"DESCRIPTION:{_escape(description)}")
+        moved.append("END:VEVENT")
+        chunks.append("".join(_line(line) for line in moved))
+    return "".join(chunks)
+
+
+def _feed(events):
+    # Keyset batches on id; each batch loads only its own events' overrides,
+    # so memory stays flat however many events and overrides the user has
+    yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//LMS//Calendar//EN\r\nCALSCALE:GREGORIAN\r\nMETHOD:PUBLISH\r\n"
+    last_id = 0
+    while True:
+        batch = list(events.filter(id__gt=last_id).order_by('id').values(*FEED_COLUMNS)[:FEED_BATCH_SIZE])
+        if not batch:
+            break
+        overrides = {}
+        for override in CalendarOverride.objects.filter(
+            event_id__in=[event['id'] for event in batch]
+        ).order_by('original_start'):
+            overrides.setdefault(override.event_id, []).append(override)
+        for event in batch:
+            yield _vevent(event, overrides.get(event['id'], ()))
+        last_id = batch[-1]['id']
+    yield "END:VCALENDAR\r\n"
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def calendar_feed_url(request):
+    url = request.build_absolute_uri(reverse("calendar_feed", args=[feed_token(request.user)]))
+    return Response({"url": url}, status=status.HTTP_200_OK)
+
+
+@require_GET
+def calendar_feed(request, token):
+    user = user_for_feed_token(token)
+    if user is None:
+        raise Http404
+
+    events = Calendar.objects.filter(users=user)
+    # Conditional GET: the feed only changes when one of the user's events is
+    # added, edited or removed
+    state = events.aggregate(last_modified=Max('update_date'), count=Count('id'))
+    etag = make_etag(user.pk, state['last_modified'], state['count'])
+    last_modified = state['last_modified'].timestamp() if state['last_modified'] else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = StreamingHttpResponse(
+            _feed(events),
+            content_type="text/calendar; charset=utf-8",
+        )
+        response["Content-Disposition"] = 'inline; filename="calendar.ics"'
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "private, max-age=300"
+    return response
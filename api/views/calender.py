@@ -1,49 +1,163 @@
+from django.core.exceptions import ValidationError
 from django.utils.timezone import make_aware
-from datetime import datetime
+from datetime import datetime, timedelta
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from api.models import Calendar, CustomUser
+from api.models import Calendar, CalendarAttendee, CalendarOverride, CustomUser
 from api.serializers import CalendarSerializer, CustomUserSerializer
 from rest_framework.permissions import IsAuthenticated
+from api.images import photo_context
+from api.caching import PAYLOAD_TIMEOUT, company_users_version, etag_matches, make_etag
+from django.core.cache import cache
+from api.projections import CalendarProjection
+from api.datetimes import get_formatter, parse_datetime_param
+from api.pagination import decode_cursor, encode_cursor, get_limit
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from api import availability, realtime, recurrence as recurrence_engine, reminders, search
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def event_form(request):
     try:
-        # Get the recurring choices and event type choices from the Calendar model
-        recurring_choices = dict(Calendar.RECURRING_CHOICES)
-        event_type_choices = dict(Calendar.EVENT_TYPE)
-
-        # Fetch users belonging to the same company as the logged-in user
-        users_queryset = CustomUser.objects.filter(company=request.user.company)
-        users_data = CustomUserSerializer(users_queryset, many=True).data
-
-        # Structure the form input data
-        forms_input_data = {
-            'recurringChoices': [{'key': key, 'value': value} for key, value in recurring_choices.items()],
-            'eventTypeChoices': [{'key': key, 'value': value} for key, value in event_type_choices.items()],
-            'users': users_data,
-        }
+        # The payload only changes when a user of the company changes, so it is
+        # cached per company under a version derived from the company's users
+        context = photo_context(request)
+        company_id = request.user.company_id
+        version = company_users_version(company_id)
+        etag = make_etag(company_id, version, context['photo'], context['photo_size'])
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
+
+        cache_key = f"event_form:{etag}"
+        forms_input_data = cache.get(cache_key)
+        if forms_input_data is None:
+            # Get the recurring choices and event type choices from the Calendar model
+            recurring_choices = dict(Calendar.RECURRING_CHOICES)
+            event_type_choices = dict(Calendar.EVENT_TYPE)
+
+            # Fetch users belonging to the same company as the logged-in user
+            users_queryset = CustomUser.objects.filter(company=request.user.company)
+            users_data = CustomUserSerializer(users_queryset, many=True, context=context).data
+
+            # Structure the form input data
+            forms_input_data = {
+                'recurringChoices': [{'key': key, 'value': value} for key, value in recurring_choices.items()],
+                'eventTypeChoices': [{'key': key, 'value': value} for key, value in event_type_choices.items()],
+                'users': users_data,
+            }
+            cache.set(cache_key, forms_input_data, PAYLOAD_TIMEOUT)
 
         # Return the response with the form data
-        return Response({'formsInputData': forms_input_data}, status=status.HTTP_200_OK)
+        response = Response({'formsInputData': forms_input_data}, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_events(request):
+    # Optional ?start=&end= window, keyset pagination on (start_time, id) via ?cursor=&limit=.
+    # Without cursor or limit the response is the full list, as before pagination.
     company_id = request.query_params.get('company', None)
     filters = {'users': request.user}
     if company_id:
         filters['company'] = company_id
-    events = Calendar.objects.filter(**filters).prefetch_related('users', 'company')
-    if not events.exists():
+    try:
+        if request.query_params.get('start'):
+            filters['end_time__gt'] = parse_datetime_param(request.query_params['start'])
+        if request.query_params.get('end'):
+            filters['start_time__lt'] = parse_datetime_param(request.query_params['end'])
+        paginated = 'cursor' in request.query_params or 'limit' in request.query_params
+        limit = get_limit(request)
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            cursor_start, cursor_id = decode_cursor(cursor, 'datetime', int)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    events = Calendar.objects.filter(**filters).order_by('start_time', 'id')
+    if cursor:
+        events = events.filter(
+            Q(start_time__gt=cursor_start) | Q(start_time=cursor_start, id__gt=cursor_id)
+        )
+    if not paginated:
+        data = CalendarProjection(events, request=request).data
+        if not data:
+            return Response({'detail': 'No events found for the current user.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data, status=status.HTTP_200_OK)
+
+    projection = CalendarProjection(events[:limit + 1], request=request, keys=('start_time', 'id'))
+    data = projection.data
+    if not data and not cursor:
         return Response({'detail': 'No events found for the current user.'}, status=status.HTTP_404_NOT_FOUND)
-    serializer = CalendarSerializer(events, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+
+    next_cursor = None
+    if len(data) > limit:
+        data = data[:limit]
+        next_cursor = encode_cursor(*projection.keys[limit - 1])
+    return Response({'results': data, 'next': next_cursor}, status=status.HTTP_200_OK)
+
+def _publish_events(action, event_ids, request, previous_attendees=None):
+    # Push the changed events to their attendees over WebSockets (api.consumers)
+    events = CalendarProjection(Calendar.objects.filter(id__in=event_ids), request=request).data
+    realtime.publish_event_changes(action, events, previous_attendees)
+
+def _publish_deleted(attendees):
+    # attendees: {event_id: [user_id, ...]} captured before the delete
+    realtime.publish_event_changes(
+        'deleted', [{'id': event_id, 'users': [{'id': user_id} for user_id in user_ids]} for event_id, user_ids in attendees.items()]
+    )
+
+def _flag(value):
+    return value in (True, 1, '1', 'true', 'True')
+
+def _check_conflicts(users, company, start_time, end_time, recurrence, check_conflicts, strict, exclude_event=None):
+    # Attendee bookings overlapping the new time range (every occurrence of a
+    # recurring event), found with one overlap query. Only attendees of the
+    # caller's company are checked, as for free/busy, so other companies'
+    # events are never reported. In strict mode the attendee rows are locked
+    # first, so two concurrent strict bookings for the same people can't both
+    # pass the check.
+    if not users or not (check_conflicts or strict) or company is None:
+        return {}
+    attendees = CustomUser.objects.filter(id__in=users, company=company)
+    if strict:
+        attendees = attendees.select_for_update()
+    users = list(attendees.values_list('id', flat=True))
+    if not users:
+        return {}
+    return availability.find_conflicts(
+        users, start_time, end_time, exclude_event=exclude_event, event_recurrence=recurrence
+    )
+
+def _conflict_data(conflicts):
+    formatter = get_formatter()
+    return {
+        user_id: [
+            {
+                'id': occurrence.event_id,
+                'name': occurrence.name,
+                'start_time': formatter.format(occurrence.start_time),
+                'end_time': formatter.format(occurrence.end_time),
+            }
+            for occurrence in occurrences
+        ]
+        for user_id, occurrences in conflicts.items()
+    }
+
+def _conflict_response(conflicts):
+    return Response(
+        {"error": "Some attendees are already booked at this time.", "conflicts": _conflict_data(conflicts)},
+        status=status.HTTP_409_CONFLICT,
+    )
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -71,32 +185,45 @@ def create_event(request):
         except ValueError:
             return Response({"error": "Invalid date format. Use 'DD-MM-YYYY HH:MM AM/PM'."}, status=400)
 
-        # Create the event instance
-        event = Calendar.objects.create(
-            name=name,
-            description=description,
-            event_type=event_type,
-            start_time=start_time,
-            end_time=end_time,
-            is_all_day=is_all_day,
-            location=location,
-            meeting_url=meeting_url,
-            recurrence=recurrence,
-            company=request.user.company,
-            create_by=request.user,
-            create_date=datetime.now(),
-            update_by=request.user,
-            update_date=datetime.now(),
-        )
+        check_conflicts = _flag(request.data.get('check_conflicts'))
+        strict = _flag(request.data.get('strict'))
+        with transaction.atomic():
+            conflicts = _check_conflicts(
+                users, request.user.company, start_time, end_time, recurrence, check_conflicts, strict
+            )
+            if strict and conflicts:
+                return _conflict_response(conflicts)
+
+            # Create the event instance
+            event = Calendar.objects.create(
+                name=name,
+                description=description,
+                event_type=event_type,
+                start_time=start_time,
+                end_time=end_time,
+                is_all_day=is_all_day,
+                location=location,
+                meeting_url=meeting_url,
+                recurrence=recurrence,
+                company=request.user.company,
+                create_by=request.user,
+                create_date=timezone.now(),
+                update_by=request.user,
+                update_date=timezone.now(),
+            )
 
-        # Add users to the event
-        if users:
-            user_instances = CustomUser.objects.filter(id__in=users)
-            event.users.set(user_instances)
+            # Add users to the event
+            if users:
+                user_instances = CustomUser.objects.filter(id__in=users)
+                event.users.set(user_instances)
+            _publish_events('created', [event.id], request)
+            reminders.event_changed(event.id)
 
         # Serialize the event and return the response
-        serializer = CalendarSerializer(event)
-        return Response(serializer.data, status=201)
+        data = CalendarSerializer(event).data
+        if check_conflicts:
+            data = {**data, 'conflicts': _conflict_data(conflicts)}
+        return Response(data, status=201)
 
     except Exception as e:
         return Response({"error": str(e)}, status=500)
@@ -133,27 +260,47 @@ def update_event(request):
         except ValueError:
             return Response({"error": "Invalid date format. Use 'DD-MM-YYYY HH:MM AM/PM'."}, status=400)
 
-        if users:
-            user_instances = CustomUser.objects.filter(id__in=users)
-            event.users.set(user_instances)
-
-        # Update the event
-        event.name = name
-        event.description = description
-        event.event_type = event_type
-        event.start_time = start_time
-        event.end_time = end_time
-        event.is_all_day = is_all_day
-        event.location = location
-        event.meeting_url = meeting_url
-        event.recurrence = recurrence
-        event.update_by = request.user
-        event.update_date = datetime.now()
-        event.save()
+        check_conflicts = _flag(request.data.get('check_conflicts'))
+        strict = _flag(request.data.get('strict'))
+        with transaction.atomic():
+            # The event row lock keeps its attendee list stable until commit
+            list(Calendar.objects.select_for_update().filter(id=event.id).values_list('id', flat=True))
+            attendees = users or list(event.users.values_list('id', flat=True))
+            conflicts = _check_conflicts(
+                attendees, request.user.company, start_time, end_time, recurrence, check_conflicts, strict,
+                exclude_event=event.id,
+            )
+            if strict and conflicts:
+                return _conflict_response(conflicts)
+            # Read with the locks held, so removed attendees are told about the change
+            previous_attendees = list(event.users.values_list('id', flat=True))
+
+            if users:
+                user_instances = CustomUser.objects.filter(id__in=users)
+                event.users.set(user_instances)
+
+            # Update the event
+            event.name = name
+            event.description = description
+            event.event_type = event_type
+            event.start_time = start_time
+            event.end_time = end_time
+            event.is_all_day = is_all_day
+            event.location = location
+            event.meeting_url = meeting_url
+            event.recurrence = recurrence
+            event.update_by = request.user
+            event.update_date = timezone.now()
+            event.save()
+            _publish_events('updated', [event.id], request, {event.id: previous_attendees})
+            reminders.event_changed(event.id)
+        recurrence_engine.invalidate_event(event.id)
 
         # Serialize the updated event and return the response
-        serializer = CalendarSerializer(event)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        data = CalendarSerializer(event).data
+        if check_conflicts:
+            data = {**data, 'conflicts': _conflict_data(conflicts)}
+        return Response(data, status=status.HTTP_200_OK)
 
     except Calendar.DoesNotExist:
         return Response({"error": "Event not found."}, status=status.HTTP_404_NOT_FOUND)
@@ -173,9 +320,345 @@ def delete_event(request):
             return Response({"error": "You do not have permission to delete this event."}, status=status.HTTP_403_FORBIDDEN)
         if event.create_by != request.user:
             return Response({"error": "You can only delete events that you created."}, status=status.HTTP_403_FORBIDDEN)
+        event_id = event.id
+        recurrence_engine.invalidate_event(event_id)
+        attendees = {event_id: list(event.users.values_list('id', flat=True))}
         event.delete()
+        search.remove(search.EVENT, [event_id])
+        _publish_deleted(attendees)
+        reminders.event_deleted(event_id)
         return Response({"detail": "Event deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
     except Calendar.DoesNotExist:
         return Response({"error": "Event not found."}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+MAX_OCCURRENCE_WINDOW = timedelta(days=366)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def event_occurrences(request):
+    # Occurrences of the user's events (recurring ones expanded) in ?start=&end=
+    try:
+        window_start = parse_datetime_param(request.query_params.get('start', ''))
+        window_end = parse_datetime_param(request.query_params.get('end', ''))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if window_end <= window_start or window_end - window_start > MAX_OCCURRENCE_WINDOW:
+        return Response({"error": "end must be after start and within 366 days of it."}, status=status.HTTP_400_BAD_REQUEST)
+
+    events = Calendar.objects.filter(
+        recurrence_engine.window_filter(window_start, window_end), users=request.user
+    ).values('id', 'name', 'description', 'start_time', 'end_time', 'recurrence', 'update_date')
+    formatter = get_formatter()
+    data = [
+        {
+            'id': occurrence.event_id,
+            'name': occurrence.name,
+            'description': occurrence.description,
+            'start_time': formatter.format(occurrence.start_time),
+            'end_time': formatter.format(occurrence.end_time),
+            'original_start': formatter.format(occurrence.original_start),
+            'is_override': occurrence.is_override,
+        }
+        for occurrence in recurrence_engine.expand_events(events, window_start, window_end)
+    ]
+    return Response(data, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def update_occurrence(request):
+    # Cancel, move or restore a single occurrence of a recurring event
+    try:
+        event_id = request.data.get('id')
+        original_start = request.data.get('original_start')
+        if not event_id or not original_start:
+            return Response({"error": "Event ID and original_start are required."}, status=status.HTTP_400_BAD_REQUEST)
+        event = Calendar.objects.get(id=event_id)
+        if event.company != request.user.company:
+            return Response({"error": "You do not have permission to update this event."}, status=status.HTTP_403_FORBIDDEN)
+        if event.create_by != request.user:
+            return Response({"error": "You can only update events that you created."}, status=status.HTTP_403_FORBIDDEN)
+        if not recurrence_engine.is_recurring(event.recurrence):
+            return Response({"error": "Only recurring events have occurrences."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            original_start = parse_datetime_param(original_start)
+            start_time = request.data.get('start_time')
+            end_time = request.data.get('end_time')
+            start_time = parse_datetime_param(start_time) if start_time else None
+            end_time = parse_datetime_param(end_time) if end_time else None
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        window = recurrence_engine.expand(
+            event.start_time, event.end_time, event.recurrence, original_start, original_start + timedelta(seconds=1)
+        )
+        if all(start != original_start for start, _ in window):
+            return Response({"error": "original_start is not an occurrence of this event."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.data.get('restore'):
+            CalendarOverride.objects.filter(event=event, original_start=original_start).delete()
+        else:
+            CalendarOverride.objects.update_or_create(
+                event=event,
+                original_start=original_start,
+                defaults={
+                    'is_cancelled': bool(request.data.get('cancel', False)),
+                    'start_time': start_time,
+                    'end_time': end_time,
+                    'name': request.data.get('name'),
+                    'description': request.data.get('description'),
+                },
+            )
+        # Bumping update_date also moves the event to new occurrence cache keys
+        event.update_by = request.user
+        event.update_date = timezone.now()
+        event.save(update_fields=['update_by', 'update_date'])
+        recurrence_engine.invalidate_event(event.id)
+        _publish_events('updated', [event.id], request)
+        reminders.event_changed(event.id)
+        return Response({"detail": "Occurrence updated successfully."}, status=status.HTTP_200_OK)
+
+    except Calendar.DoesNotExist:
+        return Response({"error": "Event not found."}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+MAX_AVAILABILITY_USERS = 100
+MAX_AVAILABILITY_WINDOW = timedelta(days=62)
+
+def _availability_params(request):
+    # Shared parsing for free_busy/suggest_slots: ?users=1,2,3&start=&end=
+    try:
+        user_ids = [int(i) for i in request.query_params.get('users', '').split(',') if i.strip()]
+    except ValueError:
+        raise ValueError("users must be a comma separated list of ids.")
+    if not user_ids or len(user_ids) > MAX_AVAILABILITY_USERS:
+        raise ValueError(f"Between 1 and {MAX_AVAILABILITY_USERS} users are required.")
+    window_start = parse_datetime_param(request.query_params.get('start', ''))
+    window_end = parse_datetime_param(request.query_params.get('end', ''))
+    if window_end <= window_start or window_end - window_start > MAX_AVAILABILITY_WINDOW:
+        raise ValueError("end must be after start and within 62 days of it.")
+    # Only users of the requester's company can be looked up
+    user_ids = list(
+        CustomUser.objects.filter(id__in=user_ids, company=request.user.company).values_list('id', flat=True)
+    )
+    if not user_ids:
+        raise ValueError("No matching users found.")
+    return user_ids, window_start, window_end
+
+def _interval_data(intervals, formatter):
+    return [
+        {'start_time': formatter.format(start), 'end_time': formatter.format(end)}
+        for start, end in intervals
+    ]
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def free_busy(request):
+    try:
+        user_ids, window_start, window_end = _availability_params(request)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    per_user, combined = availability.busy_intervals(user_ids, window_start, window_end)
+    formatter = get_formatter()
+    return Response({
+        'busy': {user_id: _interval_data(intervals, formatter) for user_id, intervals in per_user.items()},
+        'combined': _interval_data(combined, formatter),
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def suggest_slots(request):
+    # First ?count= common free slots of ?duration= minutes, on ?step= minute boundaries
+    try:
+        user_ids, window_start, window_end = _availability_params(request)
+        duration = int(request.query_params.get('duration', 30))
+        step = int(request.query_params.get('step', 15))
+        count = int(request.query_params.get('count', 5))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if duration <= 0 or step <= 0 or not 0 < count <= 50:
+        return Response({"error": "duration and step must be positive and count between 1 and 50."}, status=status.HTTP_400_BAD_REQUEST)
+    slots = availability.suggest_slots(
+        user_ids, window_start, window_end, timedelta(minutes=duration), timedelta(minutes=step), count
+    )
+    return Response(_interval_data(slots, get_formatter()), status=status.HTTP_200_OK)
+
+MAX_BULK_OPERATIONS = 500
+BULK_EVENT_FIELDS = ['name', 'description', 'event_type', 'start_time', 'end_time', 'is_all_day',
+                     'location', 'meeting_url', 'recurrence']
+# Set from request.user, so model validation doesn't look them up per event
+BULK_EVENT_RELATIONS = ['company', 'create_by', 'update_by']
+
+def _bulk_event_values(operation, event=None):
+    # Field values for a create/update operation, falling back to the current event
+    values = {}
+    for field in BULK_EVENT_FIELDS:
+        if field in operation:
+            values[field] = operation[field]
+        elif event is not None:
+            values[field] = getattr(event, field)
+    values.setdefault('event_type', 'NONE')
+    values.setdefault('recurrence', 'NONE')
+    values.setdefault('is_all_day', False)
+    if not values.get('name') or not values.get('start_time') or not values.get('end_time'):
+        raise ValueError("Name, start_time, and end_time are required.")
+    for field in ('start_time', 'end_time'):
+        if isinstance(values[field], str):
+            values[field] = parse_datetime_param(values[field])
+    if values['end_time'] < values['start_time']:
+        raise ValueError("end_time must not be before start_time.")
+    return values
+
+def _create_events(events, user, create_date):
+    # Backends that can't return primary keys from a bulk insert (MySQL) read
+    # them back by creator and creation time, which every event of the batch
+    # shares, in insertion order
+    Calendar.objects.bulk_create(events, batch_size=200)
+    if not events or connection.features.can_return_rows_from_bulk_insert:
+        return
+    ids = list(
+        Calendar.objects.filter(create_by=user, create_date=create_date).order_by('id').values_list('id', flat=True)
+    )
+    if len(ids) != len(events):
+        raise RuntimeError("Could not read back the ids of the created events.")
+    for event, event_id in zip(events, ids):
+        event.id = event_id
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_events(request):
+    # {"operations": [{"op": "create"|"update"|"delete", ...}]}. Everything is
+    # validated first; if any operation is invalid nothing is written.
+    operations = request.data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return Response({"error": "operations must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(operations) > MAX_BULK_OPERATIONS:
+        return Response({"error": f"At most {MAX_BULK_OPERATIONS} operations per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        # One query for every referenced event and one for every referenced user
+        event_ids = {op.get('id') for op in operations if isinstance(op, dict) and op.get('op') in ('update', 'delete')}
+        events = Calendar.objects.in_bulk([i for i in event_ids if isinstance(i, int)])
+        user_ids = {
+            user_id
+            for op in operations if isinstance(op, dict) and isinstance(op.get('users'), list)
+            for user_id in op['users']
+        }
+        valid_users = set(
+            CustomUser.objects.filter(id__in=[i for i in user_ids if isinstance(i, int)], company=request.user.company)
+            .values_list('id', flat=True)
+        )
+
+        results, errors, seen = [], {}, set()
+        creates, updates, deletes, attendees = [], [], [], {}
+        now = timezone.now()
+        for index, operation in enumerate(operations):
+            try:
+                if not isinstance(operation, dict) or operation.get('op') not in ('create', 'update', 'delete'):
+                    raise ValueError("op must be one of create, update, delete.")
+                op = operation['op']
+                users = operation.get('users')
+                if users is not None and (not isinstance(users, list) or not set(users) <= valid_users):
+                    raise ValueError("users must be a list of user ids from your company.")
+                event = None
+                if op in ('update', 'delete'):
+                    event = events.get(operation.get('id'))
+                    if event is None:
+                        raise ValueError("Event not found.")
+                    if event.id in seen:
+                        raise ValueError("Each event can only appear once per request.")
+                    seen.add(event.id)
+                    if event.company != request.user.company or event.create_by_id != request.user.id:
+                        raise ValueError("You can only change events that you created.")
+                if op == 'delete':
+                    deletes.append(event)
+                elif op == 'update':
+                    for field, value in _bulk_event_values(operation, event).items():
+                        setattr(event, field, value)
+                    event.update_by = request.user
+                    event.update_date = now
+                    updates.append(event)
+                else:
+                    event = Calendar(
+                        company=request.user.company,
+                        create_by=request.user,
+                        create_date=now,
+                        update_by=request.user,
+                        update_date=now,
+                        **_bulk_event_values(operation),
+                    )
+                    creates.append(event)
+                if op != 'delete':
+                    event.full_clean(exclude=BULK_EVENT_RELATIONS)
+                if users is not None and op != 'delete':
+                    attendees[index] = users
+                results.append({'index': index, 'op': op, 'event': event})
+            except ValueError as e:
+                errors[index] = {'error': str(e)}
+            except ValidationError as e:
+                errors[index] = {'error': "Invalid event fields.", 'fields': e.message_dict}
+
+        if errors:
+            return Response(
+                {"error": "Some operations are invalid.", "results": [
+                    {'index': index, 'status': 'error', **error} for index, error in errors.items()
+                ]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with transaction.atomic():
+            _create_events(creates, request.user, now)
+            if updates:
+                Calendar.objects.bulk_update(updates, BULK_EVENT_FIELDS + ['update_by', 'update_date'], batch_size=200)
+            # Previous attendees of updated/deleted events also get the push
+            previous_attendees = {}
+            for calendar_id, user_id in CalendarAttendee.objects.filter(
+                calendar_id__in=[event.id for event in updates + deletes]
+            ).values_list('calendar_id', 'customuser_id'):
+                previous_attendees.setdefault(calendar_id, []).append(user_id)
+            replaced = [results[index]['event'].id for index in attendees if results[index]['op'] == 'update']
+            if replaced:
+                CalendarAttendee.objects.filter(calendar_id__in=replaced).delete()
+            CalendarAttendee.objects.bulk_create(
+                [
+                    CalendarAttendee(calendar_id=results[index]['event'].id, customuser_id=user_id)
+                    for index, users in attendees.items()
+                    for user_id in set(users)
+                ],
+                batch_size=1000,
+            )
+            deleted_ids = [event.id for event in deletes]
+            if deleted_ids:
+                Calendar.objects.filter(id__in=deleted_ids).delete()
+                search.remove(search.EVENT, deleted_ids)
+            # Bulk inserts and updates don't send post_save
+            search.index_events(creates + updates)
+        for event in updates + deletes:
+            recurrence_engine.invalidate_event(event.id)
+
+        changed = [event.id for event in creates + updates]
+        data = {row['id']: row for row in CalendarProjection(Calendar.objects.filter(id__in=changed), request=request).data}
+        created_ids = {event.id for event in creates}
+        realtime.publish_event_changes('created', [row for row in data.values() if row['id'] in created_ids])
+        realtime.publish_event_changes(
+            'updated', [row for row in data.values() if row['id'] not in created_ids], previous_attendees
+        )
+        _publish_deleted({event_id: previous_attendees.get(event_id, []) for event_id in deleted_ids})
+        for event_id in changed:
+            reminders.event_changed(event_id)
+        for event_id in deleted_ids:
+            reminders.event_deleted(event_id)
+        status_names = {'create': 'created', 'update': 'updated', 'delete': 'deleted'}
+        return Response({"results": [
+            {
+                'index': result['index'],
+                'status': status_names[result['op']],
+                'id': result['event'].id,
+                'event': data.get(result['event'].id) if result['op'] != 'delete' else None,
+            }
+            for result in results
+        ]}, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
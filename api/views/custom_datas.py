@@ -1,12 +1,33 @@
+import json
+from datetime import date
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.text import slugify
 from django.shortcuts import get_object_or_404
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from api.models import FormData, Form
 from api.serializers import FormDataSerializer
 from django.contrib.auth.models import AnonymousUser
 from django.utils import timezone
 from api.models import FormFile
+from api.exports import stream_csv, write_xlsx
+from api.images import photo_context
+from api.form_stats import form_summary, record_submissions
+from api.form_index import filter_submissions, index_submissions, parse_filters
+from api.media import enqueue_for_submissions
+from api.form_validation import get_validator
+from api.pagination import decode_cursor, encode_cursor, get_limit
+from api.projections import FormDataProjection
+from api.realtime import publish_form_data
+from api import search
+
+MAX_BULK_SUBMISSIONS = 500
+BULK_INSERT_CHUNK = 200
+MAX_BATCH_IDS = 200
+FILTER_RESERVED_PARAMS = ('form', 'cursor', 'limit', 'photo_size', 'type')
 
 @api_view(['POST'])
 def submit_form_data(request):
@@ -31,34 +52,296 @@ def submit_form_data(request):
         submitted_data = request.data.get('submitted_data')
         files = request.FILES
 
-        # Create FormData object with authenticated user
-        form_data = FormData.objects.create(
-            form=form,  # Use the retrieved form object
-            submitted_data=submitted_data,
-            create_at=request.user,  # Use authenticated user
-            create_date=timezone.now(),
-            update_at=request.user,  # Use authenticated user
-            update_date=timezone.now(),
-        )
-
-        # Process each file (file keys should be in the format 'photo_1', 'audio_1', etc.)
-        for file_key, file in files.items():
-            file_type = file_key.split('_')[0]  # Assuming the file field names are like 'photo_1', 'audio_1', etc.
-            FormFile.objects.create(
-                file=file,
-                file_type=file_type,
-                form_submission=form_data,
+        # The submission, its files and what the signals derive from them (index
+        # rows, search terms, summaries, media jobs) are saved together or not at all
+        with transaction.atomic():
+            # Create FormData object with authenticated user
+            form_data = FormData.objects.create(
+                company=form.company,
+                form=form,  # Use the retrieved form object
+                submitted_data=submitted_data,
+                create_by=request.user,  # Use authenticated user
+                create_date=timezone.now(),
+                update_by=request.user,  # Use authenticated user
+                update_date=timezone.now(),
             )
 
+            # Process each file (file keys should be in the format 'photo_1', 'audio_1', etc.)
+            for file_key, file in files.items():
+                file_type = file_key.split('_')[0]  # Assuming the file field names are like 'photo_1', 'audio_1', etc.
+                FormFile.objects.create(
+                    file=file,
+                    file_type=file_type,
+                    form_submission=form_data,
+                )
+
         # Serialize the response
         serializer = FormDataSerializer(form_data)
+        # Notify the company's dashboards of the new submission
+        publish_form_data(form.company_id, serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+def submissions_for_serializer():
+    # Everything FormDataSerializer reads, in a fixed number of queries however
+    # many rows are serialized
+    return FormData.objects.select_related('form', 'update_by').prefetch_related(
+        'files', 'update_by__groups', 'update_by__user_permissions'
+    )
+
 @api_view(['GET'])
 def get_form_data(request, form_data_id):
     # Retrieve form data by ID
-    form_data = get_object_or_404(FormData, id=form_data_id)
+    form_data = get_object_or_404(submissions_for_serializer(), id=form_data_id)
 
     # Serialize the form data
     serializer = FormDataSerializer(form_data)
     return Response(serializer.data, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def batch_form_data(request):
+    # Several submissions in the get_form_data shape, instead of one request each:
+    # ?ids=1,2,3 (results in that order, unknown ids listed in "missing"), or
+    # ?form=<id>&cursor=&limit= keyset-paginated on id
+    submissions = submissions_for_serializer().filter(company=request.user.company)
+    context = photo_context(request)
+    ids = request.query_params.get('ids')
+    if ids is not None:
+        try:
+            ids = list(dict.fromkeys(int(i) for i in ids.split(',') if i.strip()))
+        except ValueError:
+            return Response({"error": "ids must be a comma separated list of numbers."}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids or len(ids) > MAX_BATCH_IDS:
+            return Response({"error": f"Pass between 1 and {MAX_BATCH_IDS} ids."}, status=status.HTTP_400_BAD_REQUEST)
+        found = {form_data.id: form_data for form_data in submissions.filter(id__in=ids)}
+        return Response({
+            'results': FormDataSerializer([found[i] for i in ids if i in found], many=True, context=context).data,
+            'missing': [i for i in ids if i not in found],
+        }, status=status.HTTP_200_OK)
+
+    try:
+        form = Form.objects.get(id=request.query_params.get('form'), company=request.user.company)
+    except (Form.DoesNotExist, ValueError, TypeError):
+        return Response({"error": "Pass ids or a form."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = get_limit(request)
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            cursor_id, = decode_cursor(cursor, int)
+            submissions = submissions.filter(id__gt=cursor_id)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    page = list(submissions.filter(form=form).order_by('id')[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1].id) if len(page) > limit else None
+    return Response({
+        'results': FormDataSerializer(page[:limit], many=True, context=context).data,
+        'next': next_cursor,
+    }, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_submit_form_data(request):
+    # Offline sync: {"submissions": [{"client_id", "form", "submitted_data"}, ...]}.
+    # With multipart, "submissions" is a JSON string and files are sent as
+    # "<client_id>:<file_key>" (e.g. "a1b2:photo_1"). Items are accepted or
+    # rejected one by one; replaying a client_id returns the existing id.
+    submissions = request.data.get('submissions')
+    if isinstance(submissions, str):
+        try:
+            submissions = json.loads(submissions)
+        except ValueError:
+            return Response({"error": "submissions must be valid JSON."}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(submissions, list) or not submissions:
+        return Response({"error": "submissions must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(submissions) > MAX_BULK_SUBMISSIONS:
+        return Response({"error": f"At most {MAX_BULK_SUBMISSIONS} submissions per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        results = [None] * len(submissions)
+        items, seen = {}, set()
+        for index, item in enumerate(submissions):
+            client_id = item.get('client_id') if isinstance(item, dict) else None
+            if not isinstance(client_id, str) or not client_id or len(client_id) > 64:
+                results[index] = {'status': 'error', 'error': "client_id must be a string of at most 64 characters."}
+            elif client_id in seen:
+                results[index] = {'client_id': client_id, 'status': 'error', 'error': "Duplicate client_id in this request."}
+            elif not item.get('form') or not item.get('submitted_data'):
+                results[index] = {'client_id': client_id, 'status': 'error', 'error': "Form and submitted_data fields are required."}
+            else:
+                items[index] = item
+            if isinstance(client_id, str):
+                seen.add(client_id)
+
+        # Submissions already stored by an earlier (partially) delivered sync
+        existing = dict(
+            FormData.objects.filter(create_by=request.user, client_id__in=[item['client_id'] for item in items.values()])
+            .values_list('client_id', 'id')
+        )
+        # One query for every form referenced by the batch
+        forms = {
+            form.id: form
+            for form in Form.objects.filter(
+                id__in={item['form'] for item in items.values() if isinstance(item['form'], int)},
+                company=request.user.company,
+            )
+        }
+
+        now = timezone.now()
+        pending = []
+        for index, item in items.items():
+            client_id = item['client_id']
+            form = forms.get(item['form'])
+            if client_id in existing:
+                results[index] = {'client_id': client_id, 'status': 'exists', 'id': existing[client_id]}
+            elif form is None:
+                results[index] = {'client_id': client_id, 'status': 'error', 'error': "Form not found."}
+            elif not isinstance(item['submitted_data'], dict):
+                results[index] = {'client_id': client_id, 'status': 'error', 'error': "submitted_data must be an object."}
+            else:
+                errors = get_validator(form).errors(item['submitted_data'])
+                if errors:
+                    results[index] = {'client_id': client_id, 'status': 'error', 'errors': errors}
+                else:
+                    pending.append((index, FormData(
+                        company=form.company,
+                        form=form,
+                        submitted_data=item['submitted_data'],
+                        client_id=client_id,
+                        layout_version=form.layout_version,
+                        create_by=request.user,
+                        create_date=now,
+                        update_by=request.user,
+                        update_date=now,
+                    )))
+
+        if pending:
+            client_ids = [form_data.client_id for _, form_data in pending]
+            with transaction.atomic():
+                # Conflicts come from a concurrent replay of the same items, which
+                # inserted those rows first
+                FormData.objects.bulk_create(
+                    [form_data for _, form_data in pending], batch_size=BULK_INSERT_CHUNK, ignore_conflicts=True
+                )
+                ids, created = {}, set()
+                for client_id, form_data_id, create_date in FormData.objects.filter(
+                    create_by=request.user, client_id__in=client_ids
+                ).values_list('client_id', 'id', 'create_date'):
+                    ids[client_id] = form_data_id
+                    # Only rows stamped with this request's time were inserted by it;
+                    # the replay that inserted the others does their side effects
+                    if create_date == now:
+                        created.add(client_id)
+                for index, form_data in pending:
+                    form_data.id = ids[form_data.client_id]
+                    status_name = 'created' if form_data.client_id in created else 'exists'
+                    results[index] = {'client_id': form_data.client_id, 'status': status_name, 'id': form_data.id}
+                pending = [form_data for _, form_data in pending if form_data.client_id in created]
+
+                files = []
+                for file_key, file in request.FILES.items():
+                    client_id, _, name = file_key.partition(':')
+                    if client_id in created and name:
+                        files.append(FormFile(
+                            company=request.user.company,
+                            file=file,
+                            file_type=name.split('_')[0],
+                            form_submission_id=ids[client_id],
+                        ))
+                FormFile.objects.bulk_create(files, batch_size=BULK_INSERT_CHUNK)
+                if files:
+                    enqueue_for_submissions(form_data.id for form_data in pending)
+                layouts = {form.id: form.layout for form in forms.values()}
+                index_submissions(pending, layouts)
+                search.index_form_data(pending)
+                record_submissions(pending, layouts)
+
+            # Notify the company's dashboards of the new submissions
+            rows = FormDataProjection(
+                FormData.objects.filter(id__in=[form_data.id for form_data in pending]), request=request
+            ).data
+            for row in rows:
+                publish_form_data(request.user.company_id, row)
+
+        return Response({"results": [{'index': index, **result} for index, result in enumerate(results)]},
+                        status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def filter_form_data(request):
+    # Submissions of ?form= filtered by declared field values, e.g.
+    # ?form=3&status=Closed&amount__gte=100&region__in=North,South
+    # Operators: eq (default), gt, gte, lt, lte, in. Keyset-paginated on id.
+    try:
+        form = Form.objects.get(id=request.query_params.get('form'), company=request.user.company)
+    except (Form.DoesNotExist, ValueError):
+        return Response({"error": "Form not found."}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        conditions = parse_filters(request.query_params, form.layout, reserved=FILTER_RESERVED_PARAMS)
+        limit = get_limit(request)
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            cursor_id, = decode_cursor(cursor, int)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    submissions = filter_submissions(form, conditions).order_by('id')
+    if cursor:
+        submissions = submissions.filter(id__gt=cursor_id)
+    projection = FormDataProjection(submissions[:limit + 1], request=request, keys=('id',))
+    data = projection.data
+    next_cursor = None
+    if len(data) > limit:
+        data = data[:limit]
+        next_cursor = encode_cursor(*projection.keys[limit - 1])
+    return Response({'results': data, 'next': next_cursor}, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_form_data(request):
+    # ?form=<id>&type=csv|xlsx (?format= is taken by DRF), plus the same field filters as filter_form_data
+    try:
+        form = Form.objects.get(id=request.query_params.get('form'), company=request.user.company)
+    except (Form.DoesNotExist, ValueError):
+        return Response({"error": "Form not found."}, status=status.HTTP_404_NOT_FOUND)
+    export_format = request.query_params.get('type', 'csv')
+    if export_format not in ('csv', 'xlsx'):
+        return Response({"error": "type must be csv or xlsx."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        conditions = parse_filters(request.query_params, form.layout, reserved=FILTER_RESERVED_PARAMS)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    submissions = filter_submissions(form, conditions)
+    filename = f"{slugify(form.name) or 'form'}-{form.id}"
+    if export_format == 'csv':
+        response = StreamingHttpResponse(stream_csv(form, submissions), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+        return response
+    return FileResponse(
+        write_xlsx(form, submissions),
+        as_attachment=True,
+        filename=f"{filename}.xlsx",
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def form_data_stats(request):
+    # Dashboard summary of ?form=: submissions per day (optionally between
+    # ?start= and ?end=, YYYY-MM-DD), counts per dropdown option and
+    # count/sum/average of number fields
+    try:
+        form = Form.objects.get(id=request.query_params.get('form'), company=request.user.company)
+    except (Form.DoesNotExist, ValueError):
+        return Response({"error": "Form not found."}, status=status.HTTP_404_NOT_FOUND)
+    dates = {}
+    for param in ('start', 'end'):
+        value = request.query_params.get(param)
+        if value:
+            try:
+                dates[param] = date.fromisoformat(value).isoformat()
+            except ValueError:
+                return Response({"error": f"Invalid {param} date '{value}'. Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(form_summary(form, dates.get('start'), dates.get('end')), status=status.HTTP_200_OK)
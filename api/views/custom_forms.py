@@ -2,16 +2,49 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated 
-from api.models import Form, CustomUser
+from api.models import Form, CustomUser, FormLayoutVersion
+from api.datetimes import format_datetime
+from api.form_versions import publish_layout
 from api.serializers import FormSerializer
+from api.projections import FormProjection
+from api.pagination import decode_cursor, encode_cursor, get_limit
 
 class FormView(APIView):
     permission_classes = [IsAuthenticated] 
 
     def get(self, request):
-        forms = Form.objects.all()
-        serializer = FormSerializer(forms, many=True)
-        return Response(serializer.data)
+        # Forms of the user's company, keyset-paginated on id via ?cursor=&limit=.
+        # Without cursor or limit the response is the full list, as before pagination.
+        # ?fields=id,name,... limits the columns; leaving out layout keeps the
+        # JSON out of the query entirely.
+        fields = None
+        paginated = 'cursor' in request.query_params or 'limit' in request.query_params
+        try:
+            if request.query_params.get('fields'):
+                fields = [f.strip() for f in request.query_params['fields'].split(',') if f.strip()]
+                unknown = sorted(set(fields) - set(FormProjection.fields))
+                if unknown:
+                    raise ValueError(f"Unknown fields: {', '.join(unknown)}.")
+            limit = get_limit(request)
+            cursor = request.query_params.get('cursor')
+            if cursor:
+                cursor_id, = decode_cursor(cursor, int)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        forms = Form.objects.filter(company=request.user.company).order_by('id')
+        if cursor:
+            forms = forms.filter(id__gt=cursor_id)
+        if not paginated:
+            return Response(FormProjection(forms, request=request, fields=fields).data, status=status.HTTP_200_OK)
+        # update_by users are resolved for the whole page in one query
+        projection = FormProjection(forms[:limit + 1], request=request, fields=fields, keys=('id',))
+        data = projection.data
+        next_cursor = None
+        if len(data) > limit:
+            data = data[:limit]
+            next_cursor = encode_cursor(*projection.keys[limit - 1])
+        return Response({'results': data, 'next': next_cursor}, status=status.HTTP_200_OK)
 
     def post(self, request):
         data = request.data
@@ -27,3 +60,53 @@ class FormView(APIView):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class FormLayoutView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_form(self, request, form_id):
+        return Form.objects.filter(id=form_id, company=request.user.company).first()
+
+    def get(self, request, form_id):
+        # Every layout version of the form, oldest first
+        form = self.get_form(request, form_id)
+        if form is None:
+            return Response({"error": "Form not found."}, status=status.HTTP_404_NOT_FOUND)
+        versions = [
+            {
+                "version": version,
+                "layout": layout,
+                "migrations": migrations,
+                "create_by": create_by,
+                "create_date": format_datetime(create_date),
+            }
+            for version, layout, migrations, create_by, create_date in FormLayoutVersion.objects.filter(form=form)
+            .order_by("version")
+            .values_list("version", "layout", "migrations", "create_by", "create_date")
+        ]
+        return Response({"current": form.layout_version, "versions": versions}, status=status.HTTP_200_OK)
+
+    def post(self, request, form_id):
+        # {"layout": {...}, "migrations": [...]}: publishes a new layout version.
+        # Existing submissions are upgraded when read; field filters and stats
+        # see them under the new layout only after the upgrade_form_data
+        # command has rewritten them, which "upgrade_pending" points out.
+        form = self.get_form(request, form_id)
+        if form is None:
+            return Response({"error": "Form not found."}, status=status.HTTP_404_NOT_FOUND)
+        layout = request.data.get("layout")
+        if not isinstance(layout, dict):
+            return Response({"error": "layout is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            version = publish_layout(form, layout, request.data.get("migrations") or [], request.user)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        data = {"version": version.version, "layout": version.layout, "migrations": version.migrations,
+                "upgrade_pending": bool(version.migrations)}
+        if version.migrations:
+            data["detail"] = ("Filters and stats include older submissions under the new layout "
+                              "once the upgrade_form_data command has run.")
+        return Response(data, status=status.HTTP_201_CREATED)
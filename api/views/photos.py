@@ -0,0 +1,49 @@
+import os
+import re
+from django.http import FileResponse, Http404
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from api.images import PREVIEW_SIZE, THUMBNAIL_SIZES, preview_path, thumbnail_path
+from api.models import FormFile
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{40}$")
+
+# Thumbnails are addressed by content hash, so they can be loaded straight from
+# <img> tags without a token and cached by clients forever
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def user_photo(request, digest, size):
+    if not DIGEST_RE.match(digest) or size not in THUMBNAIL_SIZES:
+        raise Http404
+    path = thumbnail_path(digest, size)
+    if not os.path.exists(path):
+        raise Http404
+    response = FileResponse(open(path, "rb"), content_type="image/jpeg")
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+# Form file previews can show anything that was submitted, so they are only
+# served to users of the submission's company
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def form_file_preview(request, file_id):
+    if request.user.company_id is None:
+        # Would otherwise match every submission without a company
+        raise Http404
+    digest = (
+        FormFile.objects.filter(id=file_id, form_submission__company=request.user.company_id)
+        .values_list("preview", flat=True)
+        .first()
+    )
+    if not digest:
+        raise Http404
+    path = preview_path(digest)
+    if not os.path.exists(path):
+        # Rendered before previews had their own directory
+        path = thumbnail_path(digest, PREVIEW_SIZE)
+        if not os.path.exists(path):
+            raise Http404
+    response = FileResponse(open(path, "rb"), content_type="image/jpeg")
+    response["Cache-Control"] = "private, max-age=86400"
+    return response
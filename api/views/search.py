@@ -0,0 +1,59 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from api import search
+from api.models import Calendar, CalendarAttendee, FormData
+from api.projections import CalendarProjection, FormDataProjection
+
+MAX_QUERY_LENGTH = 200
+MAX_RESULTS = 50
+RESULT_TYPES = {"submission": search.SUBMISSION, "event": search.EVENT}
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_view(request):
+    # ?q=<words>[&type=submission|event][&limit=]: submissions of the user's
+    # company and events they attend containing every word, best match first.
+    # The last word also matches as a prefix.
+    query = request.query_params.get('q', '').strip()
+    if not query or len(query) > MAX_QUERY_LENGTH:
+        return Response({"error": f"q must be 1 to {MAX_QUERY_LENGTH} characters."}, status=status.HTTP_400_BAD_REQUEST)
+    result_type = request.query_params.get('type')
+    if result_type is not None and result_type not in RESULT_TYPES:
+        return Response({"error": "type must be submission or event."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 20)), MAX_RESULTS))
+    except ValueError:
+        return Response({"error": "limit must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+
+    kinds = (RESULT_TYPES[result_type],) if result_type else search.KINDS
+    # Every ranked candidate (at most search.CANDIDATE_LIMIT), so rows deleted
+    # since they were indexed and events the user doesn't attend are left out
+    # before the limit is applied rather than after
+    hits = search.search(request.user.company, query, kinds, limit=None)
+    ids = {kind: [object_id for k, object_id, _ in hits if k == kind] for kind in search.KINDS}
+    visible = set()
+    if ids[search.SUBMISSION]:
+        visible.update((search.SUBMISSION, object_id) for object_id in FormData.objects.filter(
+            id__in=ids[search.SUBMISSION], company=request.user.company).values_list('id', flat=True))
+    if ids[search.EVENT]:
+        visible.update((search.EVENT, object_id) for object_id in CalendarAttendee.objects.filter(
+            calendar_id__in=ids[search.EVENT], customuser=request.user).values_list('calendar_id', flat=True))
+    hits = [hit for hit in hits if hit[:2] in visible][:limit]
+
+    items = {}
+    submission_ids = [object_id for kind, object_id, _ in hits if kind == search.SUBMISSION]
+    if submission_ids:
+        submissions = FormData.objects.filter(id__in=submission_ids)
+        items.update({(search.SUBMISSION, row['id']): row for row in FormDataProjection(submissions, request=request).data})
+    event_ids = [object_id for kind, object_id, _ in hits if kind == search.EVENT]
+    if event_ids:
+        events = Calendar.objects.filter(id__in=event_ids)
+        items.update({(search.EVENT, row['id']): row for row in CalendarProjection(events, request=request).data})
+    type_names = {kind: name for name, kind in RESULT_TYPES.items()}
+    return Response({"results": [
+        {"type": type_names[kind], "score": score, "item": items[(kind, object_id)]}
+        for kind, object_id, score in hits if (kind, object_id) in items
+    ]}, status=status.HTTP_200_OK)
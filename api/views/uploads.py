@@ -0,0 +1,267 @@
+import hashlib
+import os
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from api.models import FormData, FormFile, StoredBlob, UploadSession
+from api.projections import _file_url
+from api.storage import add_reference
+
+UPLOAD_SESSION_DIR = str(getattr(settings, "UPLOAD_SESSION_DIR", os.path.join(settings.MEDIA_ROOT, "uploads")))
+MAX_CHUNK_BYTES = getattr(settings, "UPLOAD_MAX_CHUNK_BYTES", 8 * 1024 * 1024)
+MAX_FILE_BYTES = getattr(settings, "UPLOAD_MAX_FILE_BYTES", 2 * 1024 * 1024 * 1024)
+READ_BLOCK = 64 * 1024
+MAX_HASH_CHECKS = 500
+
+
+def part_path(session):
+    return os.path.join(UPLOAD_SESSION_DIR, f"{session.id}.part")
+
+
+class _PartFile(File):
+    # Exposes the partial file's path so FileSystemStorage moves it into place
+    # instead of copying it
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def _session_data(session):
+    return {
+        "upload_id": str(session.id),
+        "offset": session.received,
+        "size": session.size,
+        "max_chunk": MAX_CHUNK_BYTES,
+        "complete": session.form_file_id is not None,
+    }
+
+
+def _is_sha256(value):
+    return isinstance(value, str) and len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+
+def company_blobs(company, hashes):
+    # {sha256: StoredBlob} of the given hashes already attached to a file of the
+    # company; blobs of other companies are not revealed
+    blobs = {blob.name: blob for blob in StoredBlob.objects.filter(sha256__in=list(hashes))}
+    if not blobs:
+        return {}
+    owned = FormFile.objects.filter(file__in=list(blobs), form_submission__company=company).values_list('file', flat=True)
+    return {blobs[name].sha256: blobs[name] for name in set(owned)}
+
+
+def _get_session(request, upload_id, lock=False):
+    sessions = UploadSession.objects.filter(id=upload_id, create_by=request.user)
+    if lock:
+        sessions = sessions.select_for_update()
+    return sessions.first()
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def init_upload(request):
+    # {"form_submission", "file_type", "filename", "size", "sha256"?}. The file
+    # is then sent with PUT upload/<id> and attached with POST upload/<id>/complete.
+    try:
+        size = int(request.data.get('size'))
+    except (TypeError, ValueError):
+        return Response({"error": "size must be a number of bytes."}, status=status.HTTP_400_BAD_REQUEST)
+    if size <= 0 or size > MAX_FILE_BYTES:
+        return Response({"error": f"size must be between 1 and {MAX_FILE_BYTES} bytes."}, status=status.HTTP_400_BAD_REQUEST)
+    filename = os.path.basename(str(request.data.get('filename') or ''))[:255]
+    file_type = str(request.data.get('file_type') or '')[:20]
+    if not filename or not file_type:
+        return Response({"error": "filename and file_type are required."}, status=status.HTTP_400_BAD_REQUEST)
+    sha256 = str(request.data.get('sha256') or '').lower()
+    if sha256 and not _is_sha256(sha256):
+        return Response({"error": "sha256 must be a hex digest."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        form_data = FormData.objects.get(id=request.data.get('form_submission'), company=request.user.company)
+    except (FormData.DoesNotExist, ValueError, TypeError):
+        return Response({"error": "Form submission not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        now = timezone.now()
+        session = UploadSession.objects.create(
+            form_submission=form_data,
+            filename=filename,
+            file_type=file_type,
+            size=size,
+            sha256=sha256,
+            create_by=request.user,
+            create_date=now,
+            update_date=now,
+        )
+        os.makedirs(UPLOAD_SESSION_DIR, exist_ok=True)
+        open(part_path(session), "wb").close()
+        # "exists": the content is already stored and can be attached by hash
+        # (POST files/attach) instead of being uploaded
+        exists = bool(sha256) and sha256 in company_blobs(request.user.company, [sha256])
+        return Response({**_session_data(session), "exists": exists}, status=status.HTTP_201_CREATED)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET', 'PUT'])
+@permission_classes([IsAuthenticated])
+def upload_chunk(request, upload_id):
+    # GET: the offset to resume from. PUT: the raw bytes of the next chunk, with
+    # an Upload-Offset header equal to that offset and a Chunk-SHA256 header.
+    if request.method == 'GET':
+        session = _get_session(request, upload_id)
+        if session is None:
+            return Response({"error": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(_session_data(session), status=status.HTTP_200_OK)
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.headers.get('Content-Length') or 0)
+    except ValueError:
+        return Response({"error": "Upload-Offset header is required."}, status=status.HTTP_400_BAD_REQUEST)
+    checksum = request.headers.get('Chunk-SHA256', '').lower()
+    if not checksum:
+        return Response({"error": "Chunk-SHA256 header is required."}, status=status.HTTP_400_BAD_REQUEST)
+    if length <= 0 or length > MAX_CHUNK_BYTES:
+        return Response({"error": f"Chunks must be between 1 and {MAX_CHUNK_BYTES} bytes."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        with transaction.atomic():
+            # The row lock keeps two retries of the same chunk from interleaving
+            session = _get_session(request, upload_id, lock=True)
+            if session is None:
+                return Response({"error": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+            if session.form_file_id is not None:
+                return Response({"error": "Upload is already complete.", **_session_data(session)}, status=status.HTTP_409_CONFLICT)
+            if offset != session.received:
+                # The client resends from the offset the server has
+                return Response({"error": "Offset mismatch.", **_session_data(session)}, status=status.HTTP_409_CONFLICT)
+            if offset + length > session.size:
+                return Response({"error": "Chunk goes past the declared size."}, status=status.HTTP_400_BAD_REQUEST)
+
+            digest, written = hashlib.sha256(), 0
+            with open(part_path(session), "r+b") as part:
+                part.seek(offset)
+                while written < length:
+                    block = request.stream.read(min(READ_BLOCK, length - written))
+                    if not block:
+                        break
+                    part.write(block)
+                    digest.update(block)
+                    written += len(block)
+                if written != length or digest.hexdigest() != checksum:
+                    # Drop the partial chunk; the offset stays where it was
+                    part.truncate(offset)
+                    return Response(
+                        {"error": "Chunk was incomplete or failed its checksum.", **_session_data(session)},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                part.truncate(offset + written)
+            session.received = offset + written
+            session.update_date = timezone.now()
+            session.save(update_fields=['received', 'update_date'])
+            return Response(_session_data(session), status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as part:
+        for block in iter(lambda: part.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def complete_upload(request, upload_id):
+    try:
+        with transaction.atomic():
+            session = _get_session(request, upload_id, lock=True)
+            if session is None:
+                return Response({"error": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+            if session.form_file_id is not None:
+                # Repeated completion (e.g. a lost response) returns the same file
+                form_file = session.form_file
+                return Response(
+                    {"id": form_file.id, "file": _file_url(form_file.file.name, request), "file_type": form_file.file_type},
+                    status=status.HTTP_200_OK,
+                )
+            if session.received != session.size:
+                return Response({"error": "Upload is not finished.", **_session_data(session)}, status=status.HTTP_409_CONFLICT)
+            path = part_path(session)
+            if session.sha256 and _file_sha256(path) != session.sha256:
+                return Response({"error": "File does not match its sha256."}, status=status.HTTP_400_BAD_REQUEST)
+
+            form_data = session.form_submission
+            with open(path, "rb") as part:
+                form_file = FormFile.objects.create(
+                    company=form_data.company,
+                    file=_PartFile(part, name=session.filename),
+                    file_type=session.file_type,
+                    form_submission=form_data,
+                )
+            session.form_file = form_file
+            session.update_date = timezone.now()
+            session.save(update_fields=['form_file', 'update_date'])
+        if os.path.exists(path):
+            # Storages without the move fast path copied the file instead
+            os.remove(path)
+        return Response(
+            {"id": form_file.id, "file": _file_url(form_file.file.name, request), "file_type": form_file.file_type},
+            status=status.HTTP_201_CREATED,
+        )
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def check_files(request):
+    # {"sha256": [...]} -> {"present": [...]}: hashes that can be attached
+    # without uploading the file
+    hashes = request.data.get('sha256')
+    if not isinstance(hashes, list) or len(hashes) > MAX_HASH_CHECKS:
+        return Response({"error": f"sha256 must be a list of at most {MAX_HASH_CHECKS} digests."}, status=status.HTTP_400_BAD_REQUEST)
+    hashes = {str(h).lower() for h in hashes if _is_sha256(str(h).lower())}
+    return Response({"present": sorted(company_blobs(request.user.company, hashes))}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def attach_file(request):
+    # {"form_submission", "sha256", "file_type"}: a new FormFile for content
+    # that is already stored
+    sha256 = str(request.data.get('sha256') or '').lower()
+    file_type = str(request.data.get('file_type') or '')[:20]
+    if not _is_sha256(sha256) or not file_type:
+        return Response({"error": "sha256 and file_type are required."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        form_data = FormData.objects.get(id=request.data.get('form_submission'), company=request.user.company)
+    except (FormData.DoesNotExist, ValueError, TypeError):
+        return Response({"error": "Form submission not found."}, status=status.HTTP_404_NOT_FOUND)
+    blob = company_blobs(request.user.company, [sha256]).get(sha256)
+    if blob is None:
+        return Response({"error": "File not found. Upload it instead."}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        with transaction.atomic():
+            form_file = FormFile.objects.create(
+                company=form_data.company,
+                file=blob.name,
+                file_type=file_type,
+                form_submission=form_data,
+            )
+            if not add_reference(blob):
+                transaction.set_rollback(True)
+                return Response({"error": "File not found. Upload it instead."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            {"id": form_file.id, "file": _file_url(form_file.file.name, request), "file_type": form_file.file_type},
+            status=status.HTTP_201_CREATED,
+        )
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
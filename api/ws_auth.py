@@ -0,0 +1,29 @@
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from api.models import CustomUser
+
+
+@database_sync_to_async
+def get_user(user_id):
+    return CustomUser.objects.filter(pk=user_id, is_active=True).first() or AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    # Browsers can't set headers on a WebSocket handshake, so the same simplejwt
+    # access token used for the REST API is passed as ?token=
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        scope["user"] = AnonymousUser()
+        token = parse_qs(scope.get("query_string", b"").decode()).get("token", [None])[0]
+        if token:
+            try:
+                access_token = AccessToken(token)
+                scope["user"] = await get_user(access_token[api_settings.USER_ID_CLAIM])
+            except (TokenError, KeyError):
+                pass
+        return await super().__call__(scope, receive, send)